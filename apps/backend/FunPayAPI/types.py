@@ -265,6 +265,12 @@ class Message(BaseOrderInfo):
         """Являемся ли мы продавцом по заказу (для системных сообщений)."""
         self.i_am_buyer: bool | None = None
         """Являемся ли мы покупателем по заказу (для системных сообщений)."""
+        self.html_parsed: bool = False
+        """Разобран ли HTML сообщения при получении (заполнены ли author_link_text и time_texts)."""
+        self.author_link_text: str | None = None
+        """Никнейм из ссылки на автора сообщения (chat-msg-author-link), если есть."""
+        self.time_texts: list[str] | None = None
+        """Строки с датой / временем отправки из HTML сообщения (атрибуты и текст элементов даты)."""
 
         BaseOrderInfo.__init__(self)
 
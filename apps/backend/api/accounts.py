@@ -145,14 +145,12 @@ def list_accounts(workspace_id: int | None = None, user=Depends(get_current_user
     if ws_id is not None:
         _ensure_workspace(ws_id, user_id)
 
-    cached_items = accounts_cache.get_list(user_id, ws_id, low_priority=False)
-    if cached_items is not None:
-        return AccountListResponse(items=[AccountItem(**item) for item in cached_items])
+    def load_items() -> list[dict]:
+        records = accounts_repo.list_by_workspace(user_id, ws_id) if ws_id is not None else accounts_repo.list_by_user(user_id)
+        return [_to_item(item).model_dump() for item in records]
 
-    records = accounts_repo.list_by_workspace(user_id, ws_id) if ws_id is not None else accounts_repo.list_by_user(user_id)
-    items = [_to_item(item) for item in records]
-    accounts_cache.set_list(user_id, ws_id, [item.model_dump() for item in items], low_priority=False)
-    return AccountListResponse(items=items)
+    cached_items = accounts_cache.get_or_load_list(user_id, ws_id, load_items, low_priority=False)
+    return AccountListResponse(items=[AccountItem(**item) for item in cached_items])
 
 
 @router.get("/accounts/low-priority", response_model=AccountListResponse)
@@ -165,14 +163,12 @@ def list_low_priority_accounts(
     if ws_id is not None:
         _ensure_workspace(ws_id, user_id)
 
-    cached_items = accounts_cache.get_list(user_id, ws_id, low_priority=True)
-    if cached_items is not None:
-        return AccountListResponse(items=[AccountItem(**item) for item in cached_items])
+    def load_items() -> list[dict]:
+        records = accounts_repo.list_low_priority(user_id, ws_id)
+        return [_to_item(item).model_dump() for item in records]
 
-    records = accounts_repo.list_low_priority(user_id, ws_id)
-    items = [_to_item(item) for item in records]
-    accounts_cache.set_list(user_id, ws_id, [item.model_dump() for item in items], low_priority=True)
-    return AccountListResponse(items=items)
+    cached_items = accounts_cache.get_or_load_list(user_id, ws_id, load_items, low_priority=True)
+    return AccountListResponse(items=[AccountItem(**item) for item in cached_items])
 
 
 @router.post("/accounts", response_model=AccountItem, status_code=status.HTTP_201_CREATED)
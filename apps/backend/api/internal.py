@@ -7,6 +7,7 @@ from pydantic import BaseModel, Field
 
 from db.account_repo import MySQLAccountRepo
 from db.notifications_repo import MySQLNotificationsRepo
+from services.cache_service import cache_stats
 from services.chat_notify import notify_owner
 from services.steam_service import SteamWorkerError, deauthorize_sessions
 
@@ -43,6 +44,11 @@ class InternalExpireRequest(BaseModel):
     confirm_url: str | None = None
 
 
+@router.get("/internal/cache/stats", dependencies=[Depends(_require_worker_token)])
+def internal_cache_stats() -> dict:
+    return {"caches": cache_stats()}
+
+
 @router.post("/internal/rentals/expire", dependencies=[Depends(_require_worker_token)])
 def internal_rental_expire(payload: InternalExpireRequest) -> dict:
     account = accounts_repo.get_by_id(int(payload.account_id), int(payload.user_id), int(payload.workspace_id))
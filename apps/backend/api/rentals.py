@@ -154,68 +154,69 @@ def list_active_rentals(workspace_id: int | None = None, user=Depends(get_curren
         workspace = workspace_repo.get_by_id(int(workspace_id), user_id)
         if not workspace:
             raise HTTPException(status_code=400, detail="Select a workspace for rentals.")
-    cached_items = rentals_cache.get(user_id, workspace_id)
-    if cached_items is not None:
-        return ActiveRentalResponse(items=[ActiveRentalItem(**item) for item in cached_items])
 
-    records = accounts_repo.list_active_rentals(user_id, workspace_id)
-    workspace_name_map: dict[int, str] = {}
-    if workspace_id is None:
-        workspace_name_map = {ws.id: ws.name for ws in workspace_repo.list_by_user(user_id)}
-    elif workspace:
-        workspace_name_map = {int(workspace.id): workspace.name}
-    items: list[ActiveRentalItem] = []
-    for record in records:
-        if record.workspace_id is not None:
-            record.workspace_name = workspace_name_map.get(int(record.workspace_id))
-        total_minutes = (
-            int(record.rental_duration_minutes or 0)
-            if record.rental_duration_minutes is not None
-            else int(record.rental_duration or 0) * 60
-        )
-        started_at = _parse_datetime(record.rental_start)
-        if _is_rental_expired(started_at, total_minutes) and not int(record.rental_frozen or 0):
-            # Important: don't mutate DB state from a read endpoint.
-            #
-            # Auto-release here races the FunPay worker's rental monitor, which is responsible
-            # for sending the "rental expired" chat message and (optionally) deauthorizing
-            # Steam sessions before releasing the account.
-            continue
-        started_label, time_left_label = _format_time_left(started_at, total_minutes)
-        steam_id = _steam_id_from_mafile(record.mafile_json)
-        presence = fetch_presence(steam_id, user_id=user_id, bridge_id=default_bridge_id)
-        status = "Frozen" if int(getattr(record, "rental_frozen", 0) or 0) else presence_status_label(presence)
-        hero = ""
-        match_time = ""
-        if presence:
-            derived = presence.get("derived") if isinstance(presence.get("derived"), dict) else {}
-            hero = str(
-                derived.get("hero_name")
-                or presence.get("hero_name")
-                or presence.get("hero")
-                or ""
-            )
-            match_time = str(
-                derived.get("match_time")
-                or presence.get("match_time")
-                or ""
+    # Dashboard tabs poll this together: one request computes, the others share its result.
+    def load_items() -> list[dict]:
+        records = accounts_repo.list_active_rentals(user_id, workspace_id)
+        workspace_name_map: dict[int, str] = {}
+        if workspace_id is None:
+            workspace_name_map = {ws.id: ws.name for ws in workspace_repo.list_by_user(user_id)}
+        elif workspace:
+            workspace_name_map = {int(workspace.id): workspace.name}
+        items: list[ActiveRentalItem] = []
+        for record in records:
+            if record.workspace_id is not None:
+                record.workspace_name = workspace_name_map.get(int(record.workspace_id))
+            total_minutes = (
+                int(record.rental_duration_minutes or 0)
+                if record.rental_duration_minutes is not None
+                else int(record.rental_duration or 0) * 60
             )
-        items.append(
-            ActiveRentalItem(
-                id=record.id,
-                account=_account_label(record),
-                buyer=record.owner,
-                started=started_label,
-                time_left=time_left_label,
-                workspace_id=record.workspace_id,
-                workspace_name=record.workspace_name,
-                match_time=match_time,
-                hero=hero,
-                status=status,
+            started_at = _parse_datetime(record.rental_start)
+            if _is_rental_expired(started_at, total_minutes) and not int(record.rental_frozen or 0):
+                # Important: don't mutate DB state from a read endpoint.
+                #
+                # Auto-release here races the FunPay worker's rental monitor, which is responsible
+                # for sending the "rental expired" chat message and (optionally) deauthorizing
+                # Steam sessions before releasing the account.
+                continue
+            started_label, time_left_label = _format_time_left(started_at, total_minutes)
+            steam_id = _steam_id_from_mafile(record.mafile_json)
+            presence = fetch_presence(steam_id, user_id=user_id, bridge_id=default_bridge_id)
+            status = "Frozen" if int(getattr(record, "rental_frozen", 0) or 0) else presence_status_label(presence)
+            hero = ""
+            match_time = ""
+            if presence:
+                derived = presence.get("derived") if isinstance(presence.get("derived"), dict) else {}
+                hero = str(
+                    derived.get("hero_name")
+                    or presence.get("hero_name")
+                    or presence.get("hero")
+                    or ""
+                )
+                match_time = str(
+                    derived.get("match_time")
+                    or presence.get("match_time")
+                    or ""
+                )
+            items.append(
+                ActiveRentalItem(
+                    id=record.id,
+                    account=_account_label(record),
+                    buyer=record.owner,
+                    started=started_label,
+                    time_left=time_left_label,
+                    workspace_id=record.workspace_id,
+                    workspace_name=record.workspace_name,
+                    match_time=match_time,
+                    hero=hero,
+                    status=status,
+                )
             )
-        )
-    rentals_cache.set(user_id, [item.model_dump() for item in items], workspace_id)
-    return ActiveRentalResponse(items=items)
+        return [item.model_dump() for item in items]
+
+    cached_items = rentals_cache.get_or_load(user_id, load_items, workspace_id)
+    return ActiveRentalResponse(items=[ActiveRentalItem(**item) for item in cached_items])
 
 
 @router.post("/rentals/deauthorize/all", response_model=DeauthorizeAllResponse)
@@ -326,6 +327,7 @@ def freeze_rental(
         )
         if not ok:
             raise HTTPException(status_code=400, detail="Failed to freeze rental")
+        rentals_cache.clear_user(int(user.id))
         mafile_json = account.get("mafile_json")
         if mafile_json:
             try:
@@ -375,6 +377,7 @@ def freeze_rental(
     )
     if not ok:
         raise HTTPException(status_code=400, detail="Failed to unfreeze rental")
+    rentals_cache.clear_user(int(user.id))
     notify_owner(
         user_id=int(user.id),
         workspace_id=int(workspace_id),
@@ -475,6 +478,7 @@ def replace_rental(
     if not ok:
         log_replacement_event("failed", "Failed to replace rental.", account)
         raise HTTPException(status_code=400, detail="Failed to replace rental")
+    rentals_cache.clear_user(int(user.id))
 
     mafile_json = account.get("mafile_json")
     if mafile_json:
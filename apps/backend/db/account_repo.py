@@ -8,6 +8,7 @@ import mysql.connector
 from mysql.connector import errorcode
 
 from db.mysql import get_base_connection
+from db.schema import column_exists, table_exists
 
 
 @dataclass
@@ -67,20 +68,10 @@ class MySQLAccountRepo:
         return get_base_connection()
 
     def _column_exists(self, cursor: mysql.connector.cursor.MySQLCursor, column: str) -> bool:
-        cursor.execute(
-            "SELECT 1 FROM information_schema.columns "
-            "WHERE table_schema = DATABASE() AND table_name = 'accounts' AND column_name = %s LIMIT 1",
-            (column,),
-        )
-        return cursor.fetchone() is not None
+        return column_exists(cursor, "accounts", column)
 
     def _table_exists(self, cursor: mysql.connector.cursor.MySQLCursor, table: str) -> bool:
-        cursor.execute(
-            "SELECT 1 FROM information_schema.tables "
-            "WHERE table_schema = DATABASE() AND table_name = %s LIMIT 1",
-            (table,),
-        )
-        return cursor.fetchone() is not None
+        return table_exists(cursor, table)
 
     def get_by_id(self, account_id: int, user_id: int, workspace_id: int | None = None) -> Optional[dict]:
         conn = self._get_conn()
@@ -7,6 +7,7 @@ import mysql.connector
 from mysql.connector import errorcode
 
 from db.mysql import get_base_connection
+from db.schema import table_columns, table_exists
 
 
 @dataclass
@@ -37,28 +38,11 @@ class BlacklistLog:
 class MySQLBlacklistRepo:
     @staticmethod
     def _table_exists(cursor: mysql.connector.cursor.MySQLCursor, table_name: str) -> bool:
-        cursor.execute(
-            """
-            SELECT 1
-            FROM information_schema.tables
-            WHERE table_schema = DATABASE() AND table_name = %s
-            LIMIT 1
-            """,
-            (table_name,),
-        )
-        return cursor.fetchone() is not None
+        return table_exists(cursor, table_name)
 
     @staticmethod
-    def _get_table_columns(cursor: mysql.connector.cursor.MySQLCursor, table_name: str) -> set[str]:
-        cursor.execute(
-            """
-            SELECT column_name
-            FROM information_schema.columns
-            WHERE table_schema = DATABASE() AND table_name = %s
-            """,
-            (table_name,),
-        )
-        return {row[0] for row in cursor.fetchall() or []}
+    def _get_table_columns(cursor: mysql.connector.cursor.MySQLCursor, table_name: str) -> frozenset[str]:
+        return table_columns(cursor, table_name)
 
     def _get_conn(self) -> mysql.connector.MySQLConnection:
         return get_base_connection()
@@ -48,6 +48,7 @@ DEFAULT_BOT_SETTINGS: dict[str, Any] = {
         "model": "",
         "temperature": 0.7,
         "max_tokens": 450,
+        "reply_debounce_seconds": 3,
     },
 }
 
@@ -7,6 +7,10 @@ from typing import Optional
 import mysql.connector
 
 from db.mysql import get_base_connection
+from services.chat_outbox_events import ChatOutboxEvents
+
+
+_outbox_events = ChatOutboxEvents()
 
 
 @dataclass
@@ -233,9 +237,11 @@ class MySQLChatRepo:
                 (int(chat_id), text, int(user_id), int(workspace_id)),
             )
             conn.commit()
-            return int(cursor.lastrowid)
+            outbox_id = int(cursor.lastrowid)
         finally:
             conn.close()
+        _outbox_events.publish(user_id=int(user_id), workspace_id=int(workspace_id), outbox_id=outbox_id)
+        return outbox_id
 
     def mark_chat_read(self, user_id: int, workspace_id: int, chat_id: int) -> None:
         conn = self._get_conn()
@@ -221,7 +221,9 @@ def ensure_schema() -> None:
                 rental_frozen TINYINT(1) NOT NULL DEFAULT 0,
                 rental_frozen_at DATETIME NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
                 INDEX idx_accounts_user (user_id),
+                INDEX idx_accounts_user_updated (user_id, updated_at),
                 INDEX idx_accounts_workspace (workspace_id),
                 INDEX idx_accounts_owner (owner),
                 UNIQUE KEY uniq_account_workspace_name (workspace_id, account_name),
@@ -266,6 +268,27 @@ def ensure_schema() -> None:
         )
         if cursor.fetchone() is None:
             cursor.execute("ALTER TABLE accounts ADD COLUMN last_code_at DATETIME NULL AFTER rental_assigned_at")
+        cursor.execute(
+            """
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = 'accounts' AND column_name = 'updated_at'
+            LIMIT 1
+            """
+        )
+        if cursor.fetchone() is None:
+            cursor.execute(
+                "ALTER TABLE accounts ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP "
+                "ON UPDATE CURRENT_TIMESTAMP AFTER created_at"
+            )
+        cursor.execute(
+            """
+            SELECT 1 FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = 'accounts' AND index_name = 'idx_accounts_user_updated'
+            LIMIT 1
+            """
+        )
+        if cursor.fetchone() is None:
+            cursor.execute("ALTER TABLE accounts ADD INDEX idx_accounts_user_updated (user_id, updated_at)")
         cursor.execute(
             """
             CREATE TABLE IF NOT EXISTS lots (
@@ -1000,6 +1023,7 @@ def ensure_schema() -> None:
                 workspace_id BIGINT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 sent_at TIMESTAMP NULL,
+                claimed_at TIMESTAMP NULL,
                 INDEX idx_outbox_status (status, user_id, workspace_id),
                 INDEX idx_outbox_status_id (status, user_id, workspace_id, id)
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -1037,6 +1061,15 @@ def ensure_schema() -> None:
         )
         if cursor.fetchone() is None:
             cursor.execute("ALTER TABLE chat_outbox ADD INDEX idx_outbox_status_id (status, user_id, workspace_id, id)")
+        cursor.execute(
+            """
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = 'chat_outbox' AND column_name = 'claimed_at'
+            LIMIT 1
+            """
+        )
+        if cursor.fetchone() is None:
+            cursor.execute("ALTER TABLE chat_outbox ADD COLUMN claimed_at TIMESTAMP NULL AFTER sent_at")
         cursor.execute(
             """
             CREATE TABLE IF NOT EXISTS chat_ai_memory (
@@ -1054,6 +1087,21 @@ def ensure_schema() -> None:
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
             """
         )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chat_ai_memory_tokens (
+                memory_id BIGINT NOT NULL,
+                user_id BIGINT NOT NULL,
+                workspace_id BIGINT NULL,
+                chat_id BIGINT NOT NULL,
+                token VARCHAR(32) NOT NULL,
+                PRIMARY KEY (memory_id, token),
+                INDEX idx_ai_memory_token (user_id, workspace_id, chat_id, token),
+                CONSTRAINT fk_ai_memory_token_memory FOREIGN KEY (memory_id)
+                    REFERENCES chat_ai_memory(id) ON DELETE CASCADE
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+            """
+        )
         conn.commit()
     finally:
         conn.close()
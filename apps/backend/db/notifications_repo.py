@@ -30,13 +30,13 @@ class NotificationLog:
 
 class MySQLNotificationsRepo:
     @staticmethod
-    def _list_cache_key(user_id: int, workspace_id: int | None, limit: int) -> str:
+    def _list_cache_key(workspace_id: int | None, limit: int) -> str:
         ws = "all" if workspace_id is None else str(int(workspace_id))
-        return f"notifications:list:{int(user_id)}:{ws}:{int(limit)}"
+        return f"{ws}:{int(limit)}"
 
     @staticmethod
-    def _list_cache_pattern(user_id: int) -> str:
-        return f"notifications:list:{int(user_id)}:*"
+    def _list_cache_namespace(user_id: int) -> str:
+        return f"notifications:list:{int(user_id)}"
 
     def list_notifications(
         self,
@@ -45,8 +45,9 @@ class MySQLNotificationsRepo:
         limit: int = 200,
     ) -> list[NotificationLog]:
         safe_limit = int(max(1, min(limit, 500)))
-        cache_key = self._list_cache_key(user_id, workspace_id, safe_limit)
-        cached = _cache.get_json(cache_key)
+        cache_key = self._list_cache_key(workspace_id, safe_limit)
+        cache_namespace = self._list_cache_namespace(user_id)
+        cached = _cache.get_json(cache_key, namespace=cache_namespace)
         if isinstance(cached, list):
             return [NotificationLog(**item) for item in cached if isinstance(item, dict)]
 
@@ -90,7 +91,7 @@ class MySQLNotificationsRepo:
                 )
                 for row in rows
             ]
-            _cache.set_json(cache_key, [item.__dict__ for item in items], ttl_seconds=20)
+            _cache.set_json(cache_key, [item.__dict__ for item in items], ttl_seconds=20, namespace=cache_namespace)
             return items
         finally:
             conn.close()
@@ -134,6 +135,6 @@ class MySQLNotificationsRepo:
                 ),
             )
             conn.commit()
-            _cache.delete_pattern(self._list_cache_pattern(user_id))
+            _cache.invalidate(self._list_cache_namespace(user_id))
         finally:
             conn.close()
@@ -6,6 +6,7 @@ from typing import Optional
 import mysql.connector
 
 from db.mysql import get_base_connection
+from db.schema import column_exists
 from services.query_cache import QueryCache
 
 
@@ -35,14 +36,14 @@ class OrderHistoryItem:
 
 class MySQLOrderHistoryRepo:
     @staticmethod
-    def _history_cache_key(user_id: int, workspace_id: int | None, query: str | None, limit: int) -> str:
+    def _history_cache_key(workspace_id: int | None, query: str | None, limit: int) -> str:
         ws = "all" if workspace_id is None else str(int(workspace_id))
         q = (query or "").strip().lower() or "_"
-        return f"orders:history:{int(user_id)}:{ws}:{int(limit)}:{q}"
+        return f"{ws}:{int(limit)}:{q}"
 
     @staticmethod
-    def _history_cache_pattern(user_id: int) -> str:
-        return f"orders:history:{int(user_id)}:*"
+    def _history_cache_namespace(user_id: int) -> str:
+        return f"orders:history:{int(user_id)}"
 
     def _get_conn(self) -> mysql.connector.MySQLConnection:
         return get_base_connection()
@@ -60,15 +61,7 @@ class MySQLOrderHistoryRepo:
 
     @staticmethod
     def _column_exists(cursor: mysql.connector.cursor.MySQLCursor, column: str) -> bool:
-        cursor.execute(
-            """
-            SELECT 1 FROM information_schema.columns
-            WHERE table_schema = DATABASE() AND table_name = 'order_history' AND column_name = %s
-            LIMIT 1
-            """,
-            (column,),
-        )
-        return cursor.fetchone() is not None
+        return column_exists(cursor, "order_history", column)
 
     def resolve_order(
         self,
@@ -202,9 +195,10 @@ class MySQLOrderHistoryRepo:
         safe_limit = int(max(1, min(limit, 500)))
         query_value = query.strip() if isinstance(query, str) else None
         use_cache = not query_value
-        cache_key = self._history_cache_key(user_id, workspace_id, query_value, safe_limit)
+        cache_key = self._history_cache_key(workspace_id, query_value, safe_limit)
+        cache_namespace = self._history_cache_namespace(user_id)
         if use_cache:
-            cached = _cache.get_json(cache_key)
+            cached = _cache.get_json(cache_key, namespace=cache_namespace)
             if isinstance(cached, list):
                 return [OrderHistoryItem(**item) for item in cached if isinstance(item, dict)]
 
@@ -265,7 +259,7 @@ class MySQLOrderHistoryRepo:
                 for row in rows
             ]
             if use_cache:
-                _cache.set_json(cache_key, [item.__dict__ for item in items], ttl_seconds=20)
+                _cache.set_json(cache_key, [item.__dict__ for item in items], ttl_seconds=20, namespace=cache_namespace)
             return items
         finally:
             conn.close()
@@ -458,6 +452,6 @@ class MySQLOrderHistoryRepo:
                         ),
                     )
             conn.commit()
-            _cache.delete_pattern(self._history_cache_pattern(user_id))
+            _cache.invalidate(self._history_cache_namespace(user_id))
         finally:
             conn.close()
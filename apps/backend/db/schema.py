@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+import mysql.connector
+
+from db.mysql import get_base_connection
+
+
+class SchemaSnapshot:
+    # Table/column metadata for the backend database, loaded with a single
+    # information_schema query and reused until the TTL expires. A lookup that misses
+    # may reload early (at most once per miss_recheck_seconds) so tables created by the
+    # worker after startup are still picked up quickly.
+    def __init__(self, *, ttl_seconds: int, miss_recheck_seconds: int) -> None:
+        self.ttl_seconds = max(1, int(ttl_seconds))
+        self.miss_recheck_seconds = max(0, int(miss_recheck_seconds))
+        self._columns: dict[str, frozenset[str]] = {}
+        self._loaded_at: float | None = None
+        self._lock = threading.Lock()
+
+    def _load(self, cursor: mysql.connector.cursor.MySQLCursor) -> None:
+        cursor.execute(
+            "SELECT table_name AS table_name, column_name AS column_name "
+            "FROM information_schema.columns WHERE table_schema = DATABASE()"
+        )
+        columns: dict[str, set[str]] = {}
+        for row in cursor.fetchall() or []:
+            if isinstance(row, dict):
+                table_name, column_name = row.get("table_name"), row.get("column_name")
+            else:
+                table_name, column_name = row[0], row[1]
+            if isinstance(table_name, (bytes, bytearray)):
+                table_name = table_name.decode()
+            if isinstance(column_name, (bytes, bytearray)):
+                column_name = column_name.decode()
+            if not table_name or not column_name:
+                continue
+            columns.setdefault(str(table_name).lower(), set()).add(str(column_name).lower())
+        self._columns = {table: frozenset(names) for table, names in columns.items()}
+        self._loaded_at = time.monotonic()
+
+    def _refresh(self, cursor: mysql.connector.cursor.MySQLCursor, max_age: float) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < max_age:
+            return
+        with self._lock:
+            loaded_at = self._loaded_at
+            if loaded_at is None or time.monotonic() - loaded_at >= max_age:
+                self._load(cursor)
+
+    def columns(self, cursor: mysql.connector.cursor.MySQLCursor, table: str) -> frozenset[str] | None:
+        key = table.lower()
+        self._refresh(cursor, self.ttl_seconds)
+        found = self._columns.get(key)
+        if found is None and self.miss_recheck_seconds:
+            self._refresh(cursor, self.miss_recheck_seconds)
+            found = self._columns.get(key)
+        return found
+
+    def has_column(self, cursor: mysql.connector.cursor.MySQLCursor, table: str, column: str) -> bool:
+        found = self.columns(cursor, table)
+        if found is None:
+            return False
+        if column.lower() in found:
+            return True
+        if self.miss_recheck_seconds:
+            self._refresh(cursor, self.miss_recheck_seconds)
+            return column.lower() in self._columns.get(table.lower(), frozenset())
+        return False
+
+    def reload(self, cursor: mysql.connector.cursor.MySQLCursor) -> None:
+        with self._lock:
+            self._load(cursor)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+
+_snapshot = SchemaSnapshot(
+    ttl_seconds=int(os.getenv("SCHEMA_CACHE_TTL_SECONDS", "3600")),
+    miss_recheck_seconds=int(os.getenv("SCHEMA_MISS_RECHECK_SECONDS", "60")),
+)
+
+
+def table_exists(cursor: mysql.connector.cursor.MySQLCursor, table: str) -> bool:
+    return _snapshot.columns(cursor, table) is not None
+
+
+def column_exists(cursor: mysql.connector.cursor.MySQLCursor, table: str, column: str) -> bool:
+    return _snapshot.has_column(cursor, table, column)
+
+
+def table_columns(cursor: mysql.connector.cursor.MySQLCursor, table: str) -> frozenset[str]:
+    return _snapshot.columns(cursor, table) or frozenset()
+
+
+def invalidate_schema() -> None:
+    _snapshot.invalidate()
+
+
+def load_schema() -> None:
+    conn = get_base_connection()
+    try:
+        _snapshot.reload(conn.cursor())
+    finally:
+        conn.close()
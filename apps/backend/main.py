@@ -24,6 +24,7 @@ from api.workspaces import router as workspaces_router
 from api.plugins import router as plugins_router, start_price_dumper_scheduler
 from services.cleanup_service import start_cleanup_scheduler
 from db.mysql import ensure_schema
+from db.schema import load_schema
 from settings.config import settings
 
 app = FastAPI(title="FunpayAutomationV2 API")
@@ -40,6 +41,7 @@ def _ensure_required_prod_env() -> None:
 def _startup() -> None:
     _ensure_required_prod_env()
     ensure_schema()
+    load_schema()
     start_price_dumper_scheduler()
     start_cleanup_scheduler()
 
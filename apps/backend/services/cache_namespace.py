@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import os
+
+import redis
+
+# Cached keys embed the generation of their namespace ("<namespace>:g<gen>:<suffix>"), so a
+# whole namespace is invalidated with one INCR of "<namespace>:gen" instead of a SCAN. Old
+# generations are never read again and expire on their own TTL. The generation key outlives
+# every cached value, so a generation number is only reused after its keys are gone.
+NAMESPACE_GEN_TTL_SECONDS = int(os.getenv("CACHE_NAMESPACE_GEN_TTL_SECONDS", "86400"))
+
+
+def generation_key(namespace: str) -> str:
+    return f"{namespace}:gen"
+
+
+def namespaced_key(namespace: str, generation: int, suffix: str) -> str:
+    return f"{namespace}:g{int(generation)}:{suffix}"
+
+
+def read_generation(client: redis.Redis, namespace: str) -> int:
+    generation = client.get(generation_key(namespace))
+    return int(generation) if generation else 0
+
+
+def bump_namespaces(client: redis.Redis, *namespaces: str) -> list[int]:
+    if not namespaces:
+        return []
+    pipe = client.pipeline(transaction=False)
+    for namespace in namespaces:
+        pipe.incr(generation_key(namespace))
+        pipe.expire(generation_key(namespace), NAMESPACE_GEN_TTL_SECONDS)
+    return [int(generation) for generation in pipe.execute()[0::2]]
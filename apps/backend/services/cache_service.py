@@ -0,0 +1,433 @@
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import redis
+
+from services.cache_namespace import bump_namespaces, namespaced_key, read_generation
+
+logger = logging.getLogger("backend.cache")
+
+# L2 values are "<tag><fresh-until unix time><payload>": compact JSON, zlib-compressed once it
+# is big enough to be worth it. JSON rather than pickle, so nothing read back from a shared
+# Redis is ever executed.
+_HEADER = struct.Struct(">cd")
+_TAG_JSON = b"j"
+_TAG_ZLIB = b"z"
+
+_RELEASE_LOCK = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+
+def encode_value(value: Any, fresh_until: float, *, compress_min_bytes: int = 1024) -> bytes:
+    payload = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    tag = _TAG_JSON
+    if len(payload) >= compress_min_bytes:
+        payload = zlib.compress(payload, 6)
+        tag = _TAG_ZLIB
+    return _HEADER.pack(tag, fresh_until) + payload
+
+
+def decode_value(raw: bytes | None) -> Optional[tuple[float, Any]]:
+    if not raw or len(raw) < _HEADER.size:
+        return None
+    try:
+        tag, fresh_until = _HEADER.unpack_from(raw)
+        payload = raw[_HEADER.size:]
+        if tag == _TAG_ZLIB:
+            payload = zlib.decompress(payload)
+        elif tag != _TAG_JSON:
+            return None
+        return fresh_until, json.loads(payload)
+    except Exception:
+        return None
+
+
+class CacheMetrics:
+    def __init__(self) -> None:
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.loads = 0
+        self.errors = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        hits = self.l1_hits + self.l2_hits + self.stale_hits
+        lookups = hits + self.misses
+        return {
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "loads": self.loads,
+            "errors": self.errors,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.failed = False
+
+
+class CacheService:
+    # Two-tier cache shared by the backend list caches. L1 is a small in-process LRU in front
+    # of Redis (L2, one connection pool per process). Keys carry their namespace generation
+    # (services/cache_namespace.py), so an L1 entry can never outlive an invalidation made by
+    # another process. get_or_load() adds:
+    # - single flight: concurrent misses for a key wait for one loader, in this process via an
+    #   event and across processes via a short Redis lock;
+    # - stale-while-revalidate: for stale_seconds after expiry the old value is served while
+    #   one background refresh recomputes it.
+    # Generations are remembered for generation_ttl_seconds, so an L1 hit costs no Redis round
+    # trip; bumps made here apply at once, bumps from elsewhere within that window.
+    # Namespaces flagged external are also invalidated by the worker, which can only reach them
+    # through Redis, so without Redis they are not cached at all.
+    def __init__(
+        self,
+        redis_url: str | None = None,
+        *,
+        l1_max_entries: int = 2048,
+        l1_ttl_seconds: float = 5.0,
+        stale_seconds: float = 30.0,
+        lock_timeout_seconds: float = 5.0,
+        compress_min_bytes: int = 1024,
+        max_connections: int = 50,
+        refresh_workers: int = 2,
+        generation_ttl_seconds: float = 1.0,
+    ) -> None:
+        self._client: Optional[redis.Redis] = None
+        if redis_url:
+            pool = redis.ConnectionPool.from_url(redis_url, max_connections=max(1, int(max_connections)))
+            self._client = redis.Redis(connection_pool=pool)
+            self._release_lock = self._client.register_script(_RELEASE_LOCK)
+        self.l1_max_entries = max(1, int(l1_max_entries))
+        self.l1_ttl_seconds = max(0.0, float(l1_ttl_seconds))
+        self.stale_seconds = max(0.0, float(stale_seconds))
+        self.lock_timeout_seconds = max(0.1, float(lock_timeout_seconds))
+        self.compress_min_bytes = max(0, int(compress_min_bytes))
+        self.generation_ttl_seconds = max(0.0, float(generation_ttl_seconds))
+        self._generations: OrderedDict[str, tuple[float, int]] = OrderedDict()
+        self._l1: OrderedDict[str, tuple[float, float, Any]] = OrderedDict()
+        self._flights: dict[str, _Flight] = {}
+        self._refreshing: set[str] = set()
+        self._metrics: dict[str, CacheMetrics] = {}
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=max(1, int(refresh_workers)), thread_name_prefix="cache-refresh")
+
+    @property
+    def client(self) -> Optional[redis.Redis]:
+        return self._client
+
+    def get(self, namespace: str | None, suffix: str, *, external: bool = False) -> Any | None:
+        if external and self._client is None:
+            return None
+        metrics = self._metrics_for(namespace, suffix)
+        try:
+            key = self._key(namespace, suffix)
+        except Exception:
+            metrics.errors += 1
+            return None
+        found = self._lookup(key, metrics)
+        if found is None or found[0] <= time.time():
+            metrics.misses += 1
+            return None
+        return found[1]
+
+    def set(
+        self,
+        namespace: str | None,
+        suffix: str,
+        value: Any,
+        ttl_seconds: float,
+        *,
+        stale_seconds: float = 0.0,
+        external: bool = False,
+    ) -> None:
+        if external and self._client is None:
+            return
+        metrics = self._metrics_for(namespace, suffix)
+        try:
+            self._store(self._key(namespace, suffix), value, ttl_seconds, stale_seconds)
+        except Exception:
+            metrics.errors += 1
+
+    def get_or_load(
+        self,
+        namespace: str | None,
+        suffix: str,
+        loader: Callable[[], Any],
+        ttl_seconds: float,
+        *,
+        stale_seconds: float | None = None,
+    ) -> Any:
+        stale_seconds = self.stale_seconds if stale_seconds is None else max(0.0, float(stale_seconds))
+        metrics = self._metrics_for(namespace, suffix)
+        try:
+            key = self._key(namespace, suffix)
+        except Exception:
+            metrics.errors += 1
+            return loader()
+        found = self._lookup(key, metrics)
+        if found is not None:
+            fresh_until, value = found
+            if fresh_until > time.time():
+                return value
+            metrics.stale_hits += 1
+            self._refresh_later(key, loader, ttl_seconds, stale_seconds, metrics)
+            return value
+        metrics.misses += 1
+        return self._load(key, loader, ttl_seconds, stale_seconds, metrics)
+
+    def invalidate(self, *namespaces: str) -> None:
+        if not namespaces:
+            return
+        if self._client is None:
+            with self._lock:
+                for namespace in namespaces:
+                    generation = self._generations.get(namespace, (0.0, 0))[1]
+                    self._remember_generation(namespace, generation + 1, expires_at=math.inf)
+            return
+        try:
+            generations = bump_namespaces(self._client, *namespaces)
+        except Exception:
+            with self._lock:
+                for namespace in namespaces:
+                    self._generations.pop(namespace, None)
+            logger.warning("Cache invalidation failed for %s.", ", ".join(namespaces), exc_info=True)
+            return
+        expires_at = time.monotonic() + self.generation_ttl_seconds
+        with self._lock:
+            for namespace, generation in zip(namespaces, generations):
+                self._remember_generation(namespace, generation, expires_at=expires_at)
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            items = list(self._metrics.items())
+            l1_size = len(self._l1)
+        stats = {name: metrics.snapshot() for name, metrics in items}
+        stats["_l1"] = {"size": l1_size, "max_entries": self.l1_max_entries}
+        return stats
+
+    def _key(self, namespace: str | None, suffix: str) -> str:
+        if not namespace:
+            return suffix
+        now = time.monotonic()
+        with self._lock:
+            cached = self._generations.get(namespace)
+            if cached is not None and cached[0] > now:
+                self._generations.move_to_end(namespace)
+                return namespaced_key(namespace, cached[1], suffix)
+        if self._client is None:
+            return namespaced_key(namespace, 0, suffix)
+        generation = read_generation(self._client, namespace)
+        with self._lock:
+            self._remember_generation(namespace, generation, expires_at=now + self.generation_ttl_seconds)
+        return namespaced_key(namespace, generation, suffix)
+
+    def _remember_generation(self, namespace: str, generation: int, *, expires_at: float) -> None:
+        # Called with the lock held.
+        self._generations[namespace] = (expires_at, generation)
+        self._generations.move_to_end(namespace)
+        while len(self._generations) > self.l1_max_entries:
+            self._generations.popitem(last=False)
+
+    def _metrics_for(self, namespace: str | None, suffix: str) -> CacheMetrics:
+        # Metrics are grouped by the first two key segments, e.g. "rentals:active".
+        name = ":".join((namespace or suffix).split(":")[:2])
+        metrics = self._metrics.get(name)
+        if metrics is None:
+            with self._lock:
+                metrics = self._metrics.setdefault(name, CacheMetrics())
+        return metrics
+
+    def _lookup(self, key: str, metrics: CacheMetrics) -> Optional[tuple[float, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is not None:
+                fresh_until, expires_at, value = entry
+                if expires_at > now:
+                    self._l1.move_to_end(key)
+                    if fresh_until > now:
+                        metrics.l1_hits += 1
+                    return fresh_until, value
+                del self._l1[key]
+        found = self._read_l2(key, metrics)
+        if found is None:
+            return None
+        fresh_until, value = found
+        if fresh_until > now:
+            metrics.l2_hits += 1
+            self._set_l1(key, fresh_until, value)
+        return found
+
+    def _read_l2(self, key: str, metrics: CacheMetrics) -> Optional[tuple[float, Any]]:
+        if self._client is None:
+            return None
+        try:
+            raw = self._client.get(key)
+        except Exception:
+            metrics.errors += 1
+            return None
+        return decode_value(raw)
+
+    def _set_l1(self, key: str, fresh_until: float, value: Any) -> None:
+        # The L1 lifetime is capped so that, without Redis, other processes catch up quickly.
+        expires_at = min(fresh_until + self.stale_seconds, time.time() + self.l1_ttl_seconds)
+        with self._lock:
+            self._l1[key] = (fresh_until, expires_at, value)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _store(self, key: str, value: Any, ttl_seconds: float, stale_seconds: float) -> None:
+        ttl_seconds = max(1.0, float(ttl_seconds))
+        fresh_until = time.time() + ttl_seconds
+        self._set_l1(key, fresh_until, value)
+        if self._client is not None:
+            blob = encode_value(value, fresh_until, compress_min_bytes=self.compress_min_bytes)
+            self._client.set(key, blob, ex=int(math.ceil(ttl_seconds + max(0.0, stale_seconds))))
+
+    def _load(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl_seconds: float,
+        stale_seconds: float,
+        metrics: CacheMetrics,
+    ) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            metrics.coalesced += 1
+            if flight.done.wait(self.lock_timeout_seconds) and not flight.failed:
+                return flight.value
+            return loader()
+        try:
+            flight.value = self._load_shared(key, loader, ttl_seconds, stale_seconds, metrics)
+            return flight.value
+        except BaseException:
+            flight.failed = True
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _load_shared(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl_seconds: float,
+        stale_seconds: float,
+        metrics: CacheMetrics,
+    ) -> Any:
+        lock_key = f"{key}:lock"
+        token = os.urandom(8).hex()
+        acquired = False
+        if self._client is not None:
+            try:
+                acquired = bool(self._client.set(lock_key, token, nx=True, px=int(self.lock_timeout_seconds * 1000)))
+            except Exception:
+                metrics.errors += 1
+                acquired = True
+            if not acquired:
+                # Another process is computing the same key: wait for its result.
+                deadline = time.monotonic() + self.lock_timeout_seconds
+                while time.monotonic() < deadline:
+                    time.sleep(0.05)
+                    found = self._read_l2(key, metrics)
+                    if found is not None and found[0] > time.time():
+                        metrics.coalesced += 1
+                        self._set_l1(key, found[0], found[1])
+                        return found[1]
+        try:
+            value = loader()
+            metrics.loads += 1
+            try:
+                self._store(key, value, ttl_seconds, stale_seconds)
+            except Exception:
+                metrics.errors += 1
+            return value
+        finally:
+            if acquired and self._client is not None:
+                try:
+                    self._release_lock(keys=[lock_key], args=[token])
+                except Exception:
+                    pass
+
+    def _refresh_later(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl_seconds: float,
+        stale_seconds: float,
+        metrics: CacheMetrics,
+    ) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh() -> None:
+            try:
+                self._load(key, loader, ttl_seconds, stale_seconds, metrics)
+            except Exception:
+                metrics.errors += 1
+                logger.warning("Background cache refresh failed for %s.", key, exc_info=True)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        try:
+            self._refresher.submit(refresh)
+        except RuntimeError:
+            with self._lock:
+                self._refreshing.discard(key)
+
+
+_service: Optional[CacheService] = None
+_service_lock = threading.Lock()
+
+
+def get_cache_service() -> CacheService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = CacheService(
+                os.getenv("REDIS_URL", "").strip() or None,
+                l1_max_entries=int(os.getenv("CACHE_L1_MAX_ENTRIES", "2048")),
+                l1_ttl_seconds=float(os.getenv("CACHE_L1_TTL_SECONDS", "5")),
+                stale_seconds=float(os.getenv("CACHE_STALE_SECONDS", "30")),
+                lock_timeout_seconds=float(os.getenv("CACHE_LOCK_TIMEOUT_SECONDS", "5")),
+                compress_min_bytes=int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024")),
+                max_connections=int(os.getenv("CACHE_REDIS_MAX_CONNECTIONS", "50")),
+                generation_ttl_seconds=float(os.getenv("CACHE_GENERATION_TTL_SECONDS", "1")),
+            )
+        return _service
+
+
+def get_redis_client() -> Optional[redis.Redis]:
+    return get_cache_service().client
+
+
+def cache_stats() -> dict[str, dict[str, Any]]:
+    return get_cache_service().stats()
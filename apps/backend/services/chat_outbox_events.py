@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+import redis
+
+from services.cache_service import get_redis_client
+
+
+CHAT_OUTBOX_STREAM_KEY = os.getenv("CHAT_OUTBOX_STREAM_KEY", "chat:outbox:events")
+
+
+class ChatOutboxEvents:
+    # Every queued panel message is announced on a Redis stream so the workers can send it
+    # right away instead of waiting for their next MySQL poll. A stream (not a list) lets
+    # every worker process read the same event and pick the workspaces it owns.
+    def __init__(self) -> None:
+        self._client: Optional[redis.Redis] = get_redis_client()
+        self._max_len = int(os.getenv("CHAT_OUTBOX_STREAM_MAXLEN", "10000"))
+
+    def publish(self, *, user_id: int, workspace_id: int | None, outbox_id: int) -> None:
+        if not self._client:
+            return
+        try:
+            self._client.xadd(
+                CHAT_OUTBOX_STREAM_KEY,
+                {
+                    "user_id": str(int(user_id)),
+                    "workspace_id": "" if workspace_id is None else str(int(workspace_id)),
+                    "outbox_id": str(int(outbox_id)),
+                },
+                maxlen=max(100, self._max_len),
+                approximate=True,
+            )
+        except Exception:
+            return
@@ -7,6 +7,7 @@ import time
 from typing import Iterable
 
 from db.mysql import get_base_connection
+from db.schema import column_exists, table_exists
 
 
 logger = logging.getLogger("backend.cleanup")
@@ -27,30 +28,6 @@ def _cleanup_enabled() -> bool:
     return raw not in {"0", "false", "no", "off"}
 
 
-def _table_exists(cursor, table: str) -> bool:
-    cursor.execute(
-        """
-        SELECT 1 FROM information_schema.tables
-        WHERE table_schema = DATABASE() AND table_name = %s
-        LIMIT 1
-        """,
-        (table,),
-    )
-    return cursor.fetchone() is not None
-
-
-def _column_exists(cursor, table: str, column: str) -> bool:
-    cursor.execute(
-        """
-        SELECT 1 FROM information_schema.columns
-        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
-        LIMIT 1
-        """,
-        (table, column),
-    )
-    return cursor.fetchone() is not None
-
-
 def _delete_batches(cursor, table: str, column: str, days: int, limit: int) -> int:
     if days <= 0:
         return 0
@@ -87,7 +64,7 @@ def run_cleanup_once() -> dict[str, int]:
     try:
         cursor = conn.cursor()
         for table, column, env_name, default_days in retention:
-            if not _table_exists(cursor, table) or not _column_exists(cursor, table, column):
+            if not table_exists(cursor, table) or not column_exists(cursor, table, column):
                 continue
             days = _env_int(env_name, default_days)
             deleted = _delete_batches(cursor, table, column, days, limit)
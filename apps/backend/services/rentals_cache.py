@@ -1,49 +1,29 @@
 from __future__ import annotations
 
-import json
 import os
-from typing import Any, Optional
+from typing import Any, Callable
 
-import redis
+from services.cache_service import get_cache_service
 
 
 class RentalsCache:
     def __init__(self) -> None:
-        redis_url = os.getenv("REDIS_URL", "").strip()
-        self._client: Optional[redis.Redis] = None
-        if redis_url:
-            self._client = redis.from_url(redis_url, decode_responses=True)
+        self._cache = get_cache_service()
         self._ttl_seconds = int(os.getenv("RENTALS_CACHE_TTL_SECONDS", "5"))
 
-    def get(self, user_id: int, workspace_id: int | None = None) -> Optional[list[dict[str, Any]]]:
-        if not self._client:
-            return None
-        try:
-            raw = self._client.get(self._key(user_id, workspace_id))
-        except Exception:
-            return None
-        if not raw:
-            return None
-        try:
-            data = json.loads(raw)
-        except Exception:
-            return None
-        if isinstance(data, list):
-            return data
-        return None
-
-    def set(self, user_id: int, items: list[dict[str, Any]], workspace_id: int | None = None) -> None:
-        if not self._client:
-            return
-        try:
-            self._client.set(
-                self._key(user_id, workspace_id),
-                json.dumps(items, ensure_ascii=False),
-                ex=self._ttl_seconds,
-            )
-        except Exception:
-            return
-
-    def _key(self, user_id: int, workspace_id: int | None) -> str:
-        suffix = "all" if workspace_id is None else str(workspace_id)
-        return f"rentals:active:{user_id}:{suffix}"
+    def get_or_load(
+        self,
+        user_id: int,
+        loader: Callable[[], list[dict[str, Any]]],
+        workspace_id: int | None = None,
+    ) -> list[dict[str, Any]]:
+        return self._cache.get_or_load(self._namespace(user_id), self._suffix(workspace_id), loader, self._ttl_seconds)
+
+    def clear_user(self, user_id: int) -> None:
+        self._cache.invalidate(self._namespace(user_id))
+
+    def _namespace(self, user_id: int) -> str:
+        return f"rentals:active:{int(user_id)}"
+
+    def _suffix(self, workspace_id: int | None) -> str:
+        return "all" if workspace_id is None else str(workspace_id)
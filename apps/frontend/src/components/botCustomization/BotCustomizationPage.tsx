@@ -218,6 +218,34 @@ const BotCustomizationPage: React.FC<BotCustomizationPageProps> = ({ onToast })
                     />
                   </div>
                 </div>
+                <div className="space-y-2">
+                  <label className="text-[11px] font-semibold uppercase tracking-wide text-neutral-500">
+                    {tr("Reply delay for message bursts (seconds)", "Ожидание серии сообщений (секунды)")}
+                  </label>
+                  <input
+                    type="number"
+                    min={0}
+                    max={30}
+                    step={1}
+                    value={settings.ai?.reply_debounce_seconds ?? 3}
+                    onChange={(event) =>
+                      updateSettings((current) => ({
+                        ...current,
+                        ai: {
+                          ...current.ai,
+                          reply_debounce_seconds: Math.min(30, Math.max(0, Number(event.target.value))),
+                        },
+                      }))
+                    }
+                    className="w-full rounded-lg border border-neutral-200 bg-white px-3 py-2 text-sm text-neutral-700"
+                  />
+                  <p className="text-xs text-neutral-500">
+                    {tr(
+                      "Messages sent within this window get one AI reply. Commands are answered immediately.",
+                      "Сообщения в пределах этого окна получают один ответ ИИ. Команды обрабатываются сразу.",
+                    )}
+                  </p>
+                </div>
                 <div className="space-y-2">
                   <label className="text-[11px] font-semibold uppercase tracking-wide text-neutral-500">
                     {tr("Persona / brand voice", "Персона / стиль")}
@@ -245,6 +245,7 @@ export type BotCustomizationSettings = {
     model?: string;
     temperature?: number;
     max_tokens?: number;
+    reply_debounce_seconds?: number;
   };
 };
 
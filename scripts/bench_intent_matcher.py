@@ -0,0 +1,453 @@
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+WORKER_ROOT = ROOT / "workers" / "funpay"
+if str(WORKER_ROOT) not in sys.path:
+    sys.path.insert(0, str(WORKER_ROOT))
+
+from railway.intent_utils import MessageIntents, match_intents  # noqa: E402
+
+# Buyer messages in the shape they arrive from FunPay chats. Pass --corpus with one message
+# per line (for example an export of chat_messages.text) to check against real traffic.
+SAMPLE_MESSAGES = [
+    "Привет",
+    "привет, как дела?",
+    "Здравствуйте! Аккаунт ещё доступен?",
+    "Добрый вечер, есть свободные аккаунты?",
+    "какие аккаунты сейчас свободны",
+    "что есть свободного?",
+    "чё свободно",
+    "покажи список лотов",
+    "какие лоты заняты?",
+    "все аккаунты в аренде?",
+    "когда освободится аккаунт?",
+    "когда будет свободен лот 3",
+    "when available?",
+    "хочу арендовать на 3 часа",
+    "нужен акк на 2 часа",
+    "2 акк пожалуйста",
+    "хочу взять аренду",
+    "если я оплачу лот, вы сразу выдадите данные?",
+    "после оплаты когда получу логин и пароль?",
+    "куплю лот через 5 минут",
+    "сколько времени осталось?",
+    "скок осталось аренды",
+    "мой логин не подходит",
+    "дай данные от аккаунта",
+    "верните деньги пожалуйста",
+    "хочу возврат средств",
+    "refund please",
+    "moneyback",
+    "какие команды есть?",
+    "что умеешь?",
+    "help",
+    "список команд",
+    "нужна замена аккаунта, mmr не тот",
+    "лпзамена 12345",
+    "replace account please",
+    "как ты?",
+    "hi there",
+    "hey",
+    "yo bro",
+    "ок",
+    "спасибо!",
+    "+",
+    "Steam guard код не приходит",
+    "!код",
+    "!акк 123",
+    "!продлить 2 55",
+    "this is fine",
+    "сколько стоит аренда на сутки?",
+    "а цена какая?",
+    "оплатил, жду",
+    "продлите пожалуйста на час",
+    "пауза",
+    "Доброе утро! Что нового?",
+    "хай",
+    "хелло как жизнь",
+    "   Привет   ",
+    "ПРИВЕТ, ЕСТЬ АКК?",
+    "как настроение?",
+    "What's up, any free account?",
+    "у меня вылетел аккаунт, помогите",
+    "",
+]
+
+
+# Keyword predicates as they were in railway/runner_utils.py before the compiled matcher.
+
+
+def _is_greeting(text: str) -> bool:
+    if not text:
+        return False
+    lowered = text.lower()
+    keywords = ("привет", "здрав", "hello", "hi", "добрый", "доброе")
+    return any(word in lowered for word in keywords)
+
+
+def _wants_when_free(text: str) -> bool:
+    if not text:
+        return False
+    lowered = text.lower()
+    keywords = (
+        "когда освобод",
+        "когда будет свобод",
+        "когда свобод",
+        "when free",
+        "when available",
+        "when it will be free",
+    )
+    return any(word in lowered for word in keywords)
+
+
+def _wants_low_priority_replace(text: str) -> bool:
+    if not text:
+        return False
+    if "лпзамена" in text:
+        return True
+    if ("замен" in text or "replace" in text or "replacement" in text) and (
+        "аккаунт" in text or "account" in text or "лот" in text or "mmr" in text or "лп" in text
+    ):
+        return True
+    return False
+
+
+def _wants_refund(text: str) -> bool:
+    if not text:
+        return False
+    lowered = text.lower()
+    keywords = (
+        "возврат",
+        "верни",
+        "верните",
+        "вернуть",
+        "деньги",
+        "средства",
+        "деньги обратно",
+        "moneyback",
+        "refund",
+    )
+    return any(key in lowered for key in keywords)
+
+
+def _wants_account_info(text: str) -> bool:
+    if not text:
+        return False
+    keywords = (
+        "данные",
+        "логин",
+        "парол",
+        "акк",
+        "аккаунт",
+        "мой",
+        "мои",
+        "скок",
+        "сколько",
+        "остал",
+        "времени",
+        "срок",
+        "доступ",
+        "аренд",
+        "аренда",
+        "аренды",
+        "rental",
+        "rent",
+        "текущ",
+        "активн",
+    )
+    return any(key in text for key in keywords)
+
+
+def _wants_command_list(text: str) -> bool:
+    if not text:
+        return False
+    hints = ("команд", "commands", "help", "помощ", "что умеешь", "что можешь", "список команд")
+    return any(word in text for word in hints)
+
+
+def _wants_stock_list(text: str) -> bool:
+    if not text:
+        return False
+    subjects = (
+        "акк",
+        "аккаунт",
+        "аккаунты",
+        "лот",
+        "лоты",
+        "сток",
+        "stock",
+        "account",
+        "acc",
+    )
+    hints = (
+        "свобод",
+        "налич",
+        "есть",
+        "показ",
+        "список",
+        "free",
+        "available",
+        "list",
+        "show",
+    )
+    if "какие" in text and any(word in text for word in subjects):
+        return True
+    if "свобод" in text and (
+        "что" in text or "чё" in text or "че" in text or "есть" in text
+    ):
+        return True
+    return any(word in text for word in hints) and any(word in text for word in subjects)
+
+
+def _wants_busy_list(text: str) -> bool:
+    if not text:
+        return False
+    subjects = ("аккаунт", "аккаунты", "лот", "лоты")
+    hints = ("занят", "busy", "occupied", "в аренде")
+    if "какие" in text and any(word in text for word in subjects) and any(word in text for word in hints):
+        return True
+    return any(word in text for word in hints) and any(word in text for word in subjects)
+
+
+def _wants_pre_rent_request(text: str) -> bool:
+    if not text:
+        return False
+    lowered = text.lower()
+    account_words = (
+        "акк",
+        "аккаунт",
+        "account",
+        "acc",
+    )
+    need_words = (
+        "нуж",
+        "надо",
+        "хочу",
+        "сделаешь",
+        "сделай",
+        "оплач",
+        "оплат",
+        "купл",
+    )
+    time_words = (
+        "час",
+        "часа",
+        "часов",
+        "hour",
+        "hours",
+        "h",
+    )
+    if not any(word in lowered for word in account_words):
+        return False
+    if any(word in lowered for word in need_words):
+        return True
+    if any(word in lowered for word in time_words):
+        return True
+    if re.search(r"\b\d+\s*(?:акк|аккаунт|acc|account)\b", lowered):
+        return True
+    return False
+
+
+def _wants_rent_flow(text: str) -> bool:
+    if not text:
+        return False
+    keywords = (
+        "аренд",
+        "взять аренд",
+        "хочу аренд",
+        "rent",
+        "rental",
+    )
+    return any(word in text for word in keywords)
+
+
+def _wants_rent_confirmation(text: str) -> bool:
+    if not text:
+        return False
+    lowered = text.lower()
+    triggers = (
+        "если я опла",
+        "после оплат",
+        "оплачу лот",
+        "куплю лот",
+    )
+    asks = (
+        "выдадите",
+        "выдашь",
+        "дадите",
+        "дашь",
+        "получу",
+        "данные",
+        "логин",
+        "пароль",
+        "доступ",
+    )
+    pay_words = (
+        "опла",
+        "оплат",
+        "оплач",
+        "покуп",
+        "купл",
+    )
+    if any(word in lowered for word in triggers):
+        return True
+    return any(word in lowered for word in pay_words) and any(word in lowered for word in asks)
+
+
+_SUPPORT_CONTEXT_KEYWORDS = (
+    "аренд",
+    "аренда",
+    "акк",
+    "аккаунт",
+    "код",
+    "сток",
+    "налич",
+    "продл",
+    "пауза",
+    "замен",
+    "возврат",
+    "refund",
+    "free",
+    "available",
+    "busy",
+    "help",
+    "поддерж",
+    "помощ",
+    "команд",
+    "логин",
+    "пароль",
+    "steam",
+    "цен",
+    "стоим",
+    "price",
+    "payment",
+    "оплат",
+    "купить",
+    "rent",
+)
+
+
+_SMALL_TALK_PHRASES = (
+    "как дела",
+    "как у тебя дела",
+    "как у вас дела",
+    "как ты",
+    "что нового",
+    "че как",
+    "чё как",
+    "как жизнь",
+    "как сам",
+    "как настроение",
+    "как поживаешь",
+    "что делаешь",
+)
+
+
+_GREETINGS = (
+    "привет",
+    "здрав",
+    "добрый",
+    "hello",
+    "hi",
+    "hey",
+    "yo",
+    "хай",
+    "хелло",
+)
+
+
+def _needs_support_context(text: str) -> bool:
+    lowered = (text or "").strip().lower()
+    if not lowered:
+        return False
+    return any(keyword in lowered for keyword in _SUPPORT_CONTEXT_KEYWORDS)
+
+
+def _is_small_talk_message(text: str) -> bool:
+    lowered = (text or "").strip().lower()
+    if not lowered:
+        return False
+    if _needs_support_context(lowered):
+        return False
+    if any(phrase in lowered for phrase in _SMALL_TALK_PHRASES):
+        return True
+    if any(lowered.startswith(greeting) or f" {greeting}" in lowered for greeting in _GREETINGS):
+        return len(lowered) <= 30
+    return False
+
+
+_LEGACY_RULES = {
+    "when_free": _wants_when_free,
+    "refund": _wants_refund,
+    "account_info": _wants_account_info,
+    "command_list": _wants_command_list,
+    "stock_list": _wants_stock_list,
+    "busy_list": _wants_busy_list,
+    "pre_rent": _wants_pre_rent_request,
+    "rent_flow": _wants_rent_flow,
+    "rent_confirmation": _wants_rent_confirmation,
+    "greeting": _is_greeting,
+    "low_priority_replace": _wants_low_priority_replace,
+    "support_context": _needs_support_context,
+    "small_talk": _is_small_talk_message,
+}
+
+
+def _legacy_intents(text: str) -> MessageIntents:
+    # log_message passes the lowercased text to every predicate.
+    lowered = text.lower()
+    return MessageIntents(**{name: bool(rule(lowered)) for name, rule in _LEGACY_RULES.items()})
+
+
+def _load_corpus(path: str | None) -> list[str]:
+    messages = list(SAMPLE_MESSAGES)
+    if path:
+        with open(path, encoding="utf-8") as handle:
+            messages.extend(line.rstrip("\n") for line in handle)
+    return messages
+
+
+def _measure(fn, messages: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in messages:
+            fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the compiled intent matcher with the keyword scans.")
+    parser.add_argument("--corpus", help="Text file with one buyer message per line.")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per path; the best time is reported.")
+    args = parser.parse_args()
+
+    messages = _load_corpus(args.corpus)
+    mismatches = 0
+    for text in messages:
+        expected = _legacy_intents(text)
+        actual = match_intents(text.lower())
+        if expected != actual:
+            mismatches += 1
+            print(f"mismatch for {text!r}:\n  legacy:  {expected}\n  matcher: {actual}")
+    print(f"messages: {len(messages)}, mismatches: {mismatches}")
+
+    legacy = _measure(_legacy_intents, messages, args.repeat)
+    single = _measure(lambda text: match_intents(text.lower()), messages, args.repeat)
+    per_msg = 1_000_000 / len(messages)
+    print(f"keyword scans: {legacy * 1000:.2f} ms ({legacy * per_msg:.1f} us/msg)")
+    print(f"single pass:   {single * 1000:.2f} ms ({single * per_msg:.1f} us/msg)")
+    print(f"speedup: {legacy / single:.2f}x")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+ROOT = Path(__file__).resolve().parents[1]
+WORKER_ROOT = ROOT / "workers" / "funpay"
+if str(WORKER_ROOT) not in sys.path:
+    sys.path.insert(0, str(WORKER_ROOT))
+
+from FunPayAPI.account import Account  # noqa: E402
+from railway.chat_time_utils import _extract_datetime_from_html, _extract_message_datetime  # noqa: E402
+
+ACCOUNT_ID = 1000
+BUYER_ID = 2000
+
+BUYER_HTML = """
+<div class="chat-msg-item chat-msg-with-head" id="message-{id}">
+  <div class="chat-message">
+    <div class="media-left"><a href="https://funpay.com/users/{buyer}/" class="avatar-photo"></a></div>
+    <div class="media-body">
+      <div class="media-user-name">
+        <a href="https://funpay.com/users/{buyer}/" class="chat-msg-author-link">buyer_{buyer}</a>
+        <div class="chat-msg-date" title="17 октября, 12:34:56">12:34</div>
+      </div>
+      <div class="chat-msg-body"><div class="chat-msg-text">Здравствуйте! Аккаунт ещё доступен?<br>Хочу арендовать на 3 часа.</div></div>
+    </div>
+  </div>
+</div>
+"""
+
+SYSTEM_HTML = """
+<div class="chat-msg-item chat-msg-with-head" id="message-{id}">
+  <div class="chat-message">
+    <div class="media-body">
+      <div class="media-user-name">
+        <a href="https://funpay.com/" class="chat-msg-author-link">FunPay</a>
+        <span class="chat-msg-author-label label label-primary">оповещение</span>
+        <div class="chat-msg-date" title="17 октября, 12:35:10">12:35</div>
+      </div>
+      <div class="chat-msg-body">
+        <div class="alert alert-with-icon alert-info" role="alert">
+          Покупатель <a href="https://funpay.com/users/{buyer}/">buyer_{buyer}</a> оплатил заказ
+          <a href="https://funpay.com/orders/ABCD1234/">#ABCD1234</a>. Аренда, 3 часа.
+          <a href="https://funpay.com/users/{buyer}/">buyer_{buyer}</a>, не забудьте потом нажать кнопку «Подтвердить выполнение заказа».
+        </div>
+      </div>
+    </div>
+  </div>
+</div>
+"""
+
+
+def _build_messages(count: int) -> list[dict]:
+    messages = []
+    for idx in range(count):
+        msg_id = 10_000 + idx
+        if idx % 5 == 4:
+            messages.append({"id": msg_id, "author": 0, "html": SYSTEM_HTML.format(id=msg_id, buyer=BUYER_ID)})
+        else:
+            messages.append({"id": msg_id, "author": BUYER_ID, "html": BUYER_HTML.format(id=msg_id, buyer=BUYER_ID)})
+    return messages
+
+
+def _legacy_pass(json_messages: list[dict]) -> None:
+    # Mirrors the previous path: two parses in Account.__parse_messages, one in
+    # runner_utils.log_message (author link) and one in _extract_datetime_from_html.
+    for item in json_messages:
+        parser = BeautifulSoup(item["html"].replace("<br>", "\n"), "lxml")
+        author_div = parser.find("div", {"class": "media-user-name"})
+        if author_div:
+            author_div.find("span", {"class": "chat-msg-author-label label label-success"})
+            author_div.find("a")
+        if item["author"] == 0:
+            parser.find("div", role="alert").text.strip()
+        else:
+            parser.find("div", {"class": "chat-msg-text"}).text
+        parser = BeautifulSoup(item["html"], "lxml")
+        default_label = parser.find("div", {"class": "media-user-name"})
+        if default_label:
+            default_label.find("span", {"class": "chat-msg-author-label label label-default"})
+        if item["author"] == 0:
+            parser.find_all("a", href=lambda href: href and "/users/" in href)
+        link = BeautifulSoup(item["html"], "lxml").find("a", {"class": "chat-msg-author-link"})
+        if link:
+            link.text.strip()
+        _extract_datetime_from_html(item["html"])
+
+
+def _single_pass(account: Account, json_messages: list[dict]) -> None:
+    for msg in account._Account__parse_messages(json_messages, f"users-{ACCOUNT_ID}-{BUYER_ID}", BUYER_ID):
+        _ = msg.author_link_text
+        _extract_message_datetime(msg)
+
+
+def _measure(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark chat message HTML parsing.")
+    parser.add_argument("--messages", type=int, default=200, help="Messages per chat history.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per path; the best time is reported.")
+    args = parser.parse_args()
+
+    account = Account("benchmark")
+    account.id = ACCOUNT_ID
+    account.username = "seller"
+    json_messages = _build_messages(max(1, args.messages))
+
+    legacy = _measure(lambda: _legacy_pass(json_messages), args.repeat)
+    single = _measure(lambda: _single_pass(account, json_messages), args.repeat)
+    per_msg = 1000 / len(json_messages)
+    print(f"messages: {len(json_messages)}, repeat: {args.repeat}")
+    print(f"legacy (4 parses/msg): {legacy * 1000:.1f} ms ({legacy * per_msg * 1000:.1f} us/msg)")
+    print(f"single pass:           {single * 1000:.1f} ms ({single * per_msg * 1000:.1f} us/msg)")
+    print(f"speedup: {legacy / single:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "workers", "funpay"))
+
+from railway.knowledge_utils import DEFAULT_KNOWLEDGE, KnowledgeIndex, build_knowledge_context  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _bundled_knowledge(monkeypatch):
+    monkeypatch.delenv("AI_KNOWLEDGE_PATH", raising=False)
+    monkeypatch.delenv("AI_KNOWLEDGE_MIN_SCORE", raising=False)
+    monkeypatch.delenv("AI_KNOWLEDGE_DISABLED", raising=False)
+
+
+@pytest.mark.parametrize(
+    ("question", "expected_id"),
+    [
+        ("код", "code"),
+        ("не приходит код", "code"),
+        ("аренда", "rent_flow"),
+        ("как арендовать", "rent_flow"),
+        ("пауза", "pause"),
+        ("поставьте на паузу", "pause"),
+        ("есть свободные", "stock"),
+        ("when free", "stock"),
+        ("хочу возврат", "admin_refund"),
+    ],
+)
+def test_bundled_knowledge_ranks_expected_item_first(question, expected_id):
+    ranked = KnowledgeIndex(list(DEFAULT_KNOWLEDGE)).search(question, 3)
+    assert ranked
+    assert ranked[0][1]["id"] == expected_id
+
+
+def test_latin_tokens_do_not_expand_to_longer_words():
+    ranked = KnowledgeIndex(list(DEFAULT_KNOWLEDGE)).search("when free", 3)
+    assert [item["id"] for _, item in ranked] == ["stock"]
+
+
+@pytest.mark.parametrize("question", ["код", "не приходит код"])
+def test_code_question_gets_steam_guard_snippet(question):
+    context = build_knowledge_context(question, max_chars=2000, max_items=3)
+    assert context is not None
+    assert "Steam Guard" in context
@@ -9,7 +9,10 @@ if TYPE_CHECKING:
     from .updater.runner import Runner
 
 from requests_toolbelt import MultipartEncoder
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
+from lxml import html as lxml_html
 from datetime import datetime, timedelta
 import requests
 import logging
@@ -25,6 +28,16 @@ from .common import exceptions, utils, enums
 
 logger = logging.getLogger("FunPayAPI.account")
 PRIVATE_CHAT_ID_RE = re.compile(r"users-\d+-\d+$")
+MESSAGE_TIME_ATTRS = ("data-time", "data-date", "data-timestamp", "data-last-message-time", "data-last-msg-time")
+
+
+def _xpath_class(name: str) -> str:
+    return f"[contains(concat(' ', normalize-space(@class), ' '), ' {name} ')]"
+
+
+def _xpath_text(element, path: str) -> str | None:
+    found = element.xpath(path)
+    return found[0].text_content() if found else None
 
 
 class Account:
@@ -45,11 +58,14 @@ class Account:
 
     :param locale: текущий язык аккаунта, опционально.
     :type locale: :obj:`Literal["ru", "en", "uk"]` or :obj:`None`
+
+    :param pool_maxsize: максимальное кол-во keep-alive соединений в пуле (на каждый прокси).
+    :type pool_maxsize: :obj:`int`
     """
 
     def __init__(self, golden_key: str, user_agent: str | None = None,
                  requests_timeout: int | float = 10, proxy: Optional[dict] = None,
-                 locale: Literal["ru", "en", "uk"] | None = None):
+                 locale: Literal["ru", "en", "uk"] | None = None, pool_maxsize: int = 4):
         self.golden_key: str = golden_key
         """Токен (golden_key) аккаунта."""
         self.user_agent: str | None = user_agent
@@ -102,6 +118,10 @@ class Account:
         """PHPSESSID сессии."""
         self.last_update: int | None = None
         """Последнее время обновления аккаунта."""
+        self.pool_maxsize: int = max(1, pool_maxsize)
+        """Максимальное кол-во keep-alive соединений в пуле (на каждый прокси)."""
+        self.__session: requests.Session | None = None
+        """HTTP-сессия с пулом keep-alive соединений и хранилищем куки."""
 
         self.interlocutor_ids: dict[int, int] = {}
         """{id чата: id собеседника}"""
@@ -131,7 +151,8 @@ class Account:
                exclude_phpsessid: bool = False, raise_not_200: bool = False,
                locale: Literal["ru", "en", "uk"] | None = None) -> requests.Response:
         """
-        Отправляет запрос к FunPay. Добавляет в заголовки запроса user_agent и куки.
+        Отправляет запрос к FunPay через :py:obj:`.Account.session`. Добавляет в заголовки запроса user_agent,
+        а в куки сессии - golden_key и PHPSESSID.
 
         :param request_method: метод запроса ("get" / "post").
         :type request_method: :obj:`str` `post` or `get`
@@ -175,8 +196,10 @@ class Account:
             if redirect_url.startswith(f"https://funpay.com"):
                 self.__locale = "ru"
 
-        headers["cookie"] = f"golden_key={self.golden_key}; cookie_prefs=1"
-        headers["cookie"] += f"; PHPSESSID={self.phpsessid}" if self.phpsessid and not exclude_phpsessid else ""
+        session = self.session
+        self.__set_cookie("golden_key", self.golden_key)
+        self.__set_cookie("cookie_prefs", "1")
+        self.__set_cookie("PHPSESSID", self.phpsessid if not exclude_phpsessid else None)
         if self.user_agent:
             headers["user-agent"] = self.user_agent
         if request_method == "post" and locale:
@@ -187,17 +210,17 @@ class Account:
         if request_method == "get" and locale and locale != self.locale:
             link += f'{"&" if "?" in link else "?"}setlocale={locale}'
         for i in range(10):
-            response = getattr(requests, request_method)(link, headers=headers, data=payload,
-                                                         timeout=self.requests_timeout,
-                                                         proxies=self.proxy or {}, allow_redirects=False)
+            response = session.request(request_method, link, headers=headers, data=payload,
+                                       timeout=self.requests_timeout,
+                                       proxies=self.proxy or {}, allow_redirects=False)
             if not (300 <= response.status_code < 400) or 'Location' not in response.headers:
                 break
             link = response.headers['Location']
             update_locale(link)
         else:
-            response = getattr(requests, request_method)(link, headers=headers, data=payload,
-                                                         timeout=self.requests_timeout,
-                                                         proxies=self.proxy or {})
+            response = session.request(request_method, link, headers=headers, data=payload,
+                                       timeout=self.requests_timeout,
+                                       proxies=self.proxy or {})
         if response.status_code == 429:
             self.last_429_err_time = time.time()
 
@@ -1460,27 +1483,7 @@ class Account:
             if sudcategories:
                 subcategory = sudcategories.get(subcategory_name)
 
-            now = datetime.now()
-            order_date_text = div.find("div", {"class": "tc-date-time"}).text
-            if any(today in order_date_text for today in ("сегодня", "сьогодні", "today")):  # сегодня, ЧЧ:ММ
-                h, m = order_date_text.split(", ")[1].split(":")
-                order_date = datetime(now.year, now.month, now.day, int(h), int(m))
-            elif any(yesterday in order_date_text for yesterday in ("вчера", "вчора", "yesterday")):  # вчера, ЧЧ:ММ
-                h, m = order_date_text.split(", ")[1].split(":")
-                temp = now - timedelta(days=1)
-                order_date = datetime(temp.year, temp.month, temp.day, int(h), int(m))
-            elif order_date_text.count(" ") == 2:  # ДД месяца, ЧЧ:ММ
-                split = order_date_text.split(", ")
-                day, month = split[0].split()
-                day, month = int(day), utils.MONTHS[month]
-                h, m = split[1].split(":")
-                order_date = datetime(now.year, month, day, int(h), int(m))
-            else:  # ДД месяца ГГГГ, ЧЧ:ММ
-                split = order_date_text.split(", ")
-                day, month, year = split[0].split()
-                day, month, year = int(day), utils.MONTHS[month], int(year)
-                h, m = split[1].split(":")
-                order_date = datetime(year, month, day, int(h), int(m))
+            order_date = self.__parse_order_date(div.find("div", {"class": "tc-date-time"}).text)
             id1, id2 = sorted([buyer_id, self.id])
             chat_id = f"users-{id1}-{id2}"
             order_obj = types.OrderShortcut(order_id, description, price, currency, buyer_username, buyer_id, chat_id,
@@ -1489,6 +1492,100 @@ class Account:
 
         return next_order_id, sales, locale, sudcategories
 
+    def get_sales_updates(self, known: dict[str, types.OrderStatuses],
+                          sudcategories: dict[str, types.SubCategory] | None = None,
+                          locale: Literal["ru", "en", "uk"] | None = None) -> \
+            tuple[list[str], dict[str, types.OrderShortcut]]:
+        """
+        Получает первую страницу https://funpay.com/orders/trade и разбирает только новые или изменившиеся заказы.
+        Для остальных строк считываются лишь ID и статус (через lxml / XPath, без BeautifulSoup).
+
+        :param known: уже известные заказы {ID заказа: статус}.
+        :type known: :obj:`dict` {:obj:`str`: :class:`FunPayAPI.common.enums.OrderStatuses`}
+
+        :param sudcategories: подкатегории из последнего полного вызова :meth:`FunPayAPI.account.Account.get_sales`.
+        :type sudcategories: :obj:`dict` {:obj:`str`: :class:`FunPayAPI.types.SubCategory`} or :obj:`None`
+
+        :return: (ID всех заказов на странице по порядку, {ID заказа: новый / изменившийся заказ})
+        :rtype: :obj:`tuple` (:obj:`list` of :obj:`str`, :obj:`dict` {:obj:`str`: :class:`FunPayAPI.types.OrderShortcut`})
+        """
+        if not self.is_initiated:
+            raise exceptions.AccountNotInitiatedError()
+
+        locale = locale or self.__profile_parse_locale
+        response = self.method("get", "https://funpay.com/orders/trade", {}, {}, raise_not_200=True, locale=locale)
+        self.locale = self.__default_locale
+        tree = lxml_html.fromstring(response.content.decode())
+        if tree.xpath(f"//div{_xpath_class('content-account')}{_xpath_class('content-account-login')}"):
+            raise exceptions.UnauthorizedError(response)
+        app_data = tree.xpath("//body/@data-app-data")
+        if app_data:
+            try:
+                self.csrf_token = json.loads(app_data[0]).get("csrf-token") or self.csrf_token
+            except ValueError:
+                logger.debug("TRACEBACK", exc_info=True)
+
+        order_ids = []
+        changed = {}
+        for row in tree.xpath(f"//a{_xpath_class('tc-item')}"):
+            order_id = _xpath_text(row, f".//div{_xpath_class('tc-order')}")
+            if not order_id:
+                continue
+            order_id = order_id[1:]
+            order_status = self.__order_status(row.get("class", "").split())
+            order_ids.append(order_id)
+            if known.get(order_id) == order_status:
+                continue
+
+            description = _xpath_text(row, f".//div{_xpath_class('order-desc')}//div")
+            price, currency = _xpath_text(row, f".//div{_xpath_class('tc-price')}").rsplit(maxsplit=1)
+            price = float(price.replace(" ", ""))
+            currency = parse_currency(currency)
+            buyer_span = row.xpath(f".//div{_xpath_class('media-user-name')}//span")[0]
+            buyer_username = buyer_span.text_content()
+            buyer_id = int(buyer_span.get("data-href")[:-1].split("/users/")[1])
+            subcategory_name = _xpath_text(row, f".//div{_xpath_class('text-muted')}")
+            subcategory = sudcategories.get(subcategory_name) if sudcategories else None
+            order_date = self.__parse_order_date(_xpath_text(row, f".//div{_xpath_class('tc-date-time')}"))
+            id1, id2 = sorted([buyer_id, self.id])
+            chat_id = f"users-{id1}-{id2}"
+            changed[order_id] = types.OrderShortcut(order_id, description, price, currency, buyer_username, buyer_id,
+                                                    chat_id, order_status, order_date, subcategory_name, subcategory,
+                                                    lxml_html.tostring(row, encoding="unicode"))
+        return order_ids, changed
+
+    @staticmethod
+    def __order_status(classname: list[str] | str) -> types.OrderStatuses:
+        if "warning" in classname:
+            return types.OrderStatuses.REFUNDED
+        elif "info" in classname:
+            return types.OrderStatuses.PAID
+        return types.OrderStatuses.CLOSED
+
+    @staticmethod
+    def __parse_order_date(order_date_text: str) -> datetime:
+        now = datetime.now()
+        if any(today in order_date_text for today in ("сегодня", "сьогодні", "today")):  # сегодня, ЧЧ:ММ
+            h, m = order_date_text.split(", ")[1].split(":")
+            order_date = datetime(now.year, now.month, now.day, int(h), int(m))
+        elif any(yesterday in order_date_text for yesterday in ("вчера", "вчора", "yesterday")):  # вчера, ЧЧ:ММ
+            h, m = order_date_text.split(", ")[1].split(":")
+            temp = now - timedelta(days=1)
+            order_date = datetime(temp.year, temp.month, temp.day, int(h), int(m))
+        elif order_date_text.count(" ") == 2:  # ДД месяца, ЧЧ:ММ
+            split = order_date_text.split(", ")
+            day, month = split[0].split()
+            day, month = int(day), utils.MONTHS[month]
+            h, m = split[1].split(":")
+            order_date = datetime(now.year, month, day, int(h), int(m))
+        else:  # ДД месяца ГГГГ, ЧЧ:ММ
+            split = order_date_text.split(", ")
+            day, month, year = split[0].split()
+            day, month, year = int(day), utils.MONTHS[month], int(year)
+            h, m = split[1].split(":")
+            order_date = datetime(year, month, day, int(h), int(m))
+        return order_date
+
     def get_sells(self, start_from: str | None = None, include_paid: bool = True, include_closed: bool = True,
                   include_refunded: bool = True, exclude_ids: list[str] | None = None,
                   id: Optional[str] = None, buyer: Optional[str] = None,
@@ -1920,6 +2017,48 @@ class Account:
             raise exceptions.AccountNotInitiatedError()
         self.method("get", self._logout_link, {"accept": "*/*"}, {}, raise_not_200=True)
 
+    @property
+    def session(self) -> requests.Session:
+        """
+        HTTP-сессия аккаунта: keep-alive соединения к FunPay (не более :py:obj:`.Account.pool_maxsize`
+        на каждый прокси) и куки, полученные от сервера. Создается при первом запросе.
+
+        :return: HTTP-сессия аккаунта.
+        :rtype: :class:`requests.Session`
+        """
+        if self.__session is None:
+            session = requests.Session()
+            # Повторяем только ошибки установки соединения и идемпотентные запросы, оборванные
+            # сервером на переиспользуемом keep-alive соединении. POST-запросы не повторяются.
+            retries = Retry(total=2, connect=2, read=1)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=retries)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self.__session = session
+        return self.__session
+
+    def close(self) -> None:
+        """
+        Закрывает HTTP-сессию аккаунта и все соединения пула. При следующем запросе будет создана новая сессия.
+        """
+        if self.__session is not None:
+            self.__session.close()
+            self.__session = None
+
+    def __set_cookie(self, name: str, value: str | None):
+        """
+        Записывает куки в хранилище сессии (или удаляет его, если value is None), не допуская дублей
+        с одинаковым именем для разных доменов.
+        """
+        jar = self.session.cookies
+        current = [cookie for cookie in jar if cookie.name == name]
+        if len(current) == 1 and current[0].value == value and current[0].domain == "funpay.com":
+            return
+        for cookie in current:
+            jar.clear(cookie.domain, cookie.path, cookie.name)
+        if value is not None:
+            jar.set(name, value, domain="funpay.com", path="/")
+
     @property
     def is_initiated(self) -> bool:
         """
@@ -1995,9 +2134,46 @@ class Account:
             author_id = i["author"]
             parser = BeautifulSoup(i["html"].replace("<br>", "\n"), "lxml")
 
+            # Один проход по дереву: все нужные элементы собираются сразу, чтобы больше не разбирать HTML.
+            author_div = image_tag = text_div = alert_div = author_link = None
+            users = []
+            time_attrs = {attr: [] for attr in MESSAGE_TIME_ATTRS}
+            time_tags = []
+            time_classes = []
+            for tag in parser.find_all(True):
+                classes = tag.get("class") or ()
+                if tag.name == "div":
+                    if author_div is None and "media-user-name" in classes:
+                        author_div = tag
+                    elif text_div is None and "chat-msg-text" in classes:
+                        text_div = tag
+                    if alert_div is None and tag.get("role") == "alert":
+                        alert_div = tag
+                elif tag.name == "a":
+                    if image_tag is None and "chat-img-link" in classes:
+                        image_tag = tag
+                    if author_link is None and "chat-msg-author-link" in classes:
+                        author_link = tag
+                    href = tag.get("href")
+                    if href and "/users/" in href:
+                        users.append(tag)
+                elif tag.name == "time":
+                    if text := tag.get_text(" ", strip=True):
+                        time_tags.append(text)
+                for attr in MESSAGE_TIME_ATTRS:
+                    if value := tag.get(attr):
+                        time_attrs[attr].append(str(value))
+                if classes:
+                    class_lower = " ".join(classes).lower()
+                    if ("time" in class_lower or "date" in class_lower) and \
+                            ("chat" in class_lower or "contact" in class_lower or "msg" in class_lower):
+                        if title := tag.get("title"):
+                            time_classes.append(str(title))
+                        if text := tag.get_text(" ", strip=True):
+                            time_classes.append(text)
+
             # Если ник или бейдж написавшего неизвестен, но есть блок с данными об авторе сообщения
-            if None in [ids.get(author_id), badges.get(author_id)] and (
-                    author_div := parser.find("div", {"class": "media-user-name"})):
+            if None in [ids.get(author_id), badges.get(author_id)] and author_div:
                 if badges.get(author_id) is None:
                     badge = author_div.find("span", {"class": "chat-msg-author-label label label-success"})
                     badges[author_id] = badge.text if badge else 0
@@ -2010,7 +2186,7 @@ class Account:
             by_bot = False
             by_vertex = False
             image_name = None
-            if self.chat_id_private(chat_id) and (image_tag := parser.find("a", {"class": "chat-img-link"})):
+            if self.chat_id_private(chat_id) and image_tag:
                 image_name = image_tag.find("img")
                 image_name = image_name.get('alt') if image_name else None
                 image_link = image_tag.get("href")
@@ -2024,9 +2200,9 @@ class Account:
             else:
                 image_link = None
                 if author_id == 0:
-                    message_text = parser.find("div", role="alert").text.strip()
+                    message_text = alert_div.text.strip()
                 else:
-                    message_text = parser.find("div", {"class": "chat-msg-text"}).text
+                    message_text = text_div.text
 
                 if message_text.startswith(self.__bot_character) or \
                         message_text.startswith(self.__old_bot_character) and author_id == self.id:
@@ -2041,14 +2217,20 @@ class Account:
             message_obj.by_bot = by_bot
             message_obj.by_vertex = by_vertex
             message_obj.type = types.MessageTypes.NON_SYSTEM if author_id != 0 else message_obj.get_message_type()
+            message_obj.html_parsed = True
+            message_obj.author_link_text = author_link.text.strip() or None if author_link else None
+            message_obj.time_texts = [text for attr in MESSAGE_TIME_ATTRS for text in time_attrs[attr]] + \
+                time_tags + time_classes
 
-            messages.append(message_obj)
+            default_label = author_div.find("span", {
+                "class": "chat-msg-author-label label label-default"}) if author_div else None
+            messages.append((message_obj, default_label.text if default_label else None,
+                             [(user.text, user["href"]) for user in users]))
 
-        for i in messages:
+        for i, default_label, users in messages:
             i.author = ids.get(i.author_id)
             i.chat_name = interlocutor_username
             i.badge = badges.get(i.author_id) if badges.get(i.author_id) != 0 else None
-            parser = BeautifulSoup(i.html, "lxml")
             if i.badge:
                 i.is_employee = True
                 if i.badge in ("поддержка", "підтримка", "support"):
@@ -2057,18 +2239,14 @@ class Account:
                     i.is_moderation = True
                 elif i.badge in ("арбитраж", "арбітраж", "arbitration"):
                     i.is_arbitration = True
-            default_label = parser.find("div", {"class": "media-user-name"})
-            default_label = default_label.find("span", {
-                "class": "chat-msg-author-label label label-default"}) if default_label else None
-            if default_label:
-                if default_label.text in ("автовідповідь", "автоответ", "auto-reply"):
+            if default_label is not None:
+                if default_label in ("автовідповідь", "автоответ", "auto-reply"):
                     i.is_autoreply = True
-            i.badge = default_label.text if (i.badge is None and default_label is not None) else i.badge
+            i.badge = default_label if (i.badge is None and default_label is not None) else i.badge
             if i.type != types.MessageTypes.NON_SYSTEM:
-                users = parser.find_all('a', href=lambda href: href and '/users/' in href)
                 if users:
-                    i.initiator_username = users[0].text
-                    i.initiator_id = int(users[0]["href"].split("/")[-2])
+                    i.initiator_username = users[0][0]
+                    i.initiator_id = int(users[0][1].split("/")[-2])
                     if i.type in (types.MessageTypes.ORDER_PURCHASED, types.MessageTypes.ORDER_CONFIRMED,
                                   types.MessageTypes.NEW_FEEDBACK,
                                   types.MessageTypes.FEEDBACK_CHANGED,
@@ -2088,7 +2266,7 @@ class Account:
                             i.i_am_seller = False
                             i.i_am_buyer = True
                     elif len(users) > 1:
-                        last_user_id = int(users[-1]["href"].split("/")[-2])
+                        last_user_id = int(users[-1][1].split("/")[-2])
                         if i.type == types.MessageTypes.ORDER_CONFIRMED_BY_ADMIN:
                             if last_user_id == self.id:
                                 i.i_am_seller = True
@@ -2104,7 +2282,7 @@ class Account:
                                 i.i_am_seller = True
                                 i.i_am_buyer = False
 
-        return messages
+        return [i[0] for i in messages]
 
     def __update_csrf_token(self, parser: BeautifulSoup):
         try:
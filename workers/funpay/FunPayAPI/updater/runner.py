@@ -64,6 +64,10 @@ class Runner:
         self.saved_orders: dict[str, types.OrderShortcut] = {}
         """Сохраненные состояния заказов ({ID заказа: экземпляр types.OrderShortcut})."""
 
+        self.incremental_order_requests: bool = True
+        """Разбирать ли при обновлениях только новые / изменившиеся заказы (см. :meth:`Account.get_sales_updates`)?"""
+        self.__order_subcategories: dict[str, types.SubCategory] | None = None
+
         self.runner_last_messages: dict[int, list[int, int, str | None]] = {}
         """ID последний сообщений {ID чата: [ID последего сообщения чата, ID последнего прочитанного сообщения чата, 
         текст последнего сообщения или None, если это изображение]}."""
@@ -363,11 +367,19 @@ class Runner:
         if not self.make_order_requests:
             return events
 
+        incremental = self.incremental_order_requests and not self.__first_request and bool(self.saved_orders)
         attempts = 3
         while attempts:
             attempts -= 1
             try:
-                orders_list = self.account.get_sales()  # todo добавить возможность реакции на подтверждение очень старых заказов
+                if incremental:
+                    known = {order_id: order.status for order_id, order in self.saved_orders.items()}
+                    order_ids, changed = self.account.get_sales_updates(known, self.__order_subcategories)
+                    orders_list = (None, [changed.get(i) or self.saved_orders[i] for i in order_ids])
+                else:
+                    # todo добавить возможность реакции на подтверждение очень старых заказов
+                    orders_list = self.account.get_sales()
+                    self.__order_subcategories = orders_list[3]
                 break
             except exceptions.RequestFailedError as e:
                 logger.error(e)
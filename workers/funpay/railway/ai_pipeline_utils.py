@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable
+
+from .env_utils import env_bool, env_int
+
+
+ChatKey = tuple[int | None, int | None, int]
+
+
+@dataclass
+class _Burst:
+    # Buyer messages of one chat waiting out the debounce window.
+    job: Callable[[AiReplyToken, str], None]
+    hard_deadline: float
+    deadline: float = 0.0
+    texts: list[str] = field(default_factory=list)
+
+
+class AiReplyToken:
+    # Handed to every job; a job checks it after each slow call and before sending.
+    def __init__(self, pipeline: AiReplyPipeline, key: ChatKey, generation: int) -> None:
+        self._pipeline = pipeline
+        self.key = key
+        self.generation = generation
+
+    @property
+    def cancelled(self) -> bool:
+        return self._pipeline._generation(self.key) != self.generation
+
+
+class AiReplyPipeline:
+    # Runs AI routing and replies off the polling threads on a bounded pool. Jobs of one chat
+    # run one at a time in submission order, different chats run in parallel. cancel() (the
+    # AI-pause path) drops the queued jobs of a chat and marks the running one as cancelled.
+    # submit_debounced() holds a chat's messages until it has been quiet for the window and
+    # then queues one job for the joined text. max_pending only limits chats that have nothing
+    # queued yet: their jobs wait in a deferred list until a slot frees up, while chats that
+    # are already queued keep appending so their replies stay in order.
+    def __init__(
+        self,
+        logger: logging.Logger,
+        *,
+        workers: int = 4,
+        max_pending: int = 200,
+        max_debounce_seconds: float = 15.0,
+    ) -> None:
+        self.logger = logger
+        self.max_pending = max(1, int(max_pending))
+        self.max_debounce_seconds = max(0.0, float(max_debounce_seconds))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="funpay-ai")
+        self._queues: dict[ChatKey, deque[tuple[AiReplyToken, Callable[[AiReplyToken], None]]]] = {}
+        self._generations: dict[ChatKey, int] = {}
+        self._bursts: dict[ChatKey, _Burst] = {}
+        self._deferred: OrderedDict[ChatKey, list[Callable[[AiReplyToken], None]]] = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flusher: threading.Thread | None = None
+        self._pid = os.getpid()
+
+    def _generation(self, key: ChatKey) -> int:
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def _full(self) -> bool:
+        return self._pending + len(self._bursts) >= self.max_pending
+
+    def _defer(self, key: ChatKey, job: Callable[[AiReplyToken], None]) -> bool:
+        # Called with the lock held. False means the deferred list is full too.
+        if key not in self._deferred and sum(len(jobs) for jobs in self._deferred.values()) >= self.max_pending:
+            return False
+        self._deferred.setdefault(key, []).append(job)
+        return True
+
+    def _promote_deferred(self) -> list[ChatKey]:
+        # Called with the lock held; returns the chats that need a drain started.
+        started: list[ChatKey] = []
+        while self._deferred and not self._full():
+            key, jobs = self._deferred.popitem(last=False)
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = self._queues[key] = deque()
+                started.append(key)
+            generation = self._generations.get(key, 0)
+            for job in jobs:
+                queue.append((AiReplyToken(self, key, generation), job))
+            self._pending += len(jobs)
+        return started
+
+    def submit(self, key: ChatKey, job: Callable[[AiReplyToken], None], *, force: bool = False) -> bool:
+        with self._lock:
+            if key in self._deferred:
+                return self._defer(key, job)
+            if not force and key not in self._queues and self._full():
+                return self._defer(key, job)
+            token = AiReplyToken(self, key, self._generations.get(key, 0))
+            queue = self._queues.get(key)
+            idle = queue is None
+            if idle:
+                queue = self._queues[key] = deque()
+            queue.append((token, job))
+            self._pending += 1
+        if idle:
+            self._executor.submit(self._drain, key)
+        return True
+
+    def submit_debounced(
+        self,
+        key: ChatKey,
+        text: str,
+        delay: float,
+        job: Callable[[AiReplyToken, str], None],
+    ) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            burst = self._bursts.get(key)
+            if burst is None:
+                if key in self._deferred or (key not in self._queues and self._full()):
+                    return self._defer(key, lambda token, job=job, text=text: job(token, text))
+                # Every message restarts the window, but a chatty buyer still gets an answer.
+                burst = self._bursts[key] = _Burst(job=job, hard_deadline=now + max(delay, self.max_debounce_seconds))
+            burst.texts.append(text)
+            burst.job = job
+            burst.deadline = min(now + delay, burst.hard_deadline)
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._flush_bursts, name="funpay-ai-debounce", daemon=True)
+                self._flusher.start()
+            self._wakeup.notify()
+        return True
+
+    def _flush_bursts(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                due = [key for key, burst in self._bursts.items() if burst.deadline <= now]
+                if not due:
+                    next_deadline = min((burst.deadline for burst in self._bursts.values()), default=now + 60)
+                    self._wakeup.wait(next_deadline - now)
+                    continue
+                ready = [(key, self._bursts.pop(key)) for key in due]
+            for key, burst in ready:
+                text = "\n".join(burst.texts)
+                self.submit(key, lambda token, job=burst.job, text=text: job(token, text), force=True)
+
+    def cancel(self, key: ChatKey) -> int:
+        with self._lock:
+            burst = self._bursts.pop(key, None)
+            dropped = len(burst.texts) if burst else 0
+            dropped += len(self._deferred.pop(key, []))
+            queue = self._queues.get(key)
+            if queue is None:
+                return dropped
+            self._generations[key] = self._generations.get(key, 0) + 1
+            dropped += len(queue)
+            self._pending -= len(queue)
+            queue.clear()
+            return dropped
+
+    def cancel_workspace(self, workspace_id: int | None) -> None:
+        with self._lock:
+            keys = [key for key in (*self._queues, *self._bursts, *self._deferred) if key[1] == workspace_id]
+        for key in keys:
+            self.cancel(key)
+
+    def _drain(self, key: ChatKey) -> None:
+        while True:
+            with self._lock:
+                queue = self._queues.get(key)
+                if not queue:
+                    # Nothing queued or running for the chat: forget it entirely.
+                    self._queues.pop(key, None)
+                    self._generations.pop(key, None)
+                    return
+                token, job = queue.popleft()
+                self._pending -= 1
+            if token.cancelled:
+                continue
+            try:
+                job(token)
+            except Exception:
+                self.logger.exception("AI reply job failed for chat %s.", key[2])
+            with self._lock:
+                started = self._promote_deferred()
+            for other in started:
+                self._executor.submit(self._drain, other)
+
+
+_ai_pipeline: AiReplyPipeline | None = None
+_ai_pipeline_lock = threading.Lock()
+
+
+def get_ai_pipeline(logger: logging.Logger | None = None) -> AiReplyPipeline | None:
+    global _ai_pipeline
+    if not env_bool("AI_REPLY_ASYNC", True):
+        return None
+    with _ai_pipeline_lock:
+        # A forked shard inherits the object but not the pool threads.
+        if _ai_pipeline is None or _ai_pipeline._pid != os.getpid():
+            _ai_pipeline = AiReplyPipeline(
+                logger or logging.getLogger("funpay.worker"),
+                workers=env_int("AI_REPLY_WORKERS", 4),
+                max_pending=env_int("AI_REPLY_MAX_PENDING", 200),
+                max_debounce_seconds=env_int("AI_REPLY_DEBOUNCE_MAX_SECONDS", 15),
+            )
+        return _ai_pipeline
+
+
+def ai_chat_key(user_id: int | None, workspace_id: int | None, chat_id: int) -> ChatKey:
+    return (
+        int(user_id) if user_id is not None else None,
+        int(workspace_id) if workspace_id is not None else None,
+        int(chat_id),
+    )
+
+
+def cancel_ai_replies(user_id: int | None, workspace_id: int | None, chat_id: int) -> None:
+    pipeline = _ai_pipeline
+    if pipeline is not None and pipeline._pid == os.getpid():
+        pipeline.cancel(ai_chat_key(user_id, workspace_id, chat_id))
+
+
+def cancel_workspace_ai_replies(workspace_id: int | None) -> None:
+    pipeline = _ai_pipeline
+    if pipeline is not None and pipeline._pid == os.getpid():
+        pipeline.cancel_workspace(workspace_id)
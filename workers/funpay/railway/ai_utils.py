@@ -1,5 +1,6 @@
 ﻿from __future__ import annotations
 
+import hashlib
 import json
 import logging
 import os
@@ -8,6 +9,10 @@ from typing import Any
 
 import requests
 
+from .cache_utils import TTLCache
+from .env_utils import env_bool, env_int
+from .presence_utils import get_redis_client
+
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 GROQ_MODEL_ENV = "GROQ_MODEL"
 INTENT_MODEL_ENV = "AI_INTENT_MODEL"
@@ -68,6 +73,11 @@ SENSITIVE_RESPONSE = (
     "Я не могу выдавать данные аккаунта или коды. Используйте команды !акк и !код, либо напишите !админ."
 )
 _ALNUM_RE = re.compile(r"[A-Za-zА-Яа-я0-9]+")
+_WORD_RE = re.compile(r"\w+")
+_INTENT_CACHE: TTLCache[str, dict[str, Any]] = TTLCache(
+    "ai_intent", max_entries=max(100, env_int("AI_INTENT_CACHE_MAX_ENTRIES", 5000))
+)
+_INTENT_CACHE_PREFIX = "ai:intent:"
 _CODE_RE = re.compile(r"^[A-Za-z0-9]{3,12}$")
 _RUDE_KEYWORDS = (
     "долбаеб",
@@ -387,10 +397,53 @@ def _extract_json(text: str) -> dict[str, Any] | None:
     return None
 
 
+def normalize_intent_text(text: str | None) -> str:
+    return " ".join(_WORD_RE.findall((text or "").lower().replace("ё", "е")))
+
+
+def _intent_cache_key(normalized: str, model: str, settings_version: Any) -> str | None:
+    # Single words ("да", "2") are classified from the chat context, so they are not shared.
+    if len(normalized.split()) < 2 or len(normalized) > env_int("AI_INTENT_CACHE_MAX_CHARS", 160):
+        return None
+    digest = hashlib.sha1(f"{model}\n{settings_version!r}\n{normalized}".encode("utf-8")).hexdigest()
+    return f"{_INTENT_CACHE_PREFIX}{digest}"
+
+
+def _get_cached_intent(key: str) -> dict[str, Any] | None:
+    cached = _INTENT_CACHE.get(key)
+    if cached is not None:
+        return dict(cached)
+    cache = get_redis_client() if env_bool("AI_INTENT_CACHE_REDIS", True) else None
+    if not cache:
+        return None
+    try:
+        raw = cache.get(key)
+        result = json.loads(raw) if raw else None
+    except Exception:
+        return None
+    if not isinstance(result, dict):
+        return None
+    _store_cached_intent(key, result, shared=False)
+    return dict(result)
+
+
+def _store_cached_intent(key: str, result: dict[str, Any], *, shared: bool = True) -> None:
+    ttl = max(1, env_int("AI_INTENT_CACHE_TTL_SECONDS", 3600))
+    _INTENT_CACHE.set(key, dict(result), ttl=ttl)
+    cache = get_redis_client() if shared and env_bool("AI_INTENT_CACHE_REDIS", True) else None
+    if not cache:
+        return
+    try:
+        cache.setex(key, ttl, json.dumps(result, ensure_ascii=False))
+    except Exception:
+        pass
+
+
 def classify_intent(
     user_text: str,
     *,
     context: str | None = None,
+    settings_version: Any = None,
 ) -> dict[str, Any] | None:
     logger = logging.getLogger("funpay.ai")
     if not user_text:
@@ -404,6 +457,13 @@ def classify_intent(
         model = os.getenv(LOCAL_MODEL_ENV, DEFAULT_INTENT_MODEL).strip()
     else:
         model = os.getenv(INTENT_MODEL_ENV, DEFAULT_INTENT_MODEL).strip()
+    cache_key = None
+    if env_bool("AI_INTENT_CACHE", True):
+        cache_key = _intent_cache_key(normalize_intent_text(user_text), model, settings_version)
+    if cache_key:
+        cached = _get_cached_intent(cache_key)
+        if cached is not None:
+            return cached
     payload = {
         "model": model,
         "messages": [
@@ -448,7 +508,10 @@ def classify_intent(
         reason = str(obj.get("reason") or "").strip()
         if intent not in INTENT_LABELS:
             return None
-        return {"intent": intent, "confidence": confidence, "reason": reason}
+        result = {"intent": intent, "confidence": confidence, "reason": reason}
+        if cache_key:
+            _store_cached_intent(cache_key, result)
+        return result
     except Exception as exc:
         logger.warning("Intent classification failed: %s", exc)
         return None
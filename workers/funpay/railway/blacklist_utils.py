@@ -1,8 +1,7 @@
 from __future__ import annotations
 
-import mysql.connector
 
-from .db_utils import column_exists, resolve_workspace_mysql_cfg, table_exists
+from .db_utils import column_exists, mysql_connection, resolve_workspace_mysql_cfg, table_exists
 from .text_utils import normalize_owner_name
 
 
@@ -16,8 +15,7 @@ def is_blacklisted(
     if not owner_key:
         return False
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "blacklist"):
             return False
@@ -44,8 +42,6 @@ def is_blacklisted(
                 (owner_key, int(user_id), int(workspace_id)),
             )
         return cursor.fetchone() is not None
-    finally:
-        conn.close()
 
 
 def get_blacklist_status(
@@ -58,8 +54,7 @@ def get_blacklist_status(
     if not owner_key:
         return None
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "blacklist"):
             return None
@@ -88,8 +83,6 @@ def get_blacklist_status(
             )
         row = cursor.fetchone()
         return str(row[0]).strip().lower() if row and row[0] is not None else None
-    finally:
-        conn.close()
 
 
 def log_blacklist_event(
@@ -107,8 +100,7 @@ def log_blacklist_event(
     if not owner_key:
         return
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "blacklist_logs"):
             return
@@ -128,8 +120,6 @@ def log_blacklist_event(
             ),
         )
         conn.commit()
-    finally:
-        conn.close()
 
 
 def upsert_blacklist_suggestion(
@@ -145,8 +135,7 @@ def upsert_blacklist_suggestion(
     if not owner_key:
         return False
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "blacklist"):
             return False
@@ -216,8 +205,6 @@ def upsert_blacklist_suggestion(
                 )
         conn.commit()
         return True
-    finally:
-        conn.close()
 
 
 def get_blacklist_compensation_total(
@@ -230,8 +217,7 @@ def get_blacklist_compensation_total(
     if not owner_key:
         return 0
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "blacklist_logs"):
             return 0
@@ -245,8 +231,6 @@ def get_blacklist_compensation_total(
         )
         row = cursor.fetchone()
         return int(row[0]) if row and row[0] is not None else 0
-    finally:
-        conn.close()
 
 
 def remove_blacklist_entry(
@@ -259,8 +243,7 @@ def remove_blacklist_entry(
     if not owner_key:
         return False
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "blacklist"):
             return False
@@ -270,5 +253,3 @@ def remove_blacklist_entry(
         )
         conn.commit()
         return cursor.rowcount > 0
-    finally:
-        conn.close()
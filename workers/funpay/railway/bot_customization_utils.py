@@ -4,12 +4,15 @@ import json
 import re
 import time
 from copy import deepcopy
+from dataclasses import dataclass, field
 from typing import Any
 
 import mysql.connector
 
 from .constants import COMMAND_PREFIXES
-from .db_utils import resolve_workspace_mysql_cfg, table_exists
+from .cache_utils import TTLCache
+from .db_utils import column_exists, mysql_connection, resolve_workspace_mysql_cfg, table_exists
+from .env_utils import env_int
 
 DEFAULT_COMMANDS: dict[str, str] = {
     "stock": "!сток",
@@ -84,11 +87,16 @@ DEFAULT_SETTINGS: dict[str, Any] = {
         "model": "",
         "temperature": 0.7,
         "max_tokens": 450,
+        "reply_debounce_seconds": 3,
     },
 }
 
-_CACHE: dict[tuple[int, int | None], tuple[float, dict[str, Any]]] = {}
-_CACHE_TTL_SECONDS = 30
+# Cached compiled settings are trusted for _CACHE_CHECK_SECONDS; after that a cheap version
+# probe decides whether the row changed and the settings have to be merged and compiled again.
+_CACHE: TTLCache[tuple[int, int | None], tuple[float, CompiledBotSettings]] = TTLCache(
+    "bot_settings", max_entries=max(100, env_int("BOT_SETTINGS_CACHE_MAX_ENTRIES", 2000))
+)
+_CACHE_CHECK_SECONDS = max(1, env_int("BOT_SETTINGS_VERSION_CHECK_SECONDS", 5))
 
 
 def _deep_merge(base: dict[str, Any], override: dict[str, Any]) -> dict[str, Any]:
@@ -151,31 +159,59 @@ def _fetch_settings(
     return _parse_json(raw)
 
 
-def load_bot_settings(mysql_cfg: dict, user_id: int, workspace_id: int | None) -> dict[str, Any]:
+def _fetch_settings_version(
+    cursor: mysql.connector.cursor.MySQLCursor, user_id: int, workspace_id: int | None
+) -> tuple:
+    # updated_at only has second precision, so the checksum catches two saves in one second.
+    updated_expr = "updated_at" if column_exists(cursor, "bot_customization", "updated_at") else "NULL"
+    cursor.execute(
+        f"""
+        SELECT workspace_id, {updated_expr}, CRC32(settings_json)
+        FROM bot_customization
+        WHERE user_id = %s AND (workspace_id IS NULL OR workspace_id <=> %s)
+        ORDER BY workspace_id IS NOT NULL, workspace_id
+        """,
+        (int(user_id), int(workspace_id) if workspace_id is not None else None),
+    )
+    return tuple(tuple(row) for row in cursor.fetchall() or [])
+
+
+def _load_merged_settings(conn, user_id: int, workspace_id: int | None) -> dict[str, Any]:
+    cursor = conn.cursor(dictionary=True)
+    global_settings = _fetch_settings(cursor, user_id, None)
+    workspace_settings = _fetch_settings(cursor, user_id, workspace_id) if workspace_id is not None else None
+    merged = normalize_settings(None)
+    if global_settings:
+        merged = _deep_merge(merged, global_settings)
+    if workspace_settings:
+        merged = _deep_merge(merged, workspace_settings)
+    return merged
+
+
+def load_compiled_bot_settings(mysql_cfg: dict, user_id: int, workspace_id: int | None) -> CompiledBotSettings:
     cache_key = (int(user_id), int(workspace_id) if workspace_id is not None else None)
     cached = _CACHE.get(cache_key)
-    if cached and time.time() - cached[0] <= _CACHE_TTL_SECONDS:
+    now = time.monotonic()
+    if cached and now - cached[0] <= _CACHE_CHECK_SECONDS:
         return cached[1]
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "bot_customization"):
-            settings = normalize_settings(None)
-            _CACHE[cache_key] = (time.time(), settings)
-            return settings
-        cursor = conn.cursor(dictionary=True)
-        global_settings = _fetch_settings(cursor, user_id, None)
-        workspace_settings = _fetch_settings(cursor, user_id, workspace_id) if workspace_id is not None else None
-        merged = normalize_settings(None)
-        if global_settings:
-            merged = _deep_merge(merged, global_settings)
-        if workspace_settings:
-            merged = _deep_merge(merged, workspace_settings)
-        _CACHE[cache_key] = (time.time(), merged)
-        return merged
-    finally:
-        conn.close()
+            compiled = cached[1] if cached and cached[1].version is None else compile_bot_settings(None)
+            _CACHE.set(cache_key, (now, compiled))
+            return compiled
+        version = _fetch_settings_version(cursor, user_id, workspace_id)
+        if cached and cached[1].version == version:
+            _CACHE.set(cache_key, (now, cached[1]))
+            return cached[1]
+        compiled = compile_bot_settings(_load_merged_settings(conn, user_id, workspace_id), version=version)
+    _CACHE.set(cache_key, (now, compiled))
+    return compiled
+
+
+def load_bot_settings(mysql_cfg: dict, user_id: int, workspace_id: int | None) -> dict[str, Any]:
+    return load_compiled_bot_settings(mysql_cfg, user_id, workspace_id).settings
 
 
 def _normalize_command_aliases(value: Any) -> list[str]:
@@ -350,6 +386,15 @@ def get_ai_overrides(settings: dict[str, Any]) -> dict[str, Any]:
     return overrides
 
 
+def get_reply_debounce_seconds(settings: dict[str, Any]) -> float:
+    ai = settings.get("ai", {}) if isinstance(settings, dict) else {}
+    try:
+        seconds = float(ai.get("reply_debounce_seconds") or 0)
+    except Exception:
+        seconds = 0.0
+    return min(max(seconds, 0.0), 30.0)
+
+
 def get_review_bonus_minutes(settings: dict[str, Any]) -> int:
     try:
         hours = int(settings.get("review_bonus_hours") or 0)
@@ -383,3 +428,66 @@ def build_allowed_command_list(alias_map: dict[str, str]) -> list[str]:
     if not alias_map:
         return list(COMMAND_PREFIXES)
     return list(set(list(alias_map.keys()) + list(COMMAND_PREFIXES)))
+
+
+@dataclass
+class CompiledBotSettings:
+    # Everything log_message derives from the settings, built once per settings version
+    # instead of once per message. Static response templates are rendered on first use.
+    settings: dict[str, Any]
+    version: tuple | None
+    alias_map: dict[str, str]
+    display_map: dict[str, list[str]]
+    command_labels: dict[str, str]
+    commands_text: str
+    commands_help_text: str
+    allowed_commands: list[str]
+    style_prompt: str | None
+    ai_context_additions: str | None
+    ai_overrides: dict[str, Any]
+    reply_debounce_seconds: float = 0.0
+    _responses: dict[tuple[str, str], str] = field(default_factory=dict, repr=False)
+
+    def response(self, key: str, fallback: str) -> str:
+        cache_key = (key, fallback)
+        text = self._responses.get(cache_key)
+        if text is None:
+            text = render_template(
+                resolve_response(self.settings, key, fallback),
+                commands_text=self.commands_text,
+                command_labels=self.command_labels,
+            )
+            self._responses[cache_key] = text
+        return text
+
+
+def compile_bot_settings(settings: dict[str, Any] | None, *, version: tuple | None = None) -> CompiledBotSettings:
+    if settings is None:
+        settings = normalize_settings(None)
+    alias_map, display_map = build_command_alias_map(settings)
+    command_labels = build_command_label_map(settings)
+    commands_text = build_commands_text(settings, display_map)
+    commands_help_text = render_template(
+        resolve_response(settings, "commands_help", DEFAULT_RESPONSES["commands_help"]),
+        commands_text=commands_text,
+        command_labels=command_labels,
+    )
+    try:
+        ai_overrides = get_ai_overrides(settings)
+    except Exception:
+        ai_overrides = {}
+    return CompiledBotSettings(
+        settings=settings,
+        version=version,
+        alias_map=alias_map,
+        display_map=display_map,
+        command_labels=command_labels,
+        commands_text=commands_text,
+        commands_help_text=commands_help_text,
+        allowed_commands=build_allowed_command_list(alias_map),
+        style_prompt=build_style_prompt(settings),
+        ai_context_additions=build_ai_context_additions(settings, commands_text),
+        ai_overrides=ai_overrides,
+        reply_debounce_seconds=get_reply_debounce_seconds(settings),
+    )
+
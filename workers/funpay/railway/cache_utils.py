@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[K, V]):
+    # Thread-safe LRU map with an optional default TTL and per-entry TTLs. get/set/pop are
+    # O(1): expired entries are dropped when they are read, and the size bound evicts the
+    # least recently used entry. prune() sweeps expired entries without sorting.
+    def __init__(self, name: str, *, max_entries: int, ttl_seconds: float | None = None) -> None:
+        self.name = name
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[K, tuple[float | None, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        _register(self)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K, default: Any = None) -> V | Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: K, value: V, *, ttl: float | None = None) -> None:
+        ttl = self.ttl_seconds if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: K, default: Any = None) -> V | Any:
+        with self._lock:
+            entry = self._entries.pop(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        return entry[1]
+
+    def items(self) -> list[tuple[K, V]]:
+        # Snapshot of the live entries; does not count as a use.
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value) for key, (expires_at, value) in self._entries.items() if expires_at is None or expires_at > now]
+
+    def pop_where(self, predicate: Callable[[K], bool]) -> int:
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def prune(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (expires_at, _) in self._entries.items() if expires_at is not None and expires_at <= now]
+            for key in expired:
+                del self._entries[key]
+            self.expirations += len(expired)
+        return len(expired)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+_CACHES: weakref.WeakSet[TTLCache] = weakref.WeakSet()
+_CACHES_LOCK = threading.Lock()
+
+
+def _register(cache: TTLCache) -> None:
+    with _CACHES_LOCK:
+        _CACHES.add(cache)
+
+
+def prune_caches() -> int:
+    with _CACHES_LOCK:
+        caches = list(_CACHES)
+    return sum(cache.prune() for cache in caches)
+
+
+def cache_stats() -> dict[str, dict[str, int]]:
+    with _CACHES_LOCK:
+        caches = list(_CACHES)
+    return {cache.name: cache.stats() for cache in caches}
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+from typing import Iterable
+
+from .cache_utils import TTLCache
+from .db_utils import column_exists, mysql_connection, resolve_workspace_mysql_cfg, table_exists
+from .env_utils import env_int
+from .models import ChatContext
+from .text_utils import normalize_owner_name
+
+
+CHAT_CONTEXT_MESSAGES = max(1, min(50, env_int("CHAT_CONTEXT_MESSAGES", 20)))
+CHAT_CONTEXT_MAX_CHATS = max(100, env_int("CHAT_CONTEXT_MAX_CHATS", 2000))
+CHAT_CONTEXT_TTL_SECONDS = max(5, env_int("CHAT_CONTEXT_TTL_SECONDS", 300))
+CHAT_CONTEXT_OWNER_TTL_SECONDS = max(0, env_int("CHAT_CONTEXT_OWNER_TTL_SECONDS", 20))
+
+_ChatKey = tuple[int, int | None, int]
+
+# Per-chat state used while handling a new message: AI pause, the last messages (which also
+# answer "is this the first message") and the buyer's accounts. A context is loaded with a
+# single query on first use and then kept current by the write paths in this process
+# (insert_chat_message, set_ai_pause, account assignment/release). Bulk history ingestion
+# drops the affected contexts instead. LRU bounded, and reloaded after the TTL so changes
+# made by the panel are picked up.
+_CONTEXTS: TTLCache[_ChatKey, ChatContext] = TTLCache(
+    "chat_contexts", max_entries=CHAT_CONTEXT_MAX_CHATS, ttl_seconds=CHAT_CONTEXT_TTL_SECONDS
+)
+# Guards the message window inside a cached context.
+_CONTEXT_MESSAGES_LOCK = threading.Lock()
+
+
+def _chat_key(user_id: int, workspace_id: int | None, chat_id: int) -> _ChatKey:
+    return int(user_id), int(workspace_id) if workspace_id is not None else None, int(chat_id)
+
+
+def _parse_paused_until(value) -> datetime | None:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except Exception:
+        return None
+
+
+def _load_chat_context(mysql_cfg: dict, key: _ChatKey) -> ChatContext:
+    user_id, workspace_id, chat_id = key
+    ctx = ChatContext(loaded_ts=time.monotonic())
+    cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
+    with mysql_connection(cfg) as conn:
+        cursor = conn.cursor(dictionary=True)
+        has_pause = table_exists(cursor, "chats") and column_exists(cursor, "chats", "ai_paused_until")
+        has_messages = table_exists(cursor, "chat_messages")
+        ctx.history_known = has_messages
+        if not has_pause and not has_messages:
+            ctx.complete = True
+            return ctx
+        joins: list[str] = []
+        params: list = []
+        if has_pause:
+            joins.append(
+                """
+                LEFT JOIN (
+                    SELECT ai_paused_until
+                    FROM chats
+                    WHERE user_id = %s AND workspace_id <=> %s AND chat_id = %s
+                    LIMIT 1
+                ) c ON TRUE
+                """
+            )
+            params.extend([user_id, workspace_id, chat_id])
+        if has_messages:
+            # One extra row tells whether the window holds the whole history.
+            joins.append(
+                """
+                LEFT JOIN (
+                    SELECT id, author, text, sent_time, by_bot
+                    FROM chat_messages
+                    WHERE user_id = %s AND workspace_id <=> %s AND chat_id = %s
+                    ORDER BY sent_time DESC, id DESC
+                    LIMIT %s
+                ) m ON TRUE
+                """
+            )
+            params.extend([user_id, workspace_id, chat_id, CHAT_CONTEXT_MESSAGES + 1])
+        cursor.execute(
+            f"""
+            SELECT {'c.ai_paused_until' if has_pause else 'NULL AS ai_paused_until'},
+                   {'m.id, m.author, m.text, m.sent_time, m.by_bot' if has_messages else 'NULL AS id'}
+            FROM (SELECT 1 AS anchor) anchor
+            {''.join(joins)}
+            {'ORDER BY m.sent_time DESC, m.id DESC' if has_messages else ''}
+            """,
+            tuple(params),
+        )
+        rows = list(cursor.fetchall() or [])
+    if rows:
+        ctx.ai_paused_until = _parse_paused_until(rows[0].get("ai_paused_until"))
+    messages = [
+        {
+            "author": row.get("author"),
+            "text": row.get("text"),
+            "sent_time": row.get("sent_time"),
+            "by_bot": row.get("by_bot"),
+        }
+        for row in rows
+        if row.get("id") is not None
+    ]
+    ctx.complete = len(messages) <= CHAT_CONTEXT_MESSAGES
+    messages = messages[:CHAT_CONTEXT_MESSAGES]
+    messages.reverse()
+    ctx.messages = messages
+    return ctx
+
+
+def peek_chat_context(user_id: int, workspace_id: int | None, chat_id: int) -> ChatContext | None:
+    return _CONTEXTS.get(_chat_key(user_id, workspace_id, chat_id))
+
+
+def get_chat_context(mysql_cfg: dict, user_id: int, workspace_id: int | None, chat_id: int) -> ChatContext:
+    ctx = peek_chat_context(user_id, workspace_id, chat_id)
+    if ctx is not None:
+        return ctx
+    key = _chat_key(user_id, workspace_id, chat_id)
+    ctx = _load_chat_context(mysql_cfg, key)
+    _CONTEXTS.set(key, ctx)
+    return ctx
+
+
+def is_context_ai_paused(ctx: ChatContext, now: datetime | None = None) -> bool:
+    if ctx.ai_paused_until is None:
+        return False
+    return ctx.ai_paused_until > (now or datetime.utcnow())
+
+
+def remember_chat_message(
+    user_id: int,
+    workspace_id: int | None,
+    chat_id: int,
+    *,
+    author: str | None,
+    text: str | None,
+    by_bot: bool,
+    sent_time: datetime | None,
+) -> None:
+    ctx = peek_chat_context(user_id, workspace_id, chat_id)
+    if ctx is None:
+        return
+    row = {"author": author, "text": text, "sent_time": sent_time, "by_bot": 1 if by_bot else 0}
+    with _CONTEXT_MESSAGES_LOCK:
+        # Same order as the loader (sent_time, then insertion); NULL times sort first.
+        sort_key = sent_time or datetime.min
+        idx = len(ctx.messages)
+        while idx > 0 and (ctx.messages[idx - 1].get("sent_time") or datetime.min) > sort_key:
+            idx -= 1
+        if idx == 0 and ctx.messages and not ctx.complete:
+            # Older than the cached window: the rows in between are not known here.
+            return
+        ctx.messages.insert(idx, row)
+        if len(ctx.messages) > CHAT_CONTEXT_MESSAGES:
+            del ctx.messages[: len(ctx.messages) - CHAT_CONTEXT_MESSAGES]
+            ctx.complete = False
+
+
+def remember_ai_pause(user_id: int, workspace_id: int | None, chat_id: int, paused_until: datetime) -> None:
+    ctx = peek_chat_context(user_id, workspace_id, chat_id)
+    if ctx is not None:
+        ctx.ai_paused_until = paused_until
+
+
+def recent_context_messages(
+    user_id: int,
+    workspace_id: int | None,
+    chat_id: int,
+    limit: int,
+) -> list[dict] | None:
+    # None means the cached window cannot answer the request and the caller should query.
+    ctx = peek_chat_context(user_id, workspace_id, chat_id)
+    if ctx is None:
+        return None
+    limit = max(1, min(int(limit), 50))
+    with _CONTEXT_MESSAGES_LOCK:
+        if len(ctx.messages) < limit and not ctx.complete:
+            return None
+        return [dict(row) for row in ctx.messages[-limit:]]
+
+
+def cached_owner_accounts(
+    user_id: int,
+    workspace_id: int | None,
+    chat_id: int,
+    owner: str | None,
+) -> list[dict] | None:
+    ctx = peek_chat_context(user_id, workspace_id, chat_id)
+    if ctx is None or ctx.owner_accounts is None:
+        return None
+    if ctx.owner != normalize_owner_name(owner):
+        return None
+    if time.monotonic() - ctx.owner_accounts_ts > CHAT_CONTEXT_OWNER_TTL_SECONDS:
+        return None
+    return [dict(row) for row in ctx.owner_accounts]
+
+
+def remember_owner_accounts(
+    user_id: int,
+    workspace_id: int | None,
+    chat_id: int,
+    owner: str | None,
+    accounts: list[dict],
+) -> None:
+    ctx = peek_chat_context(user_id, workspace_id, chat_id)
+    # Empty results are not kept: a buyer who just paid must see the account right away
+    # even if the assignment came from another process.
+    if ctx is None or not accounts:
+        return
+    ctx.owner = normalize_owner_name(owner)
+    ctx.owner_accounts = [dict(row) for row in accounts]
+    ctx.owner_accounts_ts = time.monotonic()
+
+
+def forget_owner_accounts(user_id: int | None = None) -> None:
+    for key, ctx in _CONTEXTS.items():
+        if user_id is None or key[0] == int(user_id):
+            ctx.owner_accounts = None
+
+
+def forget_chat_contexts(user_id: int, workspace_id: int | None, chat_ids: Iterable[int]) -> None:
+    for chat_id in chat_ids:
+        _CONTEXTS.pop(_chat_key(user_id, workspace_id, chat_id))
+
+
+def forget_workspace_contexts(workspace_id: int | None) -> None:
+    ws = int(workspace_id) if workspace_id is not None else None
+    _CONTEXTS.pop_where(lambda key: key[1] == ws)
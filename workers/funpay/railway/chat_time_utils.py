@@ -222,3 +222,15 @@ def _extract_datetime_from_html(html: str | None) -> datetime | None:
             return dt
 
     return None
+
+
+def _extract_message_datetime(msg) -> datetime | None:
+    # Messages parsed by Account.__parse_messages already carry their time candidates.
+    candidates = getattr(msg, "time_texts", None)
+    if candidates is None:
+        return _extract_datetime_from_html(getattr(msg, "html", None))
+    for candidate in candidates:
+        dt = _parse_funpay_datetime(candidate)
+        if dt:
+            return dt
+    return None
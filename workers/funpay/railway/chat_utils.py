@@ -2,45 +2,49 @@ from __future__ import annotations
 
 import logging
 import os
+import threading
 import time
+import weakref
 from datetime import datetime, timedelta
 
-import mysql.connector
 from requests import exceptions as requests_exceptions
 from FunPayAPI.account import Account
 
-from .chat_time_utils import _extract_datetime_from_html
-from .db_utils import column_exists, resolve_workspace_mysql_cfg, table_exists
+from .ai_pipeline_utils import cancel_ai_replies
+from .cache_utils import TTLCache
+from .chat_context_utils import (
+    forget_chat_contexts,
+    recent_context_messages,
+    remember_ai_pause,
+    remember_chat_message,
+)
+from .chat_time_utils import _extract_datetime_from_html, _extract_message_datetime
+from .db_utils import (
+    column_exists,
+    invalidate_schema_snapshot,
+    mysql_connection,
+    resolve_workspace_mysql_cfg,
+    table_exists,
+)
 from .notifications_utils import log_notification_event
 from .env_utils import env_bool, env_int
-from .presence_utils import invalidate_chat_cache, should_prefetch_history
+from .models import ChatListSyncState
+from .presence_utils import invalidate_chat_cache, invalidate_chat_caches, should_prefetch_history
 from .text_utils import normalize_owner_name
 
 
-def is_first_time_chat(
-    mysql_cfg: dict,
-    user_id: int,
-    workspace_id: int | None,
-    chat_id: int,
-) -> bool:
-    cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
-        cursor = conn.cursor()
-        if not table_exists(cursor, "chat_messages"):
-            return False
-        cursor.execute(
-            """
-            SELECT 1
-            FROM chat_messages
-            WHERE user_id = %s AND workspace_id <=> %s AND chat_id = %s
-            LIMIT 1
-            """,
-            (int(user_id), int(workspace_id) if workspace_id is not None else None, int(chat_id)),
-        )
-        return cursor.fetchone() is None
-    finally:
-        conn.close()
+_ACCOUNT_LOCKS: weakref.WeakKeyDictionary[Account, threading.RLock] = weakref.WeakKeyDictionary()
+_ACCOUNT_LOCKS_GUARD = threading.Lock()
+
+
+def account_lock(account: Account) -> threading.RLock:
+    # An Account, its Runner and their requests.Session are not thread-safe. AI replies are sent
+    # from the AI pool while the polling thread reads updates, so both sides hold this lock.
+    with _ACCOUNT_LOCKS_GUARD:
+        lock = _ACCOUNT_LOCKS.get(account)
+        if lock is None:
+            lock = _ACCOUNT_LOCKS[account] = threading.RLock()
+        return lock
 
 
 def send_chat_message(logger: logging.Logger, account: Account, chat_id: int, text: str) -> bool:
@@ -48,7 +52,8 @@ def send_chat_message(logger: logging.Logger, account: Account, chat_id: int, te
     retry_delay = max(0, env_int("FUNPAY_CHAT_SEND_RETRY_DELAY", 1))
     for attempt in range(retries + 1):
         try:
-            account.send_message(chat_id, text)
+            with account_lock(account):
+                account.send_message(chat_id, text)
             return True
         except Exception as exc:
             should_retry = isinstance(
@@ -83,8 +88,7 @@ def _fetch_chat_id_by_owner(
     if not owner_key:
         return None
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         if not table_exists(cursor, "chats"):
             return None
@@ -101,15 +105,12 @@ def _fetch_chat_id_by_owner(
         row = cursor.fetchone()
         if row and row.get("chat_id") is not None:
             return int(row["chat_id"])
-    finally:
-        conn.close()
     if owner_key.startswith("@"):
         trimmed = owner_key.lstrip("@").strip()
         if not trimmed:
             return None
         cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-        conn = mysql.connector.connect(**cfg)
-        try:
+        with mysql_connection(cfg) as conn:
             cursor = conn.cursor(dictionary=True)
             if not table_exists(cursor, "chats"):
                 return None
@@ -126,8 +127,6 @@ def _fetch_chat_id_by_owner(
             row = cursor.fetchone()
             if row and row.get("chat_id") is not None:
                 return int(row["chat_id"])
-        finally:
-            conn.close()
     return None
 
 
@@ -209,8 +208,7 @@ def _fetch_latest_chat_times(
     if not chat_ids:
         return {}
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         placeholders = ", ".join(["%s"] * len(chat_ids))
         params: list = [int(user_id)]
@@ -242,8 +240,6 @@ def _fetch_latest_chat_times(
             except Exception:
                 continue
         return result
-    finally:
-        conn.close()
 
 
 def _fetch_recent_chat_messages(
@@ -254,8 +250,7 @@ def _fetch_recent_chat_messages(
     limit: int = 10,
 ) -> list[dict]:
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         if not table_exists(cursor, "chat_messages"):
             return []
@@ -277,8 +272,6 @@ def _fetch_recent_chat_messages(
         rows = list(cursor.fetchall() or [])
         rows.reverse()
         return rows
-    finally:
-        conn.close()
 
 
 def build_recent_chat_context(
@@ -290,13 +283,15 @@ def build_recent_chat_context(
     limit: int = 8,
     include_bot: bool = False,
 ) -> list[str]:
-    rows = _fetch_recent_chat_messages(
-        mysql_cfg,
-        user_id,
-        workspace_id,
-        chat_id,
-        limit=limit,
-    )
+    rows = recent_context_messages(user_id, workspace_id, chat_id, limit)
+    if rows is None:
+        rows = _fetch_recent_chat_messages(
+            mysql_cfg,
+            user_id,
+            workspace_id,
+            chat_id,
+            limit=limit,
+        )
     lines: list[str] = []
     for row in rows:
         if not include_bot and row.get("by_bot"):
@@ -319,30 +314,45 @@ def _is_admin_command(text: str | None) -> bool:
     return "!админ" in lowered or "!admin" in lowered
 
 
-def upsert_chat_summary(
+def upsert_chat_summaries(
     mysql_cfg: dict,
     *,
     user_id: int,
     workspace_id: int | None,
-    chat_id: int,
-    name: str | None,
-    last_message_text: str | None,
-    unread: bool | None,
-    last_message_time: datetime | None = None,
+    summaries: list[dict],
 ) -> None:
+    if not summaries:
+        return
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "chats"):
             return
+        params: list = []
+        for item in summaries:
+            name = item.get("name")
+            last_message_text = item.get("last_message_text")
+            params.extend(
+                [
+                    int(item["chat_id"]),
+                    name.strip() if isinstance(name, str) and name.strip() else None,
+                    last_message_text.strip()
+                    if isinstance(last_message_text, str) and last_message_text.strip()
+                    else None,
+                    item.get("last_message_time"),
+                    1 if item.get("unread") else 0,
+                    int(user_id),
+                    int(workspace_id) if workspace_id is not None else None,
+                ]
+            )
+        placeholders = ", ".join(["(%s, %s, %s, %s, %s, 0, 0, %s, %s)"] * len(summaries))
         cursor.execute(
-            """
+            f"""
             INSERT INTO chats (
                 chat_id, name, last_message_text, last_message_time, unread,
                 admin_unread_count, admin_requested, user_id, workspace_id
             )
-            VALUES (%s, %s, %s, %s, %s, 0, 0, %s, %s)
+            VALUES {placeholders}
             ON DUPLICATE KEY UPDATE
                 name = VALUES(name),
                 last_message_text = VALUES(last_message_text),
@@ -354,19 +364,36 @@ def upsert_chat_summary(
                 END,
                 unread = VALUES(unread)
             """,
-            (
-                int(chat_id),
-                name.strip() if isinstance(name, str) and name.strip() else None,
-                last_message_text.strip() if isinstance(last_message_text, str) and last_message_text.strip() else None,
-                last_message_time,
-                1 if unread else 0,
-                int(user_id),
-                int(workspace_id) if workspace_id is not None else None,
-            ),
+            tuple(params),
         )
         conn.commit()
-    finally:
-        conn.close()
+
+
+def upsert_chat_summary(
+    mysql_cfg: dict,
+    *,
+    user_id: int,
+    workspace_id: int | None,
+    chat_id: int,
+    name: str | None,
+    last_message_text: str | None,
+    unread: bool | None,
+    last_message_time: datetime | None = None,
+) -> None:
+    upsert_chat_summaries(
+        mysql_cfg,
+        user_id=user_id,
+        workspace_id=workspace_id,
+        summaries=[
+            {
+                "chat_id": chat_id,
+                "name": name,
+                "last_message_text": last_message_text,
+                "unread": unread,
+                "last_message_time": last_message_time,
+            }
+        ],
+    )
 
 
 def set_ai_pause(
@@ -381,9 +408,10 @@ def set_ai_pause(
     pause_seconds = int(seconds) if seconds is not None else env_int("AI_SNOOZE_SECONDS", 300)
     if pause_seconds <= 0:
         return
+    # The seller took over: replies still being generated for this chat must not go out.
+    cancel_ai_replies(user_id, workspace_id, chat_id)
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "chats"):
             return
@@ -391,6 +419,7 @@ def set_ai_pause(
             try:
                 cursor.execute("ALTER TABLE chats ADD COLUMN ai_paused_until TIMESTAMP NULL")
                 conn.commit()
+                invalidate_schema_snapshot()
             except Exception:
                 return
         paused_until = datetime.utcnow() + timedelta(seconds=pause_seconds)
@@ -414,8 +443,7 @@ def set_ai_pause(
             ),
         )
         conn.commit()
-    finally:
-        conn.close()
+    remember_ai_pause(int(user_id), workspace_id, int(chat_id), paused_until)
 
 
 def is_ai_paused(
@@ -426,8 +454,7 @@ def is_ai_paused(
     chat_id: int,
 ) -> bool:
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         if not table_exists(cursor, "chats"):
             return False
@@ -459,8 +486,6 @@ def is_ai_paused(
         except Exception:
             return False
         return parsed > datetime.utcnow()
-    finally:
-        conn.close()
 
 
 def insert_chat_message(
@@ -476,9 +501,14 @@ def insert_chat_message(
     message_type: str | None,
     sent_time: datetime | None = None,
 ) -> None:
+    message_row = {
+        "author": author.strip() if isinstance(author, str) and author.strip() else None,
+        "text": text,
+        "by_bot": bool(by_bot),
+        "sent_time": sent_time,
+    }
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "chat_messages"):
             return
@@ -493,7 +523,7 @@ def insert_chat_message(
             (
                 int(message_id),
                 int(chat_id),
-                author.strip() if isinstance(author, str) and author.strip() else None,
+                message_row["author"],
                 text if text is not None else None,
                 sent_time,
                 1 if by_bot else 0,
@@ -557,23 +587,164 @@ def insert_chat_message(
                 workspace_id=int(workspace_id) if workspace_id is not None else None,
             )
         conn.commit()
-    finally:
-        conn.close()
+    if inserted:
+        remember_chat_message(int(user_id), workspace_id, int(chat_id), **message_row)
     invalidate_chat_cache(int(user_id), workspace_id, int(chat_id))
 
 
-def fetch_chat_outbox(
+class ChatMessageBuffer:
+    # Write-behind buffer for bulk history ingestion. Messages are flushed with multi-row
+    # INSERT ... ON DUPLICATE KEY statements once the buffer is full or old enough, and the
+    # chat caches are invalidated once per chat per flush. Buyer "!админ" messages still go
+    # through insert_chat_message so the admin call is only raised for a fresh insert.
+    def __init__(
+        self,
+        mysql_cfg: dict,
+        *,
+        user_id: int,
+        workspace_id: int | None,
+        max_rows: int | None = None,
+        max_age_seconds: float | None = None,
+    ) -> None:
+        self.mysql_cfg = mysql_cfg
+        self.user_id = int(user_id)
+        self.workspace_id = int(workspace_id) if workspace_id is not None else None
+        self.max_rows = max(1, int(max_rows if max_rows is not None else env_int("CHAT_MESSAGE_BATCH_SIZE", 200)))
+        self.max_age_seconds = max(
+            0.0,
+            float(max_age_seconds if max_age_seconds is not None else env_int("CHAT_MESSAGE_FLUSH_SECONDS", 2)),
+        )
+        self._rows: list[tuple] = []
+        self._chat_ids: set[int] = set()
+        self._first_added_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(
+        self,
+        *,
+        chat_id: int,
+        message_id: int,
+        author: str | None,
+        text: str | None,
+        by_bot: bool,
+        message_type: str | None,
+        sent_time: datetime | None = None,
+    ) -> None:
+        if not by_bot and _is_admin_command(text):
+            # The admin alert quotes the chat's recent messages, so they must be stored first.
+            if int(chat_id) in self._chat_ids:
+                self.flush()
+            insert_chat_message(
+                self.mysql_cfg,
+                user_id=self.user_id,
+                workspace_id=self.workspace_id,
+                chat_id=int(chat_id),
+                message_id=int(message_id),
+                author=author,
+                text=text,
+                by_bot=by_bot,
+                message_type=message_type,
+                sent_time=sent_time,
+            )
+            return
+        if not self._rows:
+            self._first_added_at = time.monotonic()
+        self._rows.append(
+            (
+                int(message_id),
+                int(chat_id),
+                author.strip() if isinstance(author, str) and author.strip() else None,
+                text,
+                sent_time,
+                1 if by_bot else 0,
+                message_type,
+                self.user_id,
+                self.workspace_id,
+            )
+        )
+        self._chat_ids.add(int(chat_id))
+        if self.due():
+            self.flush()
+
+    def due(self) -> bool:
+        if not self._rows:
+            return False
+        if len(self._rows) >= self.max_rows:
+            return True
+        return time.monotonic() - self._first_added_at >= self.max_age_seconds
+
+    def flush(self) -> int:
+        rows, chat_ids = self._rows, self._chat_ids
+        self._rows, self._chat_ids = [], set()
+        if not rows:
+            return 0
+        cfg = resolve_workspace_mysql_cfg(self.mysql_cfg, self.workspace_id)
+        inserted = 0
+        with mysql_connection(cfg) as conn:
+            cursor = conn.cursor()
+            if not table_exists(cursor, "chat_messages"):
+                return 0
+            for idx in range(0, len(rows), self.max_rows):
+                chunk = rows[idx : idx + self.max_rows]
+                placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(chunk))
+                cursor.execute(
+                    f"""
+                    INSERT INTO chat_messages (
+                        message_id, chat_id, author, text, sent_time, by_bot, message_type, user_id, workspace_id
+                    )
+                    VALUES {placeholders}
+                    ON DUPLICATE KEY UPDATE id = id
+                    """,
+                    tuple(value for row in chunk for value in row),
+                )
+                inserted += max(0, cursor.rowcount)
+            conn.commit()
+        forget_chat_contexts(self.user_id, self.workspace_id, chat_ids)
+        invalidate_chat_caches(self.user_id, self.workspace_id, chat_ids)
+        return inserted
+
+
+def _ensure_outbox_claim_column(conn, cursor) -> bool:
+    if column_exists(cursor, "chat_outbox", "claimed_at"):
+        return True
+    try:
+        cursor.execute("ALTER TABLE chat_outbox ADD COLUMN claimed_at TIMESTAMP NULL AFTER sent_at")
+        conn.commit()
+        invalidate_schema_snapshot()
+        return True
+    except Exception:
+        return False
+
+
+def claim_chat_outbox(
     mysql_cfg: dict,
     user_id: int,
     workspace_id: int | None,
     limit: int = 20,
 ) -> list[dict]:
+    # Rows are moved to 'sending' under FOR UPDATE SKIP LOCKED, so two workers sharing a
+    # workspace never send the same message. Claims older than the timeout (a worker died
+    # mid-send) go back to 'pending'.
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    workspace_value = int(workspace_id) if workspace_id is not None else None
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         if not table_exists(cursor, "chat_outbox"):
             return []
+        if not _ensure_outbox_claim_column(conn, cursor):
+            return []
+        cursor.execute(
+            """
+            UPDATE chat_outbox
+            SET status = 'pending', claimed_at = NULL
+            WHERE status = 'sending' AND user_id = %s AND workspace_id <=> %s
+              AND claimed_at < NOW() - INTERVAL %s SECOND
+            """,
+            (int(user_id), workspace_value, max(30, env_int("CHAT_OUTBOX_CLAIM_TIMEOUT_SECONDS", 120))),
+        )
+        conn.commit()
         cursor.execute(
             """
             SELECT id, chat_id, text, attempts
@@ -581,52 +752,67 @@ def fetch_chat_outbox(
             WHERE status = 'pending' AND user_id = %s AND workspace_id <=> %s
             ORDER BY id ASC
             LIMIT %s
+            FOR UPDATE SKIP LOCKED
             """,
-            (int(user_id), int(workspace_id) if workspace_id is not None else None, int(max(1, min(limit, 200)))),
-        )
-        return list(cursor.fetchall() or [])
-    finally:
-        conn.close()
-
-
-def mark_outbox_sent(mysql_cfg: dict, outbox_id: int, workspace_id: int | None = None) -> None:
-    cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE chat_outbox SET status='sent', sent_at=NOW() WHERE id = %s",
-            (int(outbox_id),),
+            (int(user_id), workspace_value, int(max(1, min(limit, 200)))),
         )
+        rows = list(cursor.fetchall() or [])
+        if rows:
+            ids = [int(row["id"]) for row in rows]
+            cursor.execute(
+                f"""
+                UPDATE chat_outbox
+                SET status = 'sending', attempts = attempts + 1, claimed_at = NOW()
+                WHERE id IN ({", ".join(["%s"] * len(ids))})
+                """,
+                tuple(ids),
+            )
+            for row in rows:
+                row["attempts"] = int(row.get("attempts") or 0) + 1
         conn.commit()
-    finally:
-        conn.close()
+        return rows
 
 
-def mark_outbox_failed(
+def apply_outbox_results(
     mysql_cfg: dict,
-    outbox_id: int,
-    error: str,
-    attempts: int,
+    *,
+    workspace_id: int | None,
+    sent_ids: list[int],
+    failures: list[tuple[int, str, int]],
     max_attempts: int,
-    workspace_id: int | None = None,
 ) -> None:
+    if not sent_ids and not failures:
+        return
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
-        status = "failed" if attempts >= max_attempts else "pending"
-        cursor.execute(
-            """
-            UPDATE chat_outbox
-            SET status=%s, attempts=%s, last_error=%s
-            WHERE id = %s
-            """,
-            (status, int(attempts), error[:500], int(outbox_id)),
-        )
+        if sent_ids:
+            cursor.execute(
+                f"""
+                UPDATE chat_outbox
+                SET status = 'sent', sent_at = NOW(), claimed_at = NULL
+                WHERE id IN ({", ".join(["%s"] * len(sent_ids))})
+                """,
+                tuple(int(outbox_id) for outbox_id in sent_ids),
+            )
+        if failures:
+            cursor.executemany(
+                """
+                UPDATE chat_outbox
+                SET status = %s, attempts = %s, last_error = %s, claimed_at = NULL
+                WHERE id = %s
+                """,
+                [
+                    (
+                        "failed" if attempts >= max_attempts else "pending",
+                        int(attempts),
+                        error[:500],
+                        int(outbox_id),
+                    )
+                    for outbox_id, error, attempts in failures
+                ],
+            )
         conn.commit()
-    finally:
-        conn.close()
 
 
 def fetch_chats_missing_history(
@@ -639,8 +825,7 @@ def fetch_chats_missing_history(
     if not chat_ids:
         return []
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "chat_messages"):
             return list(chat_ids)
@@ -655,8 +840,6 @@ def fetch_chats_missing_history(
         )
         existing = {int(row[0]) for row in (cursor.fetchall() or [])}
         return [cid for cid in chat_ids if int(cid) not in existing]
-    finally:
-        conn.close()
 
 
 def prefetch_chat_histories(
@@ -688,34 +871,49 @@ def prefetch_chat_histories(
     missing = missing[:max_chats]
     batch_size = env_int("CHAT_HISTORY_PREFETCH_BATCH", 4)
     msg_limit = env_int("CHAT_HISTORY_PREFETCH_MESSAGES", 50)
-    for idx in range(0, len(missing), max(1, batch_size)):
-        chunk = missing[idx : idx + max(1, batch_size)]
-        try:
-            histories = account.get_chats_histories({cid: chats.get(cid) for cid in chunk}) or {}
-        except Exception as exc:
-            logger.debug("Chat history prefetch failed: %s", exc)
-            continue
-        for chat_id, messages in histories.items():
-            if not messages:
+    buffer = ChatMessageBuffer(mysql_cfg, user_id=int(user_id), workspace_id=workspace_id)
+    try:
+        for idx in range(0, len(missing), max(1, batch_size)):
+            chunk = missing[idx : idx + max(1, batch_size)]
+            try:
+                histories = account.get_chats_histories({cid: chats.get(cid) for cid in chunk}) or {}
+            except Exception as exc:
+                logger.debug("Chat history prefetch failed: %s", exc)
                 continue
-            trimmed = messages[-msg_limit:] if msg_limit > 0 else messages
-            for msg in trimmed:
-                try:
-                    sent_time = _extract_datetime_from_html(getattr(msg, "html", None))
-                    insert_chat_message(
-                        mysql_cfg,
-                        user_id=int(user_id),
-                        workspace_id=workspace_id,
-                        chat_id=int(chat_id),
-                        message_id=int(getattr(msg, "id", 0) or 0),
-                        author=getattr(msg, "author", None) or getattr(msg, "chat_name", None),
-                        text=getattr(msg, "text", None),
-                        by_bot=bool(getattr(msg, "by_bot", False)),
-                        message_type=getattr(getattr(msg, "type", None), "name", None),
-                        sent_time=sent_time,
-                    )
-                except Exception:
+            for chat_id, messages in histories.items():
+                if not messages:
                     continue
+                trimmed = messages[-msg_limit:] if msg_limit > 0 else messages
+                for msg in trimmed:
+                    try:
+                        buffer.add(
+                            chat_id=int(chat_id),
+                            message_id=int(getattr(msg, "id", 0) or 0),
+                            author=getattr(msg, "author", None) or getattr(msg, "chat_name", None),
+                            text=getattr(msg, "text", None),
+                            by_bot=bool(getattr(msg, "by_bot", False)),
+                            message_type=getattr(getattr(msg, "type", None), "name", None),
+                            sent_time=_extract_message_datetime(msg),
+                        )
+                    except Exception:
+                        continue
+            if buffer.due():
+                try:
+                    buffer.flush()
+                except Exception as exc:
+                    logger.debug("Chat history prefetch flush failed: %s", exc)
+    finally:
+        try:
+            buffer.flush()
+        except Exception as exc:
+            logger.debug("Chat history prefetch flush failed: %s", exc)
+
+
+# A dropped state only costs one full chat list write on the next sync.
+_CHAT_LIST_SYNC_STATES: TTLCache[tuple[int, int], ChatListSyncState] = TTLCache(
+    "chat_list_sync_states",
+    max_entries=max(1, env_int("CHAT_LIST_SYNC_STATES_MAX_ENTRIES", 1000)),
+)
 
 
 def sync_chats_list(
@@ -724,31 +922,66 @@ def sync_chats_list(
     *,
     user_id: int,
     workspace_id: int | None,
+    state: ChatListSyncState | None = None,
 ) -> None:
+    if state is None:
+        key = (int(user_id), int(workspace_id) if workspace_id is not None else -1)
+        state = _CHAT_LIST_SYNC_STATES.get(key)
+        if state is None:
+            state = ChatListSyncState()
+            _CHAT_LIST_SYNC_STATES.set(key, state)
     try:
         chats_map = account.get_chats(update=True) or {}
     except Exception:
         return
-    chat_ids = [int(chat.id) for chat in chats_map.values() if getattr(chat, "id", None) is not None]
-    history_times = _fetch_latest_chat_times(mysql_cfg, int(user_id), workspace_id, chat_ids)
+    # Only chats whose preview changed since the last successful sync are written.
+    current: dict[int, tuple] = {}
+    changed: dict[int, object] = {}
     chat_names: dict[int, str | None] = {}
     for chat in chats_map.values():
         try:
             chat_id = int(chat.id)
-            chat_time = _extract_datetime_from_html(getattr(chat, "html", None)) or history_times.get(chat_id)
-            upsert_chat_summary(
+        except Exception:
+            continue
+        html = getattr(chat, "html", None)
+        signature = (
+            getattr(chat, "name", None),
+            getattr(chat, "last_message_text", None),
+            bool(getattr(chat, "unread", False)),
+            hash(html) if isinstance(html, str) else None,
+        )
+        current[chat_id] = signature
+        chat_names[chat_id] = getattr(chat, "name", None)
+        if state.summaries.get(chat_id) != signature:
+            changed[chat_id] = chat
+    if changed:
+        history_times = _fetch_latest_chat_times(mysql_cfg, int(user_id), workspace_id, list(changed.keys()))
+        summaries: list[dict] = []
+        for chat_id, chat in changed.items():
+            try:
+                chat_time = _extract_datetime_from_html(getattr(chat, "html", None)) or history_times.get(chat_id)
+                summaries.append(
+                    {
+                        "chat_id": chat_id,
+                        "name": chat.name,
+                        "last_message_text": getattr(chat, "last_message_text", None),
+                        "unread": bool(getattr(chat, "unread", False)),
+                        "last_message_time": chat_time,
+                    }
+                )
+            except Exception:
+                current.pop(chat_id, None)
+        try:
+            upsert_chat_summaries(
                 mysql_cfg,
                 user_id=int(user_id),
                 workspace_id=workspace_id,
-                chat_id=chat_id,
-                name=chat.name,
-                last_message_text=getattr(chat, "last_message_text", None),
-                unread=bool(getattr(chat, "unread", False)),
-                last_message_time=chat_time,
+                summaries=summaries,
             )
-            chat_names[chat_id] = getattr(chat, "name", None)
         except Exception:
-            continue
+            for chat_id in changed:
+                current.pop(chat_id, None)
+    state.summaries = current
     if chat_names:
         prefetch_chat_histories(
             logging.getLogger("funpay.worker"),
@@ -767,59 +1000,77 @@ def process_chat_outbox(
     *,
     user_id: int,
     workspace_id: int | None,
-) -> None:
-    pending = fetch_chat_outbox(mysql_cfg, int(user_id), workspace_id, limit=20)
-    if not pending:
-        return
+    limit: int = 20,
+) -> int:
+    claimed = claim_chat_outbox(mysql_cfg, int(user_id), workspace_id, limit=limit)
+    if not claimed:
+        return 0
     max_attempts = env_int("CHAT_OUTBOX_MAX_ATTEMPTS", 3)
-    for item in pending:
+    sent_ids: list[int] = []
+    failures: list[tuple[int, str, int]] = []
+    buffer = ChatMessageBuffer(mysql_cfg, user_id=int(user_id), workspace_id=workspace_id, max_rows=len(claimed))
+    summaries: dict[int, dict] = {}
+    for item in claimed:
         outbox_id = int(item.get("id") or 0)
         chat_id = int(item.get("chat_id") or 0)
         text = str(item.get("text") or "")
-        attempts = int(item.get("attempts") or 0) + 1
-        if not outbox_id or not chat_id or not text:
+        attempts = int(item.get("attempts") or 0)
+        if not outbox_id:
+            continue
+        if not chat_id or not text:
+            failures.append((outbox_id, "Empty message", max_attempts))
             continue
         try:
-            message = account.send_message(chat_id, text)
-            message_id = int(getattr(message, "id", 0) or 0)
-            if message_id <= 0:
-                message_id = -outbox_id
-            insert_chat_message(
-                mysql_cfg,
-                user_id=int(user_id),
-                workspace_id=workspace_id,
-                chat_id=chat_id,
-                message_id=message_id,
-                author=account.username or "you",
-                text=text,
-                by_bot=True,
-                message_type="manual",
-                sent_time=datetime.utcnow(),
-            )
-            upsert_chat_summary(
-                mysql_cfg,
-                user_id=int(user_id),
-                workspace_id=workspace_id,
-                chat_id=chat_id,
-                name=None,
-                last_message_text=text,
-                unread=False,
-                last_message_time=datetime.utcnow(),
-            )
+            with account_lock(account):
+                message = account.send_message(chat_id, text)
+        except Exception as exc:
+            logger.warning("Chat send failed: %s", exc)
+            failures.append((outbox_id, str(exc), attempts))
+            continue
+        message_id = int(getattr(message, "id", 0) or 0)
+        if message_id <= 0:
+            message_id = -outbox_id
+        sent_at = datetime.utcnow()
+        buffer.add(
+            chat_id=chat_id,
+            message_id=message_id,
+            author=account.username or "you",
+            text=text,
+            by_bot=True,
+            message_type="manual",
+            sent_time=sent_at,
+        )
+        summaries[chat_id] = {
+            "chat_id": chat_id,
+            "name": None,
+            "last_message_text": text,
+            "unread": False,
+            "last_message_time": sent_at,
+        }
+        sent_ids.append(outbox_id)
+    # Sent rows are marked even if recording the message fails, so nothing is sent twice.
+    try:
+        buffer.flush()
+        upsert_chat_summaries(
+            mysql_cfg,
+            user_id=int(user_id),
+            workspace_id=workspace_id,
+            summaries=list(summaries.values()),
+        )
+        for chat_id in summaries:
             set_ai_pause(
                 mysql_cfg,
                 user_id=int(user_id),
                 workspace_id=workspace_id,
                 chat_id=chat_id,
             )
-            mark_outbox_sent(mysql_cfg, outbox_id, workspace_id=workspace_id)
-        except Exception as exc:
-            logger.warning("Chat send failed: %s", exc)
-            mark_outbox_failed(
-                mysql_cfg,
-                outbox_id,
-                str(exc),
-                attempts,
-                max_attempts,
-                workspace_id=workspace_id,
-            )
+    except Exception as exc:
+        logger.warning("Failed to record sent outbox messages: %s", exc)
+    apply_outbox_results(
+        mysql_cfg,
+        workspace_id=workspace_id,
+        sent_ids=sent_ids,
+        failures=failures,
+        max_attempts=max_attempts,
+    )
+    return len(claimed)
@@ -1,28 +1,342 @@
 from __future__ import annotations
 
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator
 from urllib.parse import urlparse
 
 import mysql.connector
+from mysql.connector import errors as mysql_errors
 
+from .cache_utils import TTLCache
+from .env_utils import env_int
 
-_WORKSPACE_DB_CACHE: dict[int, str] = {}
 
+_WORKSPACE_DB_CACHE: TTLCache[int, str] = TTLCache(
+    "workspace_db", max_entries=10000, ttl_seconds=env_int("WORKSPACE_DB_CACHE_TTL_SECONDS", 3600)
+)
 
-def table_exists(cursor: mysql.connector.cursor.MySQLCursor, table: str) -> bool:
-    cursor.execute(
-        "SELECT 1 FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s LIMIT 1",
-        (table,),
+
+@dataclass
+class _PooledConnection:
+    conn: mysql.connector.MySQLConnection
+    created_at: float
+    last_used_at: float
+
+
+def _schema_key(mysql_cfg: dict) -> tuple:
+    return (
+        str(mysql_cfg.get("host") or ""),
+        int(mysql_cfg.get("port") or 3306),
+        str(mysql_cfg.get("database") or ""),
     )
-    return cursor.fetchone() is not None
+
+
+# Schema keys of the connections checked out by this thread, innermost last. The schema helpers
+# only get a cursor, and that cursor belongs to the innermost checkout.
+_CHECKOUTS = threading.local()
+
+
+def _active_schema_keys() -> list[tuple]:
+    keys = getattr(_CHECKOUTS, "schema_keys", None)
+    if keys is None:
+        keys = _CHECKOUTS.schema_keys = []
+    return keys
+
+
+class MySQLPool:
+    # Bounded, thread-safe connection pool. Idle connections are reused LIFO so the
+    # warmest socket is handed out first. Every checkout gets its own connection, so a
+    # nested helper never commits or rolls back its caller's transaction; a nested checkout
+    # may go past the limit instead of waiting for a slot its own thread is holding.
+    def __init__(
+        self,
+        mysql_cfg: dict,
+        *,
+        size: int,
+        max_overflow: int,
+        timeout: float,
+        recycle_seconds: int,
+        ping_seconds: int,
+    ) -> None:
+        self._cfg = dict(mysql_cfg)
+        self.schema_key = _schema_key(self._cfg)
+        self.size = max(1, int(size))
+        self.max_overflow = max(0, int(max_overflow))
+        self.timeout = max(0.0, float(timeout))
+        self.recycle_seconds = max(0, int(recycle_seconds))
+        self.ping_seconds = max(0, int(ping_seconds))
+        self._idle: list[_PooledConnection] = []
+        self._checked_out = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+    @property
+    def checked_out(self) -> int:
+        with self._cond:
+            return self._checked_out
+
+    @property
+    def idle(self) -> int:
+        with self._cond:
+            return len(self._idle)
+
+    def _open(self) -> _PooledConnection:
+        conn = mysql.connector.connect(**self._cfg)
+        now = time.monotonic()
+        return _PooledConnection(conn=conn, created_at=now, last_used_at=now)
+
+    @staticmethod
+    def _close_quietly(entry: _PooledConnection) -> None:
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+
+    def _validate(self, entry: _PooledConnection) -> _PooledConnection:
+        now = time.monotonic()
+        if self.recycle_seconds and now - entry.created_at >= self.recycle_seconds:
+            self._close_quietly(entry)
+            return self._open()
+        if self.ping_seconds and now - entry.last_used_at >= self.ping_seconds:
+            try:
+                entry.conn.ping(reconnect=False)
+            except Exception:
+                self._close_quietly(entry)
+                return self._open()
+        return entry
+
+    def _acquire(self, *, nested: bool = False) -> _PooledConnection:
+        deadline = time.monotonic() + self.timeout
+        entry: _PooledConnection | None = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if nested or self._checked_out < self.size + self.max_overflow:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise mysql_errors.PoolError(
+                        f"MySQL pool exhausted ({self._checked_out} connections in use)."
+                    )
+                self._cond.wait(remaining)
+            self._checked_out += 1
+        try:
+            return self._open() if entry is None else self._validate(entry)
+        except Exception:
+            with self._cond:
+                self._checked_out -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, entry: _PooledConnection, *, discard: bool = False) -> None:
+        if not discard:
+            try:
+                # Drop uncommitted work and the REPEATABLE READ snapshot so the next
+                # checkout sees fresh data, exactly like a brand new connection would.
+                if entry.conn.in_transaction or entry.conn.unread_result:
+                    entry.conn.rollback()
+            except Exception:
+                discard = True
+        entry.last_used_at = time.monotonic()
+        with self._cond:
+            self._checked_out -= 1
+            keep = not discard and len(self._idle) < self.size
+            if keep:
+                self._idle.append(entry)
+            self._cond.notify()
+        if not keep:
+            self._close_quietly(entry)
+
+    @contextmanager
+    def connection(self) -> Iterator[mysql.connector.MySQLConnection]:
+        depth = getattr(self._local, "depth", 0)
+        entry = self._acquire(nested=depth > 0)
+        self._local.depth = depth + 1
+        schema_keys = _active_schema_keys()
+        schema_keys.append(self.schema_key)
+        broken = False
+        try:
+            yield entry.conn
+        except (mysql_errors.OperationalError, mysql_errors.InterfaceError):
+            broken = True
+            raise
+        finally:
+            schema_keys.pop()
+            self._local.depth = depth
+            self._release(entry, discard=broken)
+
+    def close(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            self._close_quietly(entry)
+
+
+_POOLS: dict[tuple, MySQLPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _pool_key(mysql_cfg: dict) -> tuple:
+    return tuple(sorted((str(key), str(value)) for key, value in mysql_cfg.items()))
+
+
+def get_mysql_pool(mysql_cfg: dict) -> MySQLPool:
+    key = _pool_key(mysql_cfg)
+    pool = _POOLS.get(key)
+    if pool is not None:
+        return pool
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = MySQLPool(
+                mysql_cfg,
+                size=env_int("MYSQL_POOL_SIZE", 8),
+                max_overflow=env_int("MYSQL_POOL_MAX_OVERFLOW", 16),
+                timeout=env_int("MYSQL_POOL_TIMEOUT_SECONDS", 30),
+                recycle_seconds=env_int("MYSQL_POOL_RECYCLE_SECONDS", 1800),
+                ping_seconds=env_int("MYSQL_POOL_PING_SECONDS", 30),
+            )
+            _POOLS[key] = pool
+        return pool
+
+
+@contextmanager
+def mysql_connection(mysql_cfg: dict) -> Iterator[mysql.connector.MySQLConnection]:
+    with get_mysql_pool(mysql_cfg).connection() as conn:
+        yield conn
+
+
+def close_mysql_pools() -> None:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.close()
+
+
+class SchemaSnapshot:
+    # Table/column metadata for one database, loaded with a single information_schema
+    # query and reused until the TTL expires. A lookup that misses may reload early
+    # (at most once per miss_recheck_seconds) so tables created by the backend while
+    # the worker runs are still picked up quickly.
+    def __init__(self, *, ttl_seconds: int, miss_recheck_seconds: int) -> None:
+        self.ttl_seconds = max(1, int(ttl_seconds))
+        self.miss_recheck_seconds = max(0, int(miss_recheck_seconds))
+        self._columns: dict[str, frozenset[str]] = {}
+        self._loaded_at: float | None = None
+        self._lock = threading.Lock()
+
+    def _load(self, cursor: mysql.connector.cursor.MySQLCursor) -> None:
+        cursor.execute(
+            "SELECT table_name AS table_name, column_name AS column_name "
+            "FROM information_schema.columns WHERE table_schema = DATABASE()"
+        )
+        columns: dict[str, set[str]] = {}
+        for row in cursor.fetchall() or []:
+            if isinstance(row, dict):
+                table_name, column_name = row.get("table_name"), row.get("column_name")
+            else:
+                table_name, column_name = row[0], row[1]
+            if isinstance(table_name, (bytes, bytearray)):
+                table_name = table_name.decode()
+            if isinstance(column_name, (bytes, bytearray)):
+                column_name = column_name.decode()
+            if not table_name or not column_name:
+                continue
+            columns.setdefault(str(table_name).lower(), set()).add(str(column_name).lower())
+        self._columns = {table: frozenset(names) for table, names in columns.items()}
+        self._loaded_at = time.monotonic()
+
+    def _refresh(self, cursor: mysql.connector.cursor.MySQLCursor, max_age: float) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < max_age:
+            return
+        with self._lock:
+            loaded_at = self._loaded_at
+            if loaded_at is None or time.monotonic() - loaded_at >= max_age:
+                self._load(cursor)
+
+    def columns(self, cursor: mysql.connector.cursor.MySQLCursor, table: str) -> frozenset[str] | None:
+        key = table.lower()
+        self._refresh(cursor, self.ttl_seconds)
+        found = self._columns.get(key)
+        if found is None and self.miss_recheck_seconds:
+            self._refresh(cursor, self.miss_recheck_seconds)
+            found = self._columns.get(key)
+        return found
+
+    def has_column(self, cursor: mysql.connector.cursor.MySQLCursor, table: str, column: str) -> bool:
+        found = self.columns(cursor, table)
+        if found is None:
+            return False
+        if column.lower() in found:
+            return True
+        if self.miss_recheck_seconds:
+            self._refresh(cursor, self.miss_recheck_seconds)
+            return column.lower() in self._columns.get(table.lower(), frozenset())
+        return False
+
+    def reload(self, cursor: mysql.connector.cursor.MySQLCursor) -> None:
+        with self._lock:
+            self._load(cursor)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+
+_SCHEMA_SNAPSHOTS: dict[tuple, SchemaSnapshot] = {}
+_SCHEMA_SNAPSHOTS_LOCK = threading.Lock()
+
+
+def _schema_snapshot(cursor: mysql.connector.cursor.MySQLCursor) -> SchemaSnapshot:
+    schema_keys = _active_schema_keys()
+    if not schema_keys:
+        # Not a pooled connection: nothing tells which database it is, so do not share.
+        return SchemaSnapshot(ttl_seconds=1, miss_recheck_seconds=0)
+    key = schema_keys[-1]
+    snapshot = _SCHEMA_SNAPSHOTS.get(key)
+    if snapshot is not None:
+        return snapshot
+    with _SCHEMA_SNAPSHOTS_LOCK:
+        snapshot = _SCHEMA_SNAPSHOTS.get(key)
+        if snapshot is None:
+            snapshot = SchemaSnapshot(
+                ttl_seconds=env_int("SCHEMA_CACHE_TTL_SECONDS", 3600),
+                miss_recheck_seconds=env_int("SCHEMA_MISS_RECHECK_SECONDS", 60),
+            )
+            _SCHEMA_SNAPSHOTS[key] = snapshot
+        return snapshot
+
+
+def table_exists(cursor: mysql.connector.cursor.MySQLCursor, table: str) -> bool:
+    return _schema_snapshot(cursor).columns(cursor, table) is not None
 
 
 def column_exists(cursor: mysql.connector.cursor.MySQLCursor, table: str, column: str) -> bool:
-    cursor.execute(
-        "SELECT 1 FROM information_schema.columns "
-        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s LIMIT 1",
-        (table, column),
-    )
-    return cursor.fetchone() is not None
+    return _schema_snapshot(cursor).has_column(cursor, table, column)
+
+
+def table_columns(cursor: mysql.connector.cursor.MySQLCursor, table: str) -> frozenset[str]:
+    return _schema_snapshot(cursor).columns(cursor, table) or frozenset()
+
+
+def invalidate_schema_snapshot() -> None:
+    with _SCHEMA_SNAPSHOTS_LOCK:
+        snapshots = list(_SCHEMA_SNAPSHOTS.values())
+    for snapshot in snapshots:
+        snapshot.invalidate()
+
+
+def load_schema_snapshot(mysql_cfg: dict) -> None:
+    with mysql_connection(mysql_cfg) as conn:
+        cursor = conn.cursor()
+        _schema_snapshot(cursor).reload(cursor)
 
 
 def get_mysql_config() -> dict:
@@ -61,18 +375,15 @@ def get_workspace_db_name(mysql_cfg: dict, workspace_id: int) -> str | None:
     cached = _WORKSPACE_DB_CACHE.get(workspace_id)
     if cached:
         return cached
-    conn = mysql.connector.connect(**mysql_cfg)
-    try:
+    with mysql_connection(mysql_cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         cursor.execute("SELECT db_name FROM workspaces WHERE id = %s", (workspace_id,))
         row = cursor.fetchone()
         db_name = (row or {}).get("db_name") or ""
         if db_name:
-            _WORKSPACE_DB_CACHE[workspace_id] = db_name
+            _WORKSPACE_DB_CACHE.set(workspace_id, db_name)
             return db_name
         return None
-    finally:
-        conn.close()
 
 
 def resolve_workspace_mysql_cfg(mysql_cfg: dict, workspace_id: int | None) -> dict:
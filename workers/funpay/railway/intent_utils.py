@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Iterable
+
+
+WHEN_FREE_KEYWORDS = (
+    "когда освобод",
+    "когда будет свобод",
+    "когда свобод",
+    "when free",
+    "when available",
+    "when it will be free",
+)
+REFUND_KEYWORDS = (
+    "возврат",
+    "верни",
+    "верните",
+    "вернуть",
+    "деньги",
+    "средства",
+    "деньги обратно",
+    "moneyback",
+    "refund",
+)
+ACCOUNT_INFO_KEYWORDS = (
+    "данные",
+    "логин",
+    "парол",
+    "акк",
+    "аккаунт",
+    "мой",
+    "мои",
+    "скок",
+    "сколько",
+    "остал",
+    "времени",
+    "срок",
+    "доступ",
+    "аренд",
+    "аренда",
+    "аренды",
+    "rental",
+    "rent",
+    "текущ",
+    "активн",
+)
+# account_info keywords that are not also stock/rent subjects.
+ACCOUNT_DETAIL_KEYWORDS = tuple(
+    word for word in ACCOUNT_INFO_KEYWORDS if word not in ("акк", "аккаунт", "аренд", "аренда", "аренды", "rental", "rent")
+)
+COMMAND_LIST_KEYWORDS = ("команд", "commands", "help", "помощ", "что умеешь", "что можешь", "список команд")
+STOCK_SUBJECTS = ("акк", "аккаунт", "аккаунты", "лот", "лоты", "сток", "stock", "account", "acc")
+STOCK_HINTS = ("свобод", "налич", "есть", "показ", "список", "free", "available", "list", "show")
+STOCK_FREE_QUESTIONS = ("что", "чё", "че", "есть")
+BUSY_SUBJECTS = ("аккаунт", "аккаунты", "лот", "лоты")
+BUSY_HINTS = ("занят", "busy", "occupied", "в аренде")
+PRE_RENT_ACCOUNT_WORDS = ("акк", "аккаунт", "account", "acc")
+PRE_RENT_NEED_WORDS = ("нуж", "надо", "хочу", "сделаешь", "сделай", "оплач", "оплат", "купл")
+PRE_RENT_TIME_WORDS = ("час", "часа", "часов", "hour", "hours", "h")
+RENT_FLOW_KEYWORDS = ("аренд", "взять аренд", "хочу аренд", "rent", "rental")
+RENT_CONFIRM_TRIGGERS = ("если я опла", "после оплат", "оплачу лот", "куплю лот")
+RENT_CONFIRM_ASKS = ("выдадите", "выдашь", "дадите", "дашь", "получу", "данные", "логин", "пароль", "доступ")
+RENT_CONFIRM_PAY_WORDS = ("опла", "оплат", "оплач", "покуп", "купл")
+GREETING_KEYWORDS = ("привет", "здрав", "hello", "hi", "добрый", "доброе")
+LP_REPLACE_KEYWORDS = ("замен", "replace", "replacement")
+LP_REPLACE_SUBJECTS = ("аккаунт", "account", "лот", "mmr", "лп")
+SUPPORT_CONTEXT_KEYWORDS = (
+    "аренд",
+    "аренда",
+    "акк",
+    "аккаунт",
+    "код",
+    "сток",
+    "налич",
+    "продл",
+    "пауза",
+    "замен",
+    "возврат",
+    "refund",
+    "free",
+    "available",
+    "busy",
+    "help",
+    "поддерж",
+    "помощ",
+    "команд",
+    "логин",
+    "пароль",
+    "steam",
+    "цен",
+    "стоим",
+    "price",
+    "payment",
+    "оплат",
+    "купить",
+    "rent",
+)
+SMALL_TALK_PHRASES = (
+    "как дела",
+    "как у тебя дела",
+    "как у вас дела",
+    "как ты",
+    "что нового",
+    "че как",
+    "чё как",
+    "как жизнь",
+    "как сам",
+    "как настроение",
+    "как поживаешь",
+    "что делаешь",
+)
+SMALL_TALK_GREETINGS = ("привет", "здрав", "добрый", "hello", "hi", "hey", "yo", "хай", "хелло")
+
+_PRE_RENT_COUNT_RE = re.compile(r"\b\d+\s*(?:акк|аккаунт|acc|account)\b")
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    # Factor the keywords into a trie-shaped regex so every position only tries the branch
+    # for its own first character. Optional tails are greedy: the match is the longest keyword.
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render(node: dict) -> str:
+        ends = "" in node
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends:
+            return f"(?:{body})?"
+        return body
+
+    return render(trie)
+
+
+class KeywordMatcher:
+    # One regex pass over the text finds the longest keyword starting at every position; the
+    # shorter keywords that also start there are exactly the keyword prefixes of that match.
+    # Keywords are tagged with group bits, so the scan returns the union of the groups hit
+    # plus the (position, group bits) of every match for position-sensitive rules.
+    def __init__(self, groups: dict[str, tuple[str, ...]]) -> None:
+        self.bits = {name: 1 << index for index, name in enumerate(groups)}
+        word_bits: dict[str, int] = {}
+        for name, words in groups.items():
+            for word in words:
+                word_bits[word] = word_bits.get(word, 0) | self.bits[name]
+        self._pattern = re.compile(f"(?=({_trie_pattern(word_bits)}))")
+        # Bits of a longest match include the bits of every keyword that is its prefix.
+        self._match_bits = {
+            word: _or_bits(word_bits.get(word[:size], 0) for size in range(1, len(word) + 1))
+            for word in word_bits
+        }
+
+    def scan(self, text: str) -> tuple[int, list[tuple[int, int]]]:
+        mask = 0
+        matches: list[tuple[int, int]] = []
+        for match in self._pattern.finditer(text):
+            bits = self._match_bits[match.group(1)]
+            mask |= bits
+            matches.append((match.start(), bits))
+        return mask, matches
+
+
+def _or_bits(values: Iterable[int]) -> int:
+    result = 0
+    for value in values:
+        result |= value
+    return result
+
+
+_MATCHER = KeywordMatcher(
+    {
+        "when_free": WHEN_FREE_KEYWORDS,
+        "refund": REFUND_KEYWORDS,
+        "account_info": ACCOUNT_INFO_KEYWORDS,
+        "account_detail": ACCOUNT_DETAIL_KEYWORDS,
+        "command_list": COMMAND_LIST_KEYWORDS,
+        "stock_subject": STOCK_SUBJECTS,
+        "stock_hint": STOCK_HINTS,
+        "stock_free_question": STOCK_FREE_QUESTIONS,
+        "which": ("какие",),
+        "free": ("свобод",),
+        "busy_subject": BUSY_SUBJECTS,
+        "busy_hint": BUSY_HINTS,
+        "pre_rent_account": PRE_RENT_ACCOUNT_WORDS,
+        "pre_rent_need": PRE_RENT_NEED_WORDS,
+        "pre_rent_time": PRE_RENT_TIME_WORDS,
+        "rent_flow": RENT_FLOW_KEYWORDS,
+        "confirm_trigger": RENT_CONFIRM_TRIGGERS,
+        "confirm_ask": RENT_CONFIRM_ASKS,
+        "confirm_pay": RENT_CONFIRM_PAY_WORDS,
+        "greeting": GREETING_KEYWORDS,
+        "lp_replace_command": ("лпзамена",),
+        "lp_replace": LP_REPLACE_KEYWORDS,
+        "lp_replace_subject": LP_REPLACE_SUBJECTS,
+        "support_context": SUPPORT_CONTEXT_KEYWORDS,
+        "small_talk": SMALL_TALK_PHRASES,
+        "small_talk_greeting": SMALL_TALK_GREETINGS,
+    }
+)
+_BIT = _MATCHER.bits
+
+
+@dataclass(frozen=True)
+class MessageIntents:
+    when_free: bool = False
+    refund: bool = False
+    account_info: bool = False
+    command_list: bool = False
+    stock_list: bool = False
+    busy_list: bool = False
+    pre_rent: bool = False
+    rent_flow: bool = False
+    rent_confirmation: bool = False
+    greeting: bool = False
+    low_priority_replace: bool = False
+    support_context: bool = False
+    small_talk: bool = False
+    account_detail: bool = field(default=False, compare=False)
+
+
+_NO_INTENTS = MessageIntents()
+
+
+def match_intents(text: str | None) -> MessageIntents:
+    lowered = (text or "").strip().lower()
+    if not lowered:
+        return _NO_INTENTS
+    mask, matches = _MATCHER.scan(lowered)
+    if not mask:
+        return _NO_INTENTS
+    support_context = bool(mask & _BIT["support_context"])
+    small_talk = False
+    if not support_context:
+        if mask & _BIT["small_talk"]:
+            small_talk = True
+        elif mask & _BIT["small_talk_greeting"] and len(lowered) <= 30:
+            greeting_bit = _BIT["small_talk_greeting"]
+            small_talk = any(
+                bits & greeting_bit and (start == 0 or lowered[start - 1] == " ") for start, bits in matches
+            )
+    stock_subject = bool(mask & _BIT["stock_subject"])
+    pre_rent = bool(mask & _BIT["pre_rent_account"]) and (
+        bool(mask & (_BIT["pre_rent_need"] | _BIT["pre_rent_time"]))
+        or _PRE_RENT_COUNT_RE.search(lowered) is not None
+    )
+    return MessageIntents(
+        when_free=bool(mask & _BIT["when_free"]),
+        refund=bool(mask & _BIT["refund"]),
+        account_info=bool(mask & _BIT["account_info"]),
+        command_list=bool(mask & _BIT["command_list"]),
+        stock_list=(
+            (bool(mask & _BIT["which"]) and stock_subject)
+            or (bool(mask & _BIT["free"]) and bool(mask & _BIT["stock_free_question"]))
+            or (bool(mask & _BIT["stock_hint"]) and stock_subject)
+        ),
+        busy_list=bool(mask & _BIT["busy_hint"]) and bool(mask & _BIT["busy_subject"]),
+        pre_rent=pre_rent,
+        rent_flow=bool(mask & _BIT["rent_flow"]),
+        rent_confirmation=bool(mask & _BIT["confirm_trigger"])
+        or (bool(mask & _BIT["confirm_pay"]) and bool(mask & _BIT["confirm_ask"])),
+        greeting=bool(mask & _BIT["greeting"]),
+        low_priority_replace=bool(mask & _BIT["lp_replace_command"])
+        or (bool(mask & _BIT["lp_replace"]) and bool(mask & _BIT["lp_replace_subject"])),
+        support_context=support_context,
+        small_talk=small_talk,
+        account_detail=bool(mask & _BIT["account_detail"]),
+    )
+
+
+# Labels the rules can stand in for, with how much a lone hit is trusted. account_info only
+# counts through its own words ("логин", "остал", "срок"): "акк"/"аренд" are shared with the
+# stock and rent rules. On its own it stays below the default gate and the model decides.
+_LOCAL_INTENT_CONFIDENCE = (
+    ("when_free", "when_free", 0.95),
+    ("busy_list", "busy_list", 0.9),
+    ("refund", "refund", 0.9),
+    ("pre_rent", "pre_rent", 0.85),
+    ("stock_list", "stock_list", 0.85),
+    ("rent_flow", "rent_flow", 0.8),
+    ("account_detail", "account_info", 0.6),
+)
+# "когда освободится аккаунт" and "какие аккаунты заняты" also satisfy the stock rule.
+_LOCAL_INTENT_SUPERSEDES = {"when_free": "stock_list", "busy_list": "stock_list"}
+
+
+def local_intent(intents: MessageIntents, text: str | None) -> tuple[str | None, float]:
+    # Rule-based stand-in for the intent model: confident only when exactly one intent
+    # label is indicated. Overlapping hits are left to the model.
+    labels = [(label, confidence) for attr, label, confidence in _LOCAL_INTENT_CONFIDENCE if getattr(intents, attr)]
+    superseded = {_LOCAL_INTENT_SUPERSEDES.get(label) for label, _ in labels}
+    labels = [item for item in labels if item[0] not in superseded]
+    if not labels:
+        if (intents.greeting or intents.small_talk) and len((text or "").strip()) <= 30:
+            return "greeting", 0.9
+        return None, 0.0
+    if len(labels) > 1:
+        return None, 0.0
+    return labels[0]
@@ -1,20 +1,42 @@
 from __future__ import annotations
 
+import bisect
 import json
+import math
 import os
 import re
-from functools import lru_cache
+import threading
+import time
+from collections import Counter
 from typing import Any
 
 from .constants import COMMANDS_RU
+from .env_utils import env_int
 
 _TOKEN_RE = re.compile(r"[A-Za-zА-Яа-я0-9]+")
 
+# BM25F parameters: keywords are the curated description of an item, content only backs them up.
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+_FIELD_WEIGHTS = {"keywords": 3.0, "content": 0.5}
+_PHRASE_BONUS = 2.0
+_MIN_PREFIX_CHARS = 3
+_MIN_STEM_CHARS = 4
+# A query token may also complete to a longer indexed word ("акк" -> "аккаунт"), but only by a
+# few letters, and such a guess counts for less than the word itself or a shared stem.
+_MAX_EXPAND_CHARS = 4
+_STEM_MATCH_WEIGHT = 0.8
+_EXPAND_MATCH_WEIGHT = 0.5
+
 
 def _tokenize(text: str) -> set[str]:
     return {token.lower() for token in _TOKEN_RE.findall(text or "")}
 
 
+def _token_list(text: str) -> list[str]:
+    return [token.lower() for token in _TOKEN_RE.findall(text or "")]
+
+
 DEFAULT_KNOWLEDGE: list[dict[str, Any]] = [
     {
         "id": "commands",
@@ -109,38 +131,140 @@ def _load_custom_knowledge(path: str) -> list[dict[str, Any]]:
     return cleaned
 
 
-@lru_cache(maxsize=1)
-def _knowledge_items() -> list[dict[str, Any]]:
+def _knowledge_items(custom_path: str) -> list[dict[str, Any]]:
     items = list(DEFAULT_KNOWLEDGE)
-    custom_path = os.getenv("AI_KNOWLEDGE_PATH", "").strip()
     items.extend(_load_custom_knowledge(custom_path))
     return items
 
 
+class KnowledgeIndex:
+    # BM25F index over the knowledge items, built once per knowledge file version. Every
+    # posting holds the finished weight of its term in one item, so a query only sums the
+    # postings of its terms. Query tokens also match indexed stems they start with
+    # ("арендовать" -> "аренд") and words sharing their stem ("паузу" -> "пауза"). Cyrillic
+    # tokens additionally complete to slightly longer words ("акк" -> "аккаунт"); Latin ones do
+    # not ("free" is not "freeze"). A token counts once per item, by its best weighted term.
+    def __init__(self, items: list[dict[str, Any]]) -> None:
+        self.items = items
+        fields: list[dict[str, Counter]] = []
+        for item in items:
+            keywords = [str(keyword) for keyword in item.get("keywords", [])]
+            fields.append(
+                {
+                    "keywords": Counter(_token_list(" ".join(keywords))),
+                    "content": Counter(_token_list(str(item.get("content", "")))),
+                }
+            )
+        avg_len = {
+            name: max(1.0, sum(sum(doc[name].values()) for doc in fields) / max(1, len(fields)))
+            for name in _FIELD_WEIGHTS
+        }
+        doc_freq: Counter = Counter()
+        for doc in fields:
+            doc_freq.update(set(doc["keywords"]) | set(doc["content"]))
+        total = len(items)
+        self.postings: dict[str, list[tuple[int, float]]] = {}
+        for index, doc in enumerate(fields):
+            norms = {
+                name: 1 - _BM25_B + _BM25_B * sum(doc[name].values()) / avg_len[name] for name in _FIELD_WEIGHTS
+            }
+            for term in set(doc["keywords"]) | set(doc["content"]):
+                tf = sum(weight * doc[name][term] / norms[name] for name, weight in _FIELD_WEIGHTS.items())
+                idf = math.log(1 + (total - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+                self.postings.setdefault(term, []).append((index, idf * tf / (_BM25_K1 + tf)))
+        self.terms = sorted(self.postings)
+        self.phrases = [
+            (str(keyword).lower(), index)
+            for index, item in enumerate(items)
+            for keyword in item.get("keywords", [])
+            if " " in str(keyword).strip()
+        ]
+
+    def _expand(self, token: str) -> dict[str, float]:
+        matched: dict[str, float] = {}
+        if len(token) >= _MIN_PREFIX_CHARS:
+            stem = token[: max(_MIN_STEM_CHARS, len(token) - 3)] if len(token) > _MIN_STEM_CHARS else token
+            start = bisect.bisect_left(self.terms, stem)
+            while start < len(self.terms) and self.terms[start].startswith(stem):
+                term = self.terms[start]
+                start += 1
+                if len(term) <= len(token) + 1:
+                    matched[term] = _STEM_MATCH_WEIGHT
+                elif not token.isascii() and len(term) - len(token) <= _MAX_EXPAND_CHARS:
+                    matched[term] = _EXPAND_MATCH_WEIGHT
+        for size in range(_MIN_PREFIX_CHARS, len(token)):
+            # Short terms are whole words ("как" is not the stem of "какие"), only endings differ.
+            if token[:size] in self.postings and (size >= _MIN_STEM_CHARS or len(token) - size <= 1):
+                matched[token[:size]] = _STEM_MATCH_WEIGHT
+        if token in self.postings:
+            matched[token] = 1.0
+        return matched
+
+    def search(self, question: str, limit: int, min_score: float = 0.0) -> list[tuple[float, dict[str, Any]]]:
+        scores: dict[int, float] = {}
+        for token in _tokenize(question):
+            best: dict[int, float] = {}
+            for term, factor in self._expand(token).items():
+                for index, weight in self.postings[term]:
+                    if weight * factor > best.get(index, 0.0):
+                        best[index] = weight * factor
+            for index, weight in best.items():
+                scores[index] = scores.get(index, 0.0) + weight
+        lowered = question.lower()
+        for phrase, index in self.phrases:
+            if phrase in lowered:
+                scores[index] = scores.get(index, 0.0) + _PHRASE_BONUS
+        ranked = sorted(
+            ((score, index) for index, score in scores.items() if score > min_score),
+            key=lambda pair: (-pair[0], pair[1]),
+        )
+        return [(score, self.items[index]) for score, index in ranked[: max(1, limit)]]
+
+
+# (source key, last check, index). The knowledge file is re-read when its path or mtime changes.
+_INDEX_STATE: tuple[tuple, float, KnowledgeIndex] | None = None
+_INDEX_LOCK = threading.Lock()
+
+
+def _knowledge_source() -> tuple:
+    custom_path = os.getenv("AI_KNOWLEDGE_PATH", "").strip()
+    if not custom_path:
+        return ("",)
+    try:
+        return (custom_path, os.stat(custom_path).st_mtime_ns)
+    except OSError:
+        return (custom_path, None)
+
+
+def get_knowledge_index() -> KnowledgeIndex:
+    global _INDEX_STATE
+    state = _INDEX_STATE
+    now = time.monotonic()
+    if state is not None and now - state[1] < max(1, env_int("AI_KNOWLEDGE_RELOAD_SECONDS", 5)):
+        return state[2]
+    with _INDEX_LOCK:
+        source = _knowledge_source()
+        if _INDEX_STATE is not None and _INDEX_STATE[0] == source:
+            _INDEX_STATE = (source, now, _INDEX_STATE[2])
+        else:
+            _INDEX_STATE = (source, now, KnowledgeIndex(_knowledge_items(source[0])))
+        return _INDEX_STATE[2]
+
+
 def build_knowledge_context(question: str, *, max_chars: int, max_items: int) -> str | None:
     if not question:
         return None
     if os.getenv("AI_KNOWLEDGE_DISABLED", "").strip().lower() in {"1", "true", "yes"}:
         return None
-    tokens = _tokenize(question)
-    if not tokens:
-        return None
-    scored: list[tuple[int, dict[str, Any]]] = []
-    for item in _knowledge_items():
-        keywords = item.get("keywords", [])
-        keyword_tokens = _tokenize(" ".join(str(keyword) for keyword in keywords))
-        overlap = len(tokens & keyword_tokens)
-        score = overlap * 3
-        for kw in keywords:
-            if kw and kw.lower() in question.lower():
-                score += 2
-        if score > 0:
-            scored.append((score, item))
+    try:
+        min_score = float(os.getenv("AI_KNOWLEDGE_MIN_SCORE", "0"))
+    except ValueError:
+        min_score = 0.0
+    scored = get_knowledge_index().search(question, max_items, min_score)
     if not scored:
         return None
-    scored.sort(key=lambda x: x[0], reverse=True)
     parts: list[str] = []
-    for _, item in scored[: max(1, max_items)]:
+    for _, item in scored:
         content = str(item.get("content", "")).strip()
         if not content:
             continue
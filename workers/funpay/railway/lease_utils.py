@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import logging
+import math
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable
+
+import mysql.connector
+
+from .db_utils import invalidate_schema_snapshot, mysql_connection, table_exists
+
+
+def _ensure_lease_tables(cursor: mysql.connector.cursor.MySQLCursor) -> None:
+    created = False
+    if not table_exists(cursor, "workspace_leases"):
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS workspace_leases (
+                workspace_id BIGINT PRIMARY KEY,
+                owner VARCHAR(191) NOT NULL DEFAULT '',
+                token BIGINT NOT NULL DEFAULT 0,
+                expires_at DATETIME(3) NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                INDEX idx_workspace_leases_owner (owner),
+                INDEX idx_workspace_leases_expires (expires_at)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+            """
+        )
+        created = True
+    if not table_exists(cursor, "workspace_lease_nodes"):
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS workspace_lease_nodes (
+                node_id VARCHAR(191) PRIMARY KEY,
+                scope VARCHAR(64) NOT NULL DEFAULT 'all',
+                expires_at DATETIME(3) NOT NULL,
+                INDEX idx_workspace_lease_nodes_scope (scope, expires_at)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+            """
+        )
+        created = True
+    if created:
+        invalidate_schema_snapshot()
+
+
+def default_node_id(scope: str = "all") -> str:
+    # The node id owns leases, so it must differ between the shard processes of one node. A
+    # configured FUNPAY_NODE_ID is suffixed with the shard scope, which keeps it stable across
+    # restarts so a restarted shard takes its own leases back at once.
+    node = os.getenv("FUNPAY_NODE_ID", "").strip()
+    if node:
+        return f"{node}:{scope}"
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass
+class _HeldLease:
+    token: int
+    valid_until: float
+
+
+class WorkspaceLeaseManager:
+    # Workspace ownership for several worker replicas. Every sync the node heartbeats its
+    # row in workspace_lease_nodes, renews its leases, gives back anything above its fair
+    # share and claims expired/free leases. A takeover bumps the lease token, so a node that
+    # lost a lease can never renew it again (renewals match owner + token). Locally a lease
+    # only counts as held until the renewal deadline passes, so a node cut off from MySQL
+    # stops acting on its workspaces before anyone else can take them over.
+    def __init__(
+        self,
+        mysql_cfg: dict,
+        *,
+        node_id: str,
+        scope: str = "all",
+        ttl_seconds: int = 30,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self.mysql_cfg = mysql_cfg
+        self.node_id = node_id
+        self.scope = scope
+        self.ttl_seconds = max(5, int(ttl_seconds))
+        self.safety_margin = min(5.0, self.ttl_seconds * 0.2)
+        self.logger = logger or logging.getLogger("funpay.worker")
+        self._held: dict[int, _HeldLease] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _placeholders(values: list[int]) -> str:
+        return ", ".join(["%s"] * len(values))
+
+    def _release(self, cursor: mysql.connector.cursor.MySQLCursor, workspace_ids: list[int]) -> None:
+        if not workspace_ids:
+            return
+        cursor.execute(
+            f"""
+            UPDATE workspace_leases
+            SET expires_at = NOW(3) - INTERVAL 1 SECOND
+            WHERE owner = %s AND workspace_id IN ({self._placeholders(workspace_ids)})
+            """,
+            (self.node_id, *workspace_ids),
+        )
+
+    def sync(self, candidate_ids: Iterable[int]) -> dict[int, int]:
+        started = time.monotonic()
+        candidates = sorted({int(workspace_id) for workspace_id in candidate_ids})
+        with mysql_connection(self.mysql_cfg) as conn:
+            cursor = conn.cursor()
+            _ensure_lease_tables(cursor)
+            cursor.execute(
+                """
+                INSERT INTO workspace_lease_nodes (node_id, scope, expires_at)
+                VALUES (%s, %s, NOW(3) + INTERVAL %s SECOND)
+                ON DUPLICATE KEY UPDATE scope = VALUES(scope), expires_at = VALUES(expires_at)
+                """,
+                (self.node_id, self.scope, self.ttl_seconds),
+            )
+            cursor.execute(
+                "SELECT COUNT(*) FROM workspace_lease_nodes WHERE scope = %s AND expires_at >= NOW(3)",
+                (self.scope,),
+            )
+            row = cursor.fetchone()
+            live_nodes = max(1, int(row[0] if row else 1))
+            quota = math.ceil(len(candidates) / live_nodes) if candidates else 0
+
+            cursor.execute(
+                """
+                UPDATE workspace_leases
+                SET expires_at = NOW(3) + INTERVAL %s SECOND
+                WHERE owner = %s
+                """,
+                (self.ttl_seconds, self.node_id),
+            )
+            cursor.execute(
+                "SELECT workspace_id FROM workspace_leases WHERE owner = %s ORDER BY workspace_id",
+                (self.node_id,),
+            )
+            owned = [int(row[0]) for row in cursor.fetchall() or []]
+            candidate_set = set(candidates)
+            kept = [workspace_id for workspace_id in owned if workspace_id in candidate_set]
+            released = [workspace_id for workspace_id in owned if workspace_id not in candidate_set]
+            if len(kept) > quota:
+                released.extend(kept[quota:])
+                kept = kept[:quota]
+            self._release(cursor, released)
+
+            if candidates and len(kept) < quota:
+                placeholders = self._placeholders(candidates)
+                cursor.execute(
+                    f"SELECT workspace_id FROM workspace_leases WHERE workspace_id IN ({placeholders})",
+                    tuple(candidates),
+                )
+                known = {int(row[0]) for row in cursor.fetchall() or []}
+                missing = [workspace_id for workspace_id in candidates if workspace_id not in known]
+                if missing:
+                    cursor.executemany(
+                        """
+                        INSERT IGNORE INTO workspace_leases (workspace_id, owner, token, expires_at)
+                        VALUES (%s, '', 0, NOW(3) - INTERVAL 1 SECOND)
+                        """,
+                        [(workspace_id,) for workspace_id in missing],
+                    )
+                cursor.execute(
+                    f"""
+                    UPDATE workspace_leases
+                    SET owner = %s, token = token + 1, expires_at = NOW(3) + INTERVAL %s SECOND
+                    WHERE workspace_id IN ({placeholders})
+                      AND owner <> %s
+                      AND expires_at < NOW(3)
+                    ORDER BY workspace_id
+                    LIMIT %s
+                    """,
+                    (self.node_id, self.ttl_seconds, *candidates, self.node_id, quota - len(kept)),
+                )
+
+            cursor.execute(
+                """
+                SELECT workspace_id, token FROM workspace_leases
+                WHERE owner = %s AND expires_at >= NOW(3)
+                """,
+                (self.node_id,),
+            )
+            leases = {int(row[0]): int(row[1]) for row in cursor.fetchall() or []}
+            conn.commit()
+
+        valid_until = started + self.ttl_seconds - self.safety_margin
+        with self._lock:
+            previous = set(self._held.keys())
+            self._held = {
+                workspace_id: _HeldLease(token=token, valid_until=valid_until)
+                for workspace_id, token in leases.items()
+            }
+        gained = len(set(leases.keys()) - previous)
+        lost = len(previous - set(leases.keys()))
+        if gained or lost:
+            self.logger.info(
+                "Workspace leases: %s held (+%s/-%s), %s live node(s) in scope %s.",
+                len(leases),
+                gained,
+                lost,
+                live_nodes,
+                self.scope,
+            )
+        return leases
+
+    def holds(self, workspace_id: int, token: int) -> bool:
+        with self._lock:
+            lease = self._held.get(int(workspace_id))
+        return lease is not None and lease.token == token and time.monotonic() < lease.valid_until
+
+    def release_all(self) -> None:
+        with self._lock:
+            self._held = {}
+        with mysql_connection(self.mysql_cfg) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE workspace_leases SET expires_at = NOW(3) - INTERVAL 1 SECOND WHERE owner = %s",
+                (self.node_id,),
+            )
+            cursor.execute("DELETE FROM workspace_lease_nodes WHERE node_id = %s", (self.node_id,))
+            conn.commit()
@@ -4,8 +4,9 @@ from datetime import datetime
 
 import mysql.connector
 
+from .chat_context_utils import forget_owner_accounts
 from .constants import LP_REPLACE_MMR_RANGE
-from .db_utils import column_exists, resolve_workspace_mysql_cfg, table_exists
+from .db_utils import column_exists, mysql_connection, resolve_workspace_mysql_cfg, table_exists
 from .text_utils import normalize_owner_name, normalize_username
 
 
@@ -16,8 +17,7 @@ def fetch_lot_mapping(
     workspace_id: int | None = None,
 ) -> dict | None:
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         if not table_exists(cursor, "lots"):
             return None
@@ -51,8 +51,6 @@ def fetch_lot_mapping(
             tuple(params + ([int(workspace_id)] if has_workspace and workspace_id is not None else [])),
         )
         return cursor.fetchone()
-    finally:
-        conn.close()
 
 
 def fetch_available_lot_accounts(
@@ -61,8 +59,7 @@ def fetch_available_lot_accounts(
     workspace_id: int | None = None,
 ) -> list[dict]:
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         if not table_exists(cursor, "accounts"):
             return []
@@ -138,8 +135,6 @@ def fetch_available_lot_accounts(
                 tuple(params),
             )
         return list(cursor.fetchall() or [])
-    finally:
-        conn.close()
 
 
 def fetch_busy_lot_accounts(
@@ -148,8 +143,7 @@ def fetch_busy_lot_accounts(
     workspace_id: int | None = None,
 ) -> list[dict]:
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         if not table_exists(cursor, "accounts"):
             return []
@@ -219,8 +213,6 @@ def fetch_busy_lot_accounts(
                 tuple(params),
             )
         return list(cursor.fetchall() or [])
-    finally:
-        conn.close()
 
 
 def fetch_owner_accounts(
@@ -233,8 +225,7 @@ def fetch_owner_accounts(
     if not owner_key:
         return []
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         if not table_exists(cursor, "accounts"):
             return []
@@ -296,8 +287,6 @@ def fetch_owner_accounts(
                 tuple(params),
             )
         return list(cursor.fetchall() or [])
-    finally:
-        conn.close()
 
 
 def fetch_lot_by_url(
@@ -307,8 +296,7 @@ def fetch_lot_by_url(
     workspace_id: int | None = None,
 ) -> dict | None:
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         if not table_exists(cursor, "lots") or not table_exists(cursor, "accounts"):
             return None
@@ -351,8 +339,6 @@ def fetch_lot_by_url(
             tuple(params),
         )
         return cursor.fetchone()
-    finally:
-        conn.close()
 
 
 def assign_account_to_buyer(
@@ -367,8 +353,7 @@ def assign_account_to_buyer(
     workspace_id: int | None = None,
 ) -> bool:
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         owner_value = (buyer or "").strip()
         if not owner_value:
@@ -407,9 +392,8 @@ def assign_account_to_buyer(
             tuple(params),
         )
         conn.commit()
+        forget_owner_accounts(user_id)
         return cursor.rowcount > 0
-    finally:
-        conn.close()
 
 
 def start_rental_for_owner(
@@ -423,8 +407,7 @@ def start_rental_for_owner(
     if not owner_key:
         return 0
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         has_assigned_at = column_exists(cursor, "accounts", "rental_assigned_at")
         workspace_clause = ""
@@ -449,9 +432,8 @@ def start_rental_for_owner(
             tuple(params),
         )
         conn.commit()
+        forget_owner_accounts(user_id)
         return cursor.rowcount
-    finally:
-        conn.close()
 
 
 def touch_last_code_at(
@@ -466,8 +448,7 @@ def touch_last_code_at(
     if not owner_key or not account_ids:
         return 0
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not column_exists(cursor, "accounts", "last_code_at"):
             return 0
@@ -488,9 +469,8 @@ def touch_last_code_at(
             tuple(params),
         )
         conn.commit()
+        forget_owner_accounts(user_id)
         return cursor.rowcount
-    finally:
-        conn.close()
 
 
 def extend_rental_for_buyer(
@@ -504,8 +484,7 @@ def extend_rental_for_buyer(
     workspace_id: int | None = None,
 ) -> dict | None:
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         cursor.execute(
             """
@@ -539,11 +518,10 @@ def extend_rental_for_buyer(
             (int(total_units), int(total_minutes), int(account_id), int(user_id)),
         )
         conn.commit()
+        forget_owner_accounts(user_id)
         row["rental_duration"] = total_units
         row["rental_duration_minutes"] = total_minutes
         return row
-    finally:
-        conn.close()
 
 
 def find_replacement_account_for_lot(
@@ -617,8 +595,7 @@ def replace_rental_account(
     rental_duration_minutes: int,
 ) -> bool:
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         owner_value = (owner or "").strip()
         if not owner_value:
@@ -691,6 +668,5 @@ def replace_rental_account(
             conn.rollback()
             return False
         conn.commit()
+        forget_owner_accounts(user_id)
         return True
-    finally:
-        conn.close()
@@ -1,20 +1,62 @@
 from __future__ import annotations
 
+import logging
 import os
 import re
+import threading
+import time
 from typing import Iterable
 
 import mysql.connector
 
-from .db_utils import resolve_workspace_mysql_cfg, table_exists
+from .cache_utils import TTLCache
+from .db_utils import _pool_key, invalidate_schema_snapshot, mysql_connection, resolve_workspace_mysql_cfg, table_exists
+from .env_utils import env_int
 
 _TOKEN_RE = re.compile(r"[A-Za-zА-Яа-я0-9]+")
 
+# Index terms are token prefixes, so word forms ("аренда", "аренду", "аренды") share a term.
+_INDEX_TOKEN_MIN_CHARS = 3
+_INDEX_TOKEN_PREFIX_CHARS = 5
+_INDEX_TOKENS_PER_MEMORY = 64
+_INDEX_TOKENS_PER_QUERY = 12
+
+# Databases whose memory tables were checked (and token index backfilled) by this process.
+_READY_DATABASES: set[tuple] = set()
+_READY_DATABASES_LOCK = threading.Lock()
+
+# Memory rows per chat as last seen by this process, keyed by (database, user, workspace, chat).
+# Replies of one chat are handled one at a time (ai_pipeline_utils), so get-then-set is safe.
+_CHAT_MEMORY_COUNTS: TTLCache[tuple, int] = TTLCache("chat_memory_counts", max_entries=5000)
+
+# last_used_at only affects ranking, so retrievals are recorded in memory and written in batches.
+# The workspace database config is kept so shutdown can write what is still pending.
+_PENDING_TOUCHES: dict[int | None, set[int]] = {}
+_TOUCH_CFGS: dict[int | None, dict] = {}
+_LAST_TOUCH_FLUSH: dict[int | None, float] = {}
+_TOUCH_LOCK = threading.Lock()
+
 
 def _tokenize(text: str) -> list[str]:
     return [token.lower() for token in _TOKEN_RE.findall(text or "")]
 
 
+def _index_tokens(text: str, limit: int) -> list[str]:
+    terms: list[str] = []
+    seen: set[str] = set()
+    for token in _tokenize(text):
+        if len(token) < _INDEX_TOKEN_MIN_CHARS:
+            continue
+        term = token[:_INDEX_TOKEN_PREFIX_CHARS]
+        if term in seen:
+            continue
+        seen.add(term)
+        terms.append(term)
+        if len(terms) >= limit:
+            break
+    return terms
+
+
 def _ensure_memory_table(cursor: mysql.connector.cursor.MySQLCursor) -> None:
     if table_exists(cursor, "chat_ai_memory"):
         return
@@ -35,6 +77,254 @@ def _ensure_memory_table(cursor: mysql.connector.cursor.MySQLCursor) -> None:
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
         """
     )
+    invalidate_schema_snapshot()
+
+
+def _insert_memory_tokens(
+    cursor: mysql.connector.cursor.MySQLCursor,
+    memory_id: int,
+    user_id: int,
+    workspace_id: int | None,
+    chat_id: int,
+    text: str,
+) -> None:
+    terms = _index_tokens(text, _INDEX_TOKENS_PER_MEMORY)
+    if not terms:
+        return
+    cursor.executemany(
+        """
+        INSERT IGNORE INTO chat_ai_memory_tokens (memory_id, user_id, workspace_id, chat_id, token)
+        VALUES (%s, %s, %s, %s, %s)
+        """,
+        [(int(memory_id), int(user_id), workspace_id, int(chat_id), term) for term in terms],
+    )
+
+
+def _backfill_memory_tokens(conn: mysql.connector.MySQLConnection) -> None:
+    cursor = conn.cursor()
+    last_id = 0
+    while True:
+        cursor.execute(
+            """
+            SELECT m.id, m.user_id, m.workspace_id, m.chat_id, m.content
+            FROM chat_ai_memory m
+            LEFT JOIN chat_ai_memory_tokens t ON t.memory_id = m.id
+            WHERE m.id > %s AND t.memory_id IS NULL
+            ORDER BY m.id
+            LIMIT 500
+            """,
+            (last_id,),
+        )
+        rows = cursor.fetchall() or []
+        if not rows:
+            return
+        for memory_id, user_id, workspace_id, chat_id, content in rows:
+            _insert_memory_tokens(cursor, memory_id, user_id, workspace_id, chat_id, content or "")
+        conn.commit()
+        last_id = int(rows[-1][0])
+
+
+def _ensure_memory_tables(conn: mysql.connector.MySQLConnection, cfg: dict) -> None:
+    # Once per process and database: create the tables and index the memories stored before
+    # the token table existed (or by a process that did not maintain it).
+    key = _pool_key(cfg)
+    if key in _READY_DATABASES:
+        return
+    with _READY_DATABASES_LOCK:
+        if key in _READY_DATABASES:
+            return
+        cursor = conn.cursor()
+        _ensure_memory_table(cursor)
+        if not table_exists(cursor, "chat_ai_memory_tokens"):
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chat_ai_memory_tokens (
+                    memory_id BIGINT NOT NULL,
+                    user_id BIGINT NOT NULL,
+                    workspace_id BIGINT NULL,
+                    chat_id BIGINT NOT NULL,
+                    token VARCHAR(32) NOT NULL,
+                    PRIMARY KEY (memory_id, token),
+                    INDEX idx_ai_memory_token (user_id, workspace_id, chat_id, token),
+                    CONSTRAINT fk_ai_memory_token_memory FOREIGN KEY (memory_id)
+                        REFERENCES chat_ai_memory(id) ON DELETE CASCADE
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+                """
+            )
+            conn.commit()
+            invalidate_schema_snapshot()
+        _backfill_memory_tokens(conn)
+        _READY_DATABASES.add(key)
+
+
+def _write_touches(conn: mysql.connector.MySQLConnection, ids: set[int]) -> None:
+    touched = sorted(ids)
+    cursor = conn.cursor()
+    cursor.execute(
+        f"UPDATE chat_ai_memory SET last_used_at = NOW() WHERE id IN ({','.join(['%s'] * len(touched))})",
+        tuple(touched),
+    )
+    conn.commit()
+
+
+def _touch_memories(
+    conn: mysql.connector.MySQLConnection,
+    cfg: dict,
+    workspace_id: int | None,
+    ids: list[int],
+) -> None:
+    now = time.monotonic()
+    flush_seconds = max(1, env_int("AI_MEMORY_TOUCH_FLUSH_SECONDS", 60))
+    with _TOUCH_LOCK:
+        pending = _PENDING_TOUCHES.setdefault(workspace_id, set())
+        pending.update(ids)
+        _TOUCH_CFGS[workspace_id] = cfg
+        last_flush = _LAST_TOUCH_FLUSH.setdefault(workspace_id, now)
+        if len(pending) < 200 and now - last_flush < flush_seconds:
+            return
+        _PENDING_TOUCHES[workspace_id] = set()
+        _LAST_TOUCH_FLUSH[workspace_id] = now
+    _write_touches(conn, pending)
+
+
+def flush_memory_touches(logger: logging.Logger | None = None) -> None:
+    with _TOUCH_LOCK:
+        pending = [(_TOUCH_CFGS[ws], ids) for ws, ids in _PENDING_TOUCHES.items() if ids and ws in _TOUCH_CFGS]
+        _PENDING_TOUCHES.clear()
+    for cfg, ids in pending:
+        try:
+            with mysql_connection(cfg) as conn:
+                _write_touches(conn, ids)
+        except Exception:
+            (logger or logging.getLogger("funpay.worker")).debug("AI memory touch flush failed.", exc_info=True)
+
+
+def _count_stored_memory(cursor: mysql.connector.cursor.MySQLCursor, chat_key: tuple) -> int:
+    count = _CHAT_MEMORY_COUNTS.get(chat_key)
+    if count is not None:
+        _CHAT_MEMORY_COUNTS.set(chat_key, count + 1)
+        return count + 1
+    _, user_id, workspace_id, chat_id = chat_key
+    cursor.execute(
+        "SELECT COUNT(*) FROM chat_ai_memory WHERE user_id = %s AND workspace_id <=> %s AND chat_id = %s",
+        (user_id, workspace_id, chat_id),
+    )
+    row = cursor.fetchone()
+    count = int(row[0] or 0) if row else 0
+    _CHAT_MEMORY_COUNTS.set(chat_key, count)
+    return count
+
+
+class MemoryCompactor:
+    # Trims chats that went over AI_MEMORY_MAX_PER_CHAT off the reply path. store_memory
+    # keeps a row count per chat (one COUNT(*) the first time a chat is seen) and only
+    # queues a chat once it is over the limit; queued chats are trimmed in batches every
+    # interval, keeping the newest rows by id.
+    def __init__(self, logger: logging.Logger, *, interval_seconds: int = 30, batch_size: int = 500) -> None:
+        self.logger = logger
+        self.interval_seconds = max(1, int(interval_seconds))
+        self.batch_size = max(1, int(batch_size))
+        self._queue: dict[tuple, dict] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pid = os.getpid()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="funpay-memory-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def schedule(self, chat_key: tuple, cfg: dict) -> None:
+        with self._lock:
+            self._queue[chat_key] = cfg
+
+    def compact_once(self) -> int:
+        with self._lock:
+            queued, self._queue = self._queue, {}
+        max_rows = _memory_max_per_chat()
+        deleted = 0
+        for chat_key, cfg in queued.items():
+            try:
+                deleted += self._trim_chat(cfg, chat_key, max_rows)
+            except Exception as exc:
+                self.logger.warning("AI memory trim failed for chat %s: %s", chat_key[3], exc)
+            # Recounted on the next store.
+            _CHAT_MEMORY_COUNTS.pop(chat_key)
+        return deleted
+
+    def _trim_chat(self, cfg: dict, chat_key: tuple, max_rows: int) -> int:
+        _, user_id, workspace_id, chat_id = chat_key
+        deleted = 0
+        with mysql_connection(cfg) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id FROM chat_ai_memory
+                WHERE user_id = %s AND workspace_id <=> %s AND chat_id = %s
+                ORDER BY id DESC
+                LIMIT 1 OFFSET %s
+                """,
+                (user_id, workspace_id, chat_id, max_rows - 1),
+            )
+            row = cursor.fetchone()
+            if not row:
+                return 0
+            cutoff_id = int(row[0])
+            while True:
+                cursor.execute(
+                    """
+                    DELETE FROM chat_ai_memory
+                    WHERE user_id = %s AND workspace_id <=> %s AND chat_id = %s AND id < %s
+                    LIMIT %s
+                    """,
+                    (user_id, workspace_id, chat_id, cutoff_id, self.batch_size),
+                )
+                batch = cursor.rowcount or 0
+                conn.commit()
+                deleted += batch
+                if batch < self.batch_size:
+                    return deleted
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            deleted = self.compact_once()
+            if deleted:
+                self.logger.debug("AI memory compactor removed %s rows.", deleted)
+
+
+_memory_compactor: MemoryCompactor | None = None
+_memory_compactor_lock = threading.Lock()
+
+
+def get_memory_compactor(logger: logging.Logger | None = None) -> MemoryCompactor:
+    global _memory_compactor
+    with _memory_compactor_lock:
+        # A forked shard inherits the object but not its thread.
+        if _memory_compactor is None or _memory_compactor._pid != os.getpid():
+            _memory_compactor = MemoryCompactor(
+                logger or logging.getLogger("funpay.worker"),
+                interval_seconds=env_int("AI_MEMORY_COMPACT_SECONDS", 30),
+                batch_size=env_int("AI_MEMORY_COMPACT_BATCH", 500),
+            )
+        _memory_compactor.start()
+        return _memory_compactor
+
+
+def shutdown_memory(logger: logging.Logger | None = None) -> None:
+    # Worker shutdown: let an in-flight trim finish, then write the buffered last_used_at updates.
+    with _memory_compactor_lock:
+        compactor = _memory_compactor
+    if compactor is not None and compactor._pid == os.getpid():
+        compactor.stop(timeout=10)
+    flush_memory_touches(logger)
 
 
 def _memory_enabled() -> bool:
@@ -106,13 +396,13 @@ def store_memory(
     if not should_store_memory(user_text, ai_text):
         return
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
+        _ensure_memory_tables(conn, cfg)
         cursor = conn.cursor()
-        _ensure_memory_table(cursor)
         tokens = _tokenize(f"{user_text} {ai_text}")
         key_text = _build_key_text(tokens)
         content = f"Q: {user_text.strip()}\nA: {ai_text.strip()}"
+        workspace_value = int(workspace_id) if workspace_id is not None else None
         cursor.execute(
             """
             INSERT INTO chat_ai_memory (user_id, workspace_id, chat_id, key_text, content)
@@ -120,40 +410,17 @@ def store_memory(
             """,
             (
                 int(user_id),
-                int(workspace_id) if workspace_id is not None else None,
+                workspace_value,
                 int(chat_id),
                 key_text,
                 content,
             ),
         )
+        _insert_memory_tokens(cursor, cursor.lastrowid, user_id, workspace_value, chat_id, content)
         conn.commit()
-        max_rows = _memory_max_per_chat()
-        if max_rows > 0:
-            cursor.execute(
-                f"""
-                DELETE FROM chat_ai_memory
-                WHERE user_id = %s AND workspace_id <=> %s AND chat_id = %s
-                  AND id NOT IN (
-                    SELECT id FROM (
-                      SELECT id FROM chat_ai_memory
-                      WHERE user_id = %s AND workspace_id <=> %s AND chat_id = %s
-                      ORDER BY created_at DESC
-                      LIMIT {max_rows}
-                    ) AS t
-                  )
-                """,
-                (
-                    int(user_id),
-                    int(workspace_id) if workspace_id is not None else None,
-                    int(chat_id),
-                    int(user_id),
-                    int(workspace_id) if workspace_id is not None else None,
-                    int(chat_id),
-                ),
-            )
-            conn.commit()
-    finally:
-        conn.close()
+        chat_key = (_pool_key(cfg), int(user_id), workspace_value, int(chat_id))
+        if _count_stored_memory(cursor, chat_key) > _memory_max_per_chat():
+            get_memory_compactor().schedule(chat_key, cfg)
 
 
 def fetch_memory_context(
@@ -166,48 +433,37 @@ def fetch_memory_context(
 ) -> str | None:
     if not _memory_enabled():
         return None
-    tokens = _tokenize(query)
-    if not tokens:
+    terms = _index_tokens(query, _INDEX_TOKENS_PER_QUERY)
+    if not terms:
         return None
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
+        _ensure_memory_tables(conn, cfg)
         cursor = conn.cursor(dictionary=True)
-        _ensure_memory_table(cursor)
         limit = _memory_fetch_limit()
-        clauses = []
-        params: list = [
-            int(user_id),
-            int(workspace_id) if workspace_id is not None else None,
-            int(chat_id),
-        ]
-        for token in tokens[:6]:
-            clauses.append("(content LIKE %s OR key_text LIKE %s)")
-            like = f"%{token}%"
-            params.extend([like, like])
-        where_clause = " OR ".join(clauses) if clauses else "1=0"
+        workspace_value = int(workspace_id) if workspace_id is not None else None
+        # Memories sharing the most query terms first, then the most recently used or stored.
         cursor.execute(
             f"""
-            SELECT id, content
-            FROM chat_ai_memory
-            WHERE user_id = %s AND workspace_id <=> %s AND chat_id = %s
-              AND ({where_clause})
-            ORDER BY last_used_at DESC, created_at DESC
+            SELECT m.id, m.content
+            FROM (
+                SELECT memory_id, COUNT(*) AS hits
+                FROM chat_ai_memory_tokens
+                WHERE user_id = %s AND workspace_id <=> %s AND chat_id = %s
+                  AND token IN ({','.join(['%s'] * len(terms))})
+                GROUP BY memory_id
+            ) t
+            JOIN chat_ai_memory m ON m.id = t.memory_id
+            ORDER BY t.hits DESC, COALESCE(m.last_used_at, m.created_at) DESC, m.id DESC
             LIMIT %s
             """,
-            tuple(params + [limit]),
+            (int(user_id), workspace_value, int(chat_id), *terms, limit),
         )
         rows = cursor.fetchall() or []
         if not rows:
             return None
         ids = [int(row["id"]) for row in rows if row.get("id") is not None]
         if ids:
-            cursor.execute(
-                f"UPDATE chat_ai_memory SET last_used_at = NOW() WHERE id IN ({','.join(['%s'] * len(ids))})",
-                tuple(ids),
-            )
-            conn.commit()
+            _touch_memories(conn, cfg, workspace_value, ids)
         parts = [row.get("content") for row in rows if row.get("content")]
         return "\n\n".join(parts) if parts else None
-    finally:
-        conn.close()
@@ -6,10 +6,34 @@ from datetime import datetime
 
 @dataclass
 class RentalMonitorState:
-    last_check_ts: float = 0.0
+    rentals: dict[int, dict] = field(default_factory=dict)
+    deadlines: list[tuple[datetime, int, int]] = field(default_factory=list)
+    deadline_versions: dict[int, int] = field(default_factory=dict)
+    deadline_seq: int = 0
+    has_assigned_at: bool = False
+    synced_until: datetime | None = None
+    next_sync_ts: float = 0.0
+    full_sync_ts: float = 0.0
     freeze_cache: dict[int, bool] = field(default_factory=dict)
     expire_delay_since: dict[int, datetime] = field(default_factory=dict)
     expire_delay_next_check: dict[int, datetime] = field(default_factory=dict)
     expire_delay_notified: set[int] = field(default_factory=set)
     expire_soon_notified: dict[int, int] = field(default_factory=dict)
 
+
+@dataclass
+class ChatListSyncState:
+    summaries: dict[int, tuple] = field(default_factory=dict)
+
+
+@dataclass
+class ChatContext:
+    ai_paused_until: datetime | None = None
+    messages: list[dict] = field(default_factory=list)
+    # False when chat_messages does not exist: an empty history then says nothing.
+    history_known: bool = True
+    complete: bool = False
+    owner: str | None = None
+    owner_accounts: list[dict] | None = None
+    owner_accounts_ts: float = 0.0
+    loaded_ts: float = 0.0
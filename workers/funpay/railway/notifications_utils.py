@@ -1,8 +1,7 @@
 from __future__ import annotations
 
-import mysql.connector
 
-from .db_utils import resolve_workspace_mysql_cfg, table_exists
+from .db_utils import mysql_connection, resolve_workspace_mysql_cfg, table_exists
 from .text_utils import normalize_owner_name
 
 
@@ -21,8 +20,7 @@ def log_notification_event(
     order_id: str | None = None,
 ) -> None:
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "notification_logs"):
             return
@@ -48,8 +46,6 @@ def log_notification_event(
             ),
         )
         conn.commit()
-    finally:
-        conn.close()
 
 
 def upsert_workspace_status(
@@ -62,8 +58,7 @@ def upsert_workspace_status(
     message: str | None = None,
 ) -> None:
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "workspace_status"):
             return
@@ -85,5 +80,3 @@ def upsert_workspace_status(
             ),
         )
         conn.commit()
-    finally:
-        conn.close()
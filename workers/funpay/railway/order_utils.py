@@ -26,7 +26,7 @@ from .constants import (
     _processed_orders,
     _processed_orders_lock,
 )
-from .db_utils import column_exists, get_mysql_config, resolve_workspace_mysql_cfg, table_exists
+from .db_utils import column_exists, get_mysql_config, mysql_connection, resolve_workspace_mysql_cfg, table_exists
 from .env_utils import env_int
 from .lot_utils import (
     assign_account_to_buyer,
@@ -91,8 +91,7 @@ def log_order_history(
     if not order_key or not owner_key:
         return
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "order_history"):
             return
@@ -158,8 +157,6 @@ def log_order_history(
             user_id=user_id,
             workspace_id=workspace_id,
         )
-    finally:
-        conn.close()
 
 
 def _normalize_order_id(order_id: str | None) -> str:
@@ -181,8 +178,7 @@ def fetch_order_history_summary(
     if not order_key or not owner_key:
         return None
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         if not table_exists(cursor, "order_history"):
             return None
@@ -202,8 +198,6 @@ def fetch_order_history_summary(
             tuple(params),
         )
         return cursor.fetchone()
-    finally:
-        conn.close()
 
 
 def has_review_bonus(
@@ -218,8 +212,7 @@ def has_review_bonus(
     if not order_key or not owner_key:
         return False
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "order_history"):
             return False
@@ -238,8 +231,6 @@ def has_review_bonus(
             tuple(params),
         )
         return cursor.fetchone() is not None
-    finally:
-        conn.close()
 
 
 def apply_review_bonus_for_order(
@@ -300,8 +291,7 @@ def has_review_bonus_reverted(
     if not order_key or not owner_key:
         return False
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "order_history"):
             return False
@@ -320,8 +310,6 @@ def has_review_bonus_reverted(
             tuple(params),
         )
         return cursor.fetchone() is not None
-    finally:
-        conn.close()
 
 
 def fetch_review_bonus_entry(
@@ -335,8 +323,7 @@ def fetch_review_bonus_entry(
     if not order_key or not owner_key:
         return None
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, None)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         if not table_exists(cursor, "order_history"):
             return None
@@ -351,8 +338,6 @@ def fetch_review_bonus_entry(
             (order_key, owner_key),
         )
         return cursor.fetchone()
-    finally:
-        conn.close()
 
 
 def revert_review_bonus_for_order(
@@ -415,8 +400,7 @@ def fetch_latest_order_id_for_account(
     if not owner_key:
         return None
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "order_history"):
             return None
@@ -437,8 +421,6 @@ def fetch_latest_order_id_for_account(
         )
         row = cursor.fetchone()
         return row[0] if row and row[0] else None
-    finally:
-        conn.close()
 
 
 def fetch_previous_owner_for_account(
@@ -451,8 +433,7 @@ def fetch_previous_owner_for_account(
 ) -> str | None:
     owner_key = normalize_owner_name(current_owner)
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "order_history"):
             return None
@@ -483,8 +464,6 @@ def fetch_previous_owner_for_account(
         if not row:
             return None
         return row[0] if row[0] else None
-    finally:
-        conn.close()
 
 
 def fetch_latest_account_for_owner_lot(
@@ -503,8 +482,7 @@ def fetch_latest_account_for_owner_lot(
     except Exception:
         return None
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "order_history"):
             return None
@@ -529,8 +507,6 @@ def fetch_latest_account_for_owner_lot(
         if not row:
             return None
         return int(row[0]) if row[0] is not None else None
-    finally:
-        conn.close()
 
 
 def fetch_latest_order_id_for_owner_lot(
@@ -549,8 +525,7 @@ def fetch_latest_order_id_for_owner_lot(
     except Exception:
         return None
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "order_history"):
             return None
@@ -573,8 +548,6 @@ def fetch_latest_order_id_for_owner_lot(
         )
         row = cursor.fetchone()
         return row[0] if row and row[0] else None
-    finally:
-        conn.close()
 
 
 def _award_purchase_bonus(
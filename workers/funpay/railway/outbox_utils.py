@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import Callable
+
+from .env_utils import env_bool
+from .presence_utils import get_redis_client
+
+
+CHAT_OUTBOX_STREAM_KEY = os.getenv("CHAT_OUTBOX_STREAM_KEY", "chat:outbox:events")
+
+
+class OutboxWakeups:
+    # Follows the Redis stream the backend appends to on every enqueue_outbox and wakes the
+    # workspace that owns the message. Events are only hints: the outbox rows stay in MySQL
+    # and a periodic reconciliation picks up anything sent while Redis was unreachable.
+    def __init__(self, logger: logging.Logger, *, block_ms: int = 5000) -> None:
+        self.logger = logger
+        self.block_ms = max(100, int(block_ms))
+        self._subscribers: dict[int, Callable[[], None]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._connected = False
+        self._pid = os.getpid()
+
+    @property
+    def connected(self) -> bool:
+        return self._connected and self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="funpay-outbox-wakeups", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def subscribe(self, workspace_id: int, callback: Callable[[], None]) -> None:
+        with self._lock:
+            self._subscribers[int(workspace_id)] = callback
+
+    def unsubscribe(self, workspace_id: int, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if self._subscribers.get(int(workspace_id)) == callback:
+                self._subscribers.pop(int(workspace_id), None)
+
+    def _dispatch(self, entries: list) -> str | None:
+        last_id = None
+        woken: set[int] = set()
+        for entry_id, fields in entries:
+            last_id = entry_id
+            raw = (fields or {}).get("workspace_id")
+            if raw and str(raw).isdigit():
+                woken.add(int(raw))
+        with self._lock:
+            callbacks = [self._subscribers[ws_id] for ws_id in woken if ws_id in self._subscribers]
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                self.logger.debug("Outbox wake-up callback failed.", exc_info=True)
+        return last_id
+
+    def _run(self) -> None:
+        last_id = "$"
+        while not self._stop.is_set():
+            cache = get_redis_client()
+            if not cache:
+                self._connected = False
+                self._stop.wait(30)
+                continue
+            try:
+                result = cache.xread({CHAT_OUTBOX_STREAM_KEY: last_id}, count=200, block=self.block_ms)
+            except Exception as exc:
+                if self._connected:
+                    self.logger.warning("Outbox wake-up stream unavailable: %s", exc)
+                self._connected = False
+                self._stop.wait(5)
+                continue
+            self._connected = True
+            for _stream, entries in result or []:
+                last_id = self._dispatch(entries) or last_id
+
+
+_outbox_wakeups: OutboxWakeups | None = None
+_outbox_wakeups_lock = threading.Lock()
+
+
+def get_outbox_wakeups(logger: logging.Logger | None = None) -> OutboxWakeups | None:
+    global _outbox_wakeups
+    if not env_bool("CHAT_OUTBOX_REDIS_WAKEUP", True):
+        return None
+    with _outbox_wakeups_lock:
+        # A forked shard inherits the object but not its thread, so it gets its own listener.
+        if _outbox_wakeups is None or _outbox_wakeups._pid != os.getpid():
+            _outbox_wakeups = OutboxWakeups(logger or logging.getLogger("funpay.worker"))
+        _outbox_wakeups.start()
+        return _outbox_wakeups
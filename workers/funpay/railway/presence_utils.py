@@ -3,6 +3,7 @@ from __future__ import annotations
 import json
 import os
 import time
+from typing import Iterable
 
 import requests
 
@@ -74,34 +75,43 @@ def chat_cache_workspace_key(workspace_id: int | None) -> str:
     return "none" if workspace_id is None else str(int(workspace_id))
 
 
-def chat_list_cache_pattern(user_id: int, workspace_id: int | None) -> str:
-    return f"chat:list:{int(user_id)}:{chat_cache_workspace_key(workspace_id)}:*"
+def chat_list_cache_namespace(user_id: int, workspace_id: int | None) -> str:
+    return f"chat:list:{int(user_id)}:{chat_cache_workspace_key(workspace_id)}"
 
 
-def chat_history_cache_pattern(user_id: int, workspace_id: int | None, chat_id: int) -> str:
-    return f"chat:history:{int(user_id)}:{chat_cache_workspace_key(workspace_id)}:{int(chat_id)}:*"
+def chat_history_cache_namespace(user_id: int, workspace_id: int | None, chat_id: int) -> str:
+    return f"chat:history:{int(user_id)}:{chat_cache_workspace_key(workspace_id)}:{int(chat_id)}"
 
 
-def invalidate_chat_cache(user_id: int, workspace_id: int | None, chat_id: int) -> None:
+def cache_namespace_gen_ttl_seconds() -> int:
+    return int(os.getenv("CACHE_NAMESPACE_GEN_TTL_SECONDS", "86400"))
+
+
+def invalidate_chat_caches(user_id: int, workspace_id: int | None, chat_ids: Iterable[int]) -> None:
+    # The backend chat cache embeds a generation per namespace in its keys
+    # (apps/backend/services/cache_namespace.py); bumping it orphans every cached page at once
+    # and the orphans expire on their own TTL. All namespaces go out in one round trip.
+    chat_ids = sorted({int(chat_id) for chat_id in chat_ids})
+    if not chat_ids:
+        return
     cache = get_redis_client()
     if not cache:
         return
-    patterns = [
-        chat_list_cache_pattern(user_id, workspace_id),
-        chat_history_cache_pattern(user_id, workspace_id, chat_id),
-    ]
-    for pattern in patterns:
-        try:
-            batch: list[str] = []
-            for key in cache.scan_iter(match=pattern):
-                batch.append(str(key))
-                if len(batch) >= 200:
-                    cache.delete(*batch)
-                    batch.clear()
-            if batch:
-                cache.delete(*batch)
-        except Exception:
-            continue
+    namespaces = [chat_list_cache_namespace(user_id, workspace_id)]
+    namespaces.extend(chat_history_cache_namespace(user_id, workspace_id, chat_id) for chat_id in chat_ids)
+    ttl = cache_namespace_gen_ttl_seconds()
+    try:
+        pipe = cache.pipeline(transaction=False)
+        for namespace in namespaces:
+            pipe.incr(f"{namespace}:gen")
+            pipe.expire(f"{namespace}:gen", ttl)
+        pipe.execute()
+    except Exception:
+        return
+
+
+def invalidate_chat_cache(user_id: int, workspace_id: int | None, chat_id: int) -> None:
+    invalidate_chat_caches(user_id, workspace_id, [chat_id])
 
 
 def fetch_presence(steam_id: str | None, *, user_id: int | None = None, bridge_id: int | None = None) -> dict:
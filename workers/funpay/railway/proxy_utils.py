@@ -3,9 +3,10 @@ from __future__ import annotations
 import logging
 import os
 
-import mysql.connector
 import requests
 
+from .db_utils import mysql_connection
+
 
 def normalize_proxy_url(raw: str | None) -> str:
     value = (raw or "").strip()
@@ -82,8 +83,7 @@ def ensure_proxy_isolated(
 
 
 def fetch_workspaces(mysql_cfg: dict) -> list[dict]:
-    conn = mysql.connector.connect(**mysql_cfg)
-    try:
+    with mysql_connection(mysql_cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         cursor.execute(
             """
@@ -98,5 +98,3 @@ def fetch_workspaces(mysql_cfg: dict) -> list[dict]:
         )
         rows = cursor.fetchall()
         return list(rows or [])
-    finally:
-        conn.close()
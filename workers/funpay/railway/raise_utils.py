@@ -1,17 +1,17 @@
 from __future__ import annotations
 
+import heapq
 import inspect
 import os
 import time
 from datetime import datetime
 from dataclasses import dataclass, field
 
-import mysql.connector
 
 from FunPayAPI.common import exceptions as fp_exceptions
 from FunPayAPI.common.enums import SubCategoryTypes
 
-from .db_utils import resolve_workspace_mysql_cfg, table_exists
+from .db_utils import mysql_connection, resolve_workspace_mysql_cfg, table_exists
 
 
 def upsert_raise_categories(
@@ -22,8 +22,7 @@ def upsert_raise_categories(
     categories: list[tuple[int, str]],
 ) -> None:
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "raise_categories"):
             return
@@ -50,8 +49,6 @@ def upsert_raise_categories(
             rows,
         )
         conn.commit()
-    finally:
-        conn.close()
 
 
 def collect_raise_categories_from_profile(profile) -> list[tuple[int, str]]:
@@ -140,8 +137,7 @@ def _coerce_ts(value) -> float | None:
 
 
 def load_auto_raise_settings(mysql_cfg: dict, user_id: int) -> dict:
-    conn = mysql.connector.connect(**mysql_cfg)
-    try:
+    with mysql_connection(mysql_cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         if not table_exists(cursor, "auto_raise_settings"):
             return _default_auto_raise_settings()
@@ -176,13 +172,10 @@ def load_auto_raise_settings(mysql_cfg: dict, user_id: int) -> dict:
                 workspaces[int(workspace_id)] = bool(row.get("enabled"))
         settings["workspaces"] = workspaces
         return settings
-    finally:
-        conn.close()
 
 
 def load_enabled_workspace_ids(mysql_cfg: dict, user_id: int, settings: dict) -> list[int]:
-    conn = mysql.connector.connect(**mysql_cfg)
-    try:
+    with mysql_connection(mysql_cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         if not table_exists(cursor, "workspaces"):
             return []
@@ -193,25 +186,19 @@ def load_enabled_workspace_ids(mysql_cfg: dict, user_id: int, settings: dict) ->
             enabled_map = settings.get("workspaces") or {}
             ids = [ws_id for ws_id in ids if enabled_map.get(ws_id, True)]
         return ids
-    finally:
-        conn.close()
 
 
 def ensure_auto_raise_state(mysql_cfg: dict, user_id: int) -> None:
-    conn = mysql.connector.connect(**mysql_cfg)
-    try:
+    with mysql_connection(mysql_cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "auto_raise_state"):
             return
         cursor.execute("INSERT IGNORE INTO auto_raise_state (user_id) VALUES (%s)", (int(user_id),))
         conn.commit()
-    finally:
-        conn.close()
 
 
 def ensure_auto_raise_global_state(mysql_cfg: dict, user_id: int) -> None:
-    conn = mysql.connector.connect(**mysql_cfg)
-    try:
+    with mysql_connection(mysql_cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "auto_raise_global_state"):
             return
@@ -220,8 +207,6 @@ def ensure_auto_raise_global_state(mysql_cfg: dict, user_id: int) -> None:
             (int(user_id),),
         )
         conn.commit()
-    finally:
-        conn.close()
 
 
 def claim_auto_raise_slot(
@@ -232,8 +217,7 @@ def claim_auto_raise_slot(
     interval_seconds: int,
     allow_same: bool,
 ) -> bool:
-    conn = mysql.connector.connect(**mysql_cfg)
-    try:
+    with mysql_connection(mysql_cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "auto_raise_state"):
             return True
@@ -256,8 +240,6 @@ def claim_auto_raise_slot(
         )
         conn.commit()
         return cursor.rowcount > 0
-    finally:
-        conn.close()
 
 
 def claim_auto_raise_global_slot(
@@ -268,8 +250,7 @@ def claim_auto_raise_global_slot(
     interval_seconds: int,
     allow_same: bool,
 ) -> bool:
-    conn = mysql.connector.connect(**mysql_cfg)
-    try:
+    with mysql_connection(mysql_cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "auto_raise_global_state"):
             return False
@@ -292,13 +273,10 @@ def claim_auto_raise_global_slot(
         )
         conn.commit()
         return cursor.rowcount > 0
-    finally:
-        conn.close()
 
 
 def get_auto_raise_next_run(mysql_cfg: dict, user_id: int) -> float | None:
-    conn = mysql.connector.connect(**mysql_cfg)
-    try:
+    with mysql_connection(mysql_cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         if not table_exists(cursor, "auto_raise_state"):
             return None
@@ -308,13 +286,10 @@ def get_auto_raise_next_run(mysql_cfg: dict, user_id: int) -> float | None:
         )
         row = cursor.fetchone() or {}
         return _coerce_ts(row.get("next_run_at"))
-    finally:
-        conn.close()
 
 
 def get_auto_raise_global_next_run(mysql_cfg: dict, user_id: int) -> float | None:
-    conn = mysql.connector.connect(**mysql_cfg)
-    try:
+    with mysql_connection(mysql_cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         if not table_exists(cursor, "auto_raise_global_state"):
             return None
@@ -324,8 +299,6 @@ def get_auto_raise_global_next_run(mysql_cfg: dict, user_id: int) -> float | Non
         )
         row = cursor.fetchone() or {}
         return _coerce_ts(row.get("next_run_at"))
-    finally:
-        conn.close()
 
 
 def log_auto_raise(
@@ -341,8 +314,7 @@ def log_auto_raise(
     if not mysql_cfg or user_id is None:
         return
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not table_exists(cursor, "auto_raise_logs"):
             return
@@ -369,8 +341,6 @@ def log_auto_raise(
             ),
         )
         conn.commit()
-    finally:
-        conn.close()
 
 
 def fetch_pending_raise_requests(
@@ -381,8 +351,7 @@ def fetch_pending_raise_requests(
     limit: int = 3,
 ) -> list[dict]:
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         if not table_exists(cursor, "auto_raise_requests"):
             return []
@@ -397,13 +366,10 @@ def fetch_pending_raise_requests(
             (int(user_id), int(workspace_id) if workspace_id is not None else None, int(limit)),
         )
         return cursor.fetchall() or []
-    finally:
-        conn.close()
 
 
 def claim_raise_request(mysql_cfg: dict, request_id: int) -> bool:
-    conn = mysql.connector.connect(**mysql_cfg)
-    try:
+    with mysql_connection(mysql_cfg) as conn:
         cursor = conn.cursor()
         cursor.execute(
             "UPDATE auto_raise_requests SET status = 'running' WHERE id = %s AND status = 'pending'",
@@ -411,21 +377,28 @@ def claim_raise_request(mysql_cfg: dict, request_id: int) -> bool:
         )
         conn.commit()
         return cursor.rowcount > 0
-    finally:
-        conn.close()
 
 
 def finish_raise_request(mysql_cfg: dict, request_id: int, status: str) -> None:
-    conn = mysql.connector.connect(**mysql_cfg)
-    try:
+    with mysql_connection(mysql_cfg) as conn:
         cursor = conn.cursor()
         cursor.execute(
             "UPDATE auto_raise_requests SET status = %s, processed_at = NOW() WHERE id = %s",
             (status, int(request_id)),
         )
         conn.commit()
-    finally:
-        conn.close()
+
+
+RAISE_REQUEST_SPACING_SECONDS = 1.0
+
+
+@dataclass(order=True)
+class _RaiseTask:
+    due_at: float
+    seq: int
+    category_id: int = field(compare=False)
+    category_name: str = field(compare=False)
+    probe: bool = field(default=False, compare=False)
 
 
 @dataclass
@@ -440,6 +413,13 @@ class AutoRaiseState:
     workspaces_updated_at: float = 0.0
     global_state_available: bool | None = None
     global_state_checked_at: float = 0.0
+    raise_queue: list[_RaiseTask] = field(default_factory=list)
+    queued_categories: set[int] = field(default_factory=set)
+    raise_seq: int = 0
+    next_request_at: float = 0.0
+    next_call: float = float("inf")
+    next_cycle_at: float = 0.0
+    cycle_request_ids: list[int] = field(default_factory=list)
 
 
 def refresh_profile(
@@ -479,7 +459,17 @@ def refresh_profile(
     return profile
 
 
-def raise_lots_once(
+def _push_raise_task(state: AutoRaiseState, due_at: float, category_id: int, category_name: str, probe: bool) -> None:
+    state.raise_seq += 1
+    heapq.heappush(state.raise_queue, _RaiseTask(due_at, state.raise_seq, category_id, category_name, probe))
+    state.queued_categories.add(category_id)
+
+
+def _note_next_call(state: AutoRaiseState, next_time: float) -> None:
+    state.next_call = next_time if next_time < state.next_call else state.next_call
+
+
+def start_raise_cycle(
     *,
     account,
     state: AutoRaiseState,
@@ -488,8 +478,12 @@ def raise_lots_once(
     workspace_id: int | None,
     profile_sync_seconds: int,
     force_profile: bool = False,
-) -> int:
+) -> bool:
+    # Queues every category that is due; the raises themselves are done one per
+    # run_raise_step call, so the workspace loop keeps polling chats in between.
     now = time.time()
+    if not state.raise_queue:
+        state.next_call = float("inf")
     if force_profile or state.profile is None or (now - state.profile_updated_at) >= profile_sync_seconds:
         try:
             refresh_profile(
@@ -507,87 +501,115 @@ def raise_lots_once(
                 level="error",
                 message=f"Не удалось обновить профиль: {exc}",
             )
-            return int(time.time()) + 60
+            _note_next_call(state, int(time.time()) + 60)
+            return False
 
     profile = state.profile
     if not profile or not profile.get_lots():
-        return int(time.time()) + 60
+        _note_next_call(state, int(time.time()) + 60)
+        return False
 
-    next_call = float("inf")
     for subcat in sorted(list(profile.get_sorted_lots(2).keys()), key=lambda x: x.category.position):
         if subcat.type is SubCategoryTypes.CURRENCY:
             continue
-        saved_time = state.raise_time.get(subcat.category.id)
+        category_id = subcat.category.id
+        if category_id in state.queued_categories:
+            continue
+        saved_time = state.raise_time.get(category_id)
         if saved_time and saved_time > int(time.time()):
-            next_call = saved_time if saved_time < next_call else next_call
+            _note_next_call(state, saved_time)
             continue
+        _push_raise_task(state, now, category_id, subcat.category.name, False)
+    return True
 
-        raise_ok = False
-        error_text = ""
-        time_delta = ""
-        try:
-            time.sleep(1)
-            account.raise_lots(subcat.category.id)
-            raise_ok = True
-            last_time = state.raised_time.get(subcat.category.id)
-            state.raised_time[subcat.category.id] = new_time = int(time.time())
+
+def run_raise_step(
+    *,
+    account,
+    state: AutoRaiseState,
+    mysql_cfg: dict | None,
+    user_id: int | None,
+    workspace_id: int | None,
+) -> float:
+    # Runs at most one raise request and returns the seconds until the next one is due.
+    # Spacing between requests and back-off after errors are kept as timestamps instead
+    # of sleeping in the workspace loop.
+    now = time.time()
+    if not state.raise_queue:
+        return 0.0
+    due_at = max(state.raise_queue[0].due_at, state.next_request_at)
+    if due_at > now:
+        return due_at - now
+
+    task = heapq.heappop(state.raise_queue)
+    state.queued_categories.discard(task.category_id)
+    state.next_request_at = time.time() + RAISE_REQUEST_SPACING_SECONDS
+    try:
+        account.raise_lots(task.category_id)
+        if not task.probe:
+            last_time = state.raised_time.get(task.category_id)
+            state.raised_time[task.category_id] = new_time = int(time.time())
             time_delta = "" if not last_time else f" Последнее поднятие: {_seconds_to_str(new_time - last_time)} назад."
             log_auto_raise(
                 mysql_cfg,
                 user_id=user_id,
                 workspace_id=workspace_id,
                 level="info",
-                message=f'Все лоты категории "{subcat.category.name}" подняты!{time_delta}',
+                message=f'Все лоты категории "{task.category_name}" подняты!{time_delta}',
             )
-            time.sleep(1)
-            account.raise_lots(subcat.category.id)
-        except fp_exceptions.RaiseError as exc:
-            if exc.error_message is not None:
-                error_text = exc.error_message
-            if exc.wait_time is not None:
-                next_time = int(time.time()) + int(exc.wait_time)
-                state.raise_time[subcat.category.id] = next_time
-                next_call = next_time if next_time < next_call else next_call
-                log_auto_raise(
-                    mysql_cfg,
-                    user_id=user_id,
-                    workspace_id=workspace_id,
-                    level="warn",
-                    message=(
-                        f'Не удалось поднять лоты категории "{subcat.category.name}". FunPay говорит: '
-                        f'"{error_text}". Следующая попытка через {_seconds_to_str(int(exc.wait_time))}.'
-                    ),
-                )
-            else:
-                log_auto_raise(
-                    mysql_cfg,
-                    user_id=user_id,
-                    workspace_id=workspace_id,
-                    level="error",
-                    message=f'Произошла непредвиденная ошибка при попытке поднять лоты категории "{subcat.category.name}".',
-                )
-                time.sleep(10)
-                next_time = int(time.time()) + 1
-                next_call = next_time if next_time < next_call else next_call
-            if not raise_ok:
-                continue
-        except Exception as exc:
-            delay = 10
-            if isinstance(exc, fp_exceptions.RequestFailedError) and exc.status_code in (503, 403, 429):
-                delay = 60
-            time.sleep(delay)
-            next_time = int(time.time()) + 1
-            next_call = next_time if next_time < next_call else next_call
+            # Second request only asks FunPay how long to wait until the next raise.
+            _push_raise_task(state, time.time(), task.category_id, task.category_name, True)
+    except fp_exceptions.RaiseError as exc:
+        error_text = exc.error_message if exc.error_message is not None else ""
+        if exc.wait_time is not None:
+            next_time = int(time.time()) + int(exc.wait_time)
+            state.raise_time[task.category_id] = next_time
+            _note_next_call(state, next_time)
+            log_auto_raise(
+                mysql_cfg,
+                user_id=user_id,
+                workspace_id=workspace_id,
+                level="warn",
+                message=(
+                    f'Не удалось поднять лоты категории "{task.category_name}". FunPay говорит: '
+                    f'"{error_text}". Следующая попытка через {_seconds_to_str(int(exc.wait_time))}.'
+                ),
+            )
+        else:
             log_auto_raise(
                 mysql_cfg,
                 user_id=user_id,
                 workspace_id=workspace_id,
                 level="error",
-                message=f'Ошибка при поднятии категории "{subcat.category.name}": {str(exc)[:200]}',
+                message=f'Произошла непредвиденная ошибка при попытке поднять лоты категории "{task.category_name}".',
             )
-            if not raise_ok:
-                continue
-    return next_call if next_call < float("inf") else int(time.time()) + 10
+            state.next_request_at = time.time() + 10
+            _note_next_call(state, int(state.next_request_at) + 1)
+    except Exception as exc:
+        delay = 10
+        if isinstance(exc, fp_exceptions.RequestFailedError) and exc.status_code in (503, 403, 429):
+            delay = 60
+        state.next_request_at = time.time() + delay
+        _note_next_call(state, int(state.next_request_at) + 1)
+        log_auto_raise(
+            mysql_cfg,
+            user_id=user_id,
+            workspace_id=workspace_id,
+            level="error",
+            message=f'Ошибка при поднятии категории "{task.category_name}": {str(exc)[:200]}',
+        )
+
+    if not state.raise_queue:
+        _finish_raise_cycle(state, mysql_cfg)
+        return 0.0
+    return max(0.0, max(state.raise_queue[0].due_at, state.next_request_at) - time.time())
+
+
+def _finish_raise_cycle(state: AutoRaiseState, mysql_cfg: dict | None) -> None:
+    state.next_cycle_at = state.next_call if state.next_call < float("inf") else int(time.time()) + 10
+    request_ids, state.cycle_request_ids = state.cycle_request_ids, []
+    for request_id in request_ids:
+        finish_raise_request(mysql_cfg, request_id, "done")
 
 
 def process_manual_raise_requests(
@@ -618,7 +640,7 @@ def process_manual_raise_requests(
             message="Запрошено ручное автоподнятие.",
         )
         try:
-            raise_lots_once(
+            start_raise_cycle(
                 account=account,
                 state=state,
                 mysql_cfg=mysql_cfg,
@@ -627,7 +649,6 @@ def process_manual_raise_requests(
                 profile_sync_seconds=profile_sync_seconds,
                 force_profile=True,
             )
-            finish_raise_request(mysql_cfg, request_id, "done")
         except Exception as exc:
             log_auto_raise(
                 mysql_cfg,
@@ -637,11 +658,17 @@ def process_manual_raise_requests(
                 message=f"Ручное автоподнятие завершилось с ошибкой: {str(exc)[:200]}",
             )
             finish_raise_request(mysql_cfg, request_id, "failed")
+            continue
+        if state.raise_queue:
+            state.cycle_request_ids.append(request_id)
+        else:
+            finish_raise_request(mysql_cfg, request_id, "done")
     return True
 
 
 
 
+
 def auto_raise_init_state(
     *,
     mysql_cfg: dict | None,
@@ -659,6 +686,27 @@ def auto_raise_init_state(
     return state
 
 
+def _drive_raise_queue(
+    *,
+    account,
+    state: AutoRaiseState,
+    mysql_cfg: dict | None,
+    user_id: int | None,
+    workspace_id: int | None,
+    max_delay: float,
+) -> float:
+    delay = run_raise_step(
+        account=account,
+        state=state,
+        mysql_cfg=mysql_cfg,
+        user_id=user_id,
+        workspace_id=workspace_id,
+    )
+    if not state.raise_queue:
+        return 1.0
+    return float(min(max(delay, 0.2), max_delay))
+
+
 def auto_raise_step(
     *,
     account,
@@ -681,6 +729,15 @@ def auto_raise_step(
         workspace_id=workspace_id,
         profile_sync_seconds=profile_sync_seconds,
     )
+    if state.raise_queue:
+        return _drive_raise_queue(
+            account=account,
+            state=state,
+            mysql_cfg=mysql_cfg,
+            user_id=user_id,
+            workspace_id=workspace_id,
+            max_delay=manual_check_interval,
+        )
     if not enabled_fn():
         return 10.0
 
@@ -704,7 +761,9 @@ def auto_raise_step(
             return 10.0
 
     if not mysql_cfg or user_id is None or workspace_id is None:
-        next_time = raise_lots_once(
+        if now < state.next_cycle_at:
+            return float(min(state.next_cycle_at - now, manual_check_interval))
+        start_raise_cycle(
             account=account,
             state=state,
             mysql_cfg=mysql_cfg,
@@ -712,8 +771,18 @@ def auto_raise_step(
             workspace_id=workspace_id,
             profile_sync_seconds=profile_sync_seconds,
         )
-        delay = next_time - int(time.time())
-        return float(min(delay, manual_check_interval)) if delay > 0 else 1.0
+        if not state.raise_queue:
+            _finish_raise_cycle(state, mysql_cfg)
+            delay = state.next_cycle_at - int(time.time())
+            return float(min(delay, manual_check_interval)) if delay > 0 else 1.0
+        return _drive_raise_queue(
+            account=account,
+            state=state,
+            mysql_cfg=mysql_cfg,
+            user_id=user_id,
+            workspace_id=workspace_id,
+            max_delay=manual_check_interval,
+        )
 
     if (now - state.workspaces_updated_at) >= workspaces_sync_seconds or not state.enabled_workspaces:
         try:
@@ -733,12 +802,9 @@ def auto_raise_step(
     if has_global_state is None or (now - state.global_state_checked_at) >= 60:
         has_global_state = False
         try:
-            conn = mysql.connector.connect(**mysql_cfg)
-            try:
+            with mysql_connection(mysql_cfg) as conn:
                 cursor = conn.cursor()
                 has_global_state = table_exists(cursor, "auto_raise_global_state")
-            finally:
-                conn.close()
         except Exception:
             has_global_state = False
         state.global_state_available = has_global_state
@@ -769,7 +835,7 @@ def auto_raise_step(
             return float(min(delay, manual_check_interval))
         return float(manual_check_interval)
 
-    raise_lots_once(
+    start_raise_cycle(
         account=account,
         state=state,
         mysql_cfg=mysql_cfg,
@@ -777,7 +843,16 @@ def auto_raise_step(
         workspace_id=workspace_id,
         profile_sync_seconds=profile_sync_seconds,
     )
-    return float(min(10, manual_check_interval))
+    if not state.raise_queue:
+        return float(min(10, manual_check_interval))
+    return _drive_raise_queue(
+        account=account,
+        state=state,
+        mysql_cfg=mysql_cfg,
+        user_id=user_id,
+        workspace_id=workspace_id,
+        max_delay=manual_check_interval,
+    )
 
 
 def auto_raise_loop(
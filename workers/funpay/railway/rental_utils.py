@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import heapq
 import logging
 import time
 from datetime import datetime, timedelta
@@ -7,6 +8,7 @@ from datetime import datetime, timedelta
 import mysql.connector
 from FunPayAPI.account import Account
 
+from .chat_context_utils import forget_owner_accounts
 from .chat_utils import send_chat_message, send_message_by_owner
 from .constants import (
     RENTAL_EXPIRE_DELAY_MESSAGE,
@@ -17,7 +19,8 @@ from .constants import (
     RENTAL_PAUSE_EXPIRED_MESSAGE,
     RENTAL_UNFROZEN_MESSAGE,
 )
-from .db_utils import column_exists, get_mysql_config, resolve_workspace_mysql_cfg, table_exists
+from .cache_utils import TTLCache
+from .db_utils import column_exists, get_mysql_config, mysql_connection, resolve_workspace_mysql_cfg, table_exists
 from .env_utils import env_bool, env_int
 from .models import RentalMonitorState
 from .notifications_utils import log_notification_event
@@ -34,68 +37,54 @@ from .text_utils import _calculate_resume_start, _parse_datetime, build_expire_s
 from .user_utils import get_user_id_by_username
 
 
-_BRIDGE_DEFAULT_CACHE: dict[int, tuple[float, int | None]] = {}
-_BRIDGE_DEFAULT_TTL_SECONDS = 300
-_BRIDGE_DEFAULT_MAX_ENTRIES = 2000
-
-
-def _prune_bridge_cache(now: float) -> None:
-    if len(_BRIDGE_DEFAULT_CACHE) <= _BRIDGE_DEFAULT_MAX_ENTRIES:
-        return
-    overflow = len(_BRIDGE_DEFAULT_CACHE) - _BRIDGE_DEFAULT_MAX_ENTRIES
-    for key, _ in sorted(_BRIDGE_DEFAULT_CACHE.items(), key=lambda item: item[1][0])[: max(overflow, 0)]:
-        _BRIDGE_DEFAULT_CACHE.pop(key, None)
+# Values are (bridge_id,) so a cached "no bridge" is told apart from a miss.
+_BRIDGE_DEFAULT_CACHE: TTLCache[int, tuple[int | None]] = TTLCache("bridge_default", max_entries=2000, ttl_seconds=300)
+RENTAL_SYNC_OVERLAP_SECONDS = 2
 
 
 def _get_default_bridge_id(mysql_cfg: dict, user_id: int) -> int | None:
-    now = time.time()
     cached = _BRIDGE_DEFAULT_CACHE.get(int(user_id))
-    if cached and now - cached[0] < _BRIDGE_DEFAULT_TTL_SECONDS:
-        return cached[1]
+    if cached is not None:
+        return cached[0]
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, None)
-    conn = mysql.connector.connect(**cfg)
-    try:
-        cursor = conn.cursor()
-        if not table_exists(cursor, "steam_bridge_accounts"):
-            _BRIDGE_DEFAULT_CACHE[int(user_id)] = (now, None)
-            _prune_bridge_cache(now)
-            return None
-        cursor.execute(
-            "SELECT id FROM steam_bridge_accounts WHERE user_id = %s AND is_default = 1 "
-            "ORDER BY updated_at DESC LIMIT 1",
-            (int(user_id),),
-        )
-        row = cursor.fetchone()
-        bridge_id = int(row[0]) if row and row[0] else None
-        if bridge_id is None:
+    with mysql_connection(cfg) as conn:
+        try:
+            cursor = conn.cursor()
+            if not table_exists(cursor, "steam_bridge_accounts"):
+                _BRIDGE_DEFAULT_CACHE.set(int(user_id), (None,))
+                return None
             cursor.execute(
-                "SELECT id FROM steam_bridge_accounts WHERE user_id = %s ORDER BY updated_at DESC LIMIT 1",
+                "SELECT id FROM steam_bridge_accounts WHERE user_id = %s AND is_default = 1 "
+                "ORDER BY updated_at DESC LIMIT 1",
                 (int(user_id),),
             )
             row = cursor.fetchone()
             bridge_id = int(row[0]) if row and row[0] else None
-        _BRIDGE_DEFAULT_CACHE[int(user_id)] = (now, bridge_id)
-        _prune_bridge_cache(now)
-        return bridge_id
-    except Exception:
-        _BRIDGE_DEFAULT_CACHE[int(user_id)] = (now, None)
-        _prune_bridge_cache(now)
-        return None
-    finally:
-        conn.close()
+            if bridge_id is None:
+                cursor.execute(
+                    "SELECT id FROM steam_bridge_accounts WHERE user_id = %s ORDER BY updated_at DESC LIMIT 1",
+                    (int(user_id),),
+                )
+                row = cursor.fetchone()
+                bridge_id = int(row[0]) if row and row[0] else None
+            _BRIDGE_DEFAULT_CACHE.set(int(user_id), (bridge_id,))
+            return bridge_id
+        except Exception:
+            _BRIDGE_DEFAULT_CACHE.set(int(user_id), (None,))
+            return None
 
 
-def fetch_active_rentals_for_monitor(
+def _fetch_rentals_for_monitor(
     mysql_cfg: dict,
     user_id: int,
     workspace_id: int | None,
-) -> tuple[list[dict], bool]:
+    changed_since: datetime | None = None,
+) -> tuple[list[dict], bool, datetime | None]:
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         if not table_exists(cursor, "accounts"):
-            return []
+            return [], False, None
         has_lots = table_exists(cursor, "lots")
         has_display_name = has_lots and column_exists(cursor, "lots", "display_name")
         has_workspace = column_exists(cursor, "accounts", "workspace_id")
@@ -104,7 +93,14 @@ def fetch_active_rentals_for_monitor(
         has_rental_frozen_at = column_exists(cursor, "accounts", "rental_frozen_at")
         has_account_frozen = column_exists(cursor, "accounts", "account_frozen")
         has_rental_assigned_at = column_exists(cursor, "accounts", "rental_assigned_at")
+        has_updated_at = column_exists(cursor, "accounts", "updated_at")
         params: list = [int(user_id)]
+        # A delta read also returns rows whose owner was cleared, so the caller can drop them.
+        if changed_since is not None and has_updated_at:
+            filter_clause = " AND a.updated_at >= %s"
+            params.append(changed_since)
+        else:
+            filter_clause = " AND a.owner IS NOT NULL AND a.owner != ''"
         workspace_clause = ""
         lot_workspace_clause = ""
         if has_workspace and workspace_id is not None:
@@ -113,6 +109,11 @@ def fetch_active_rentals_for_monitor(
         if has_lots and workspace_id is not None and column_exists(cursor, "lots", "workspace_id"):
             lot_workspace_clause = " AND (l.workspace_id = %s OR l.workspace_id IS NULL)"
             params.append(int(workspace_id))
+        synced_until = None
+        if has_updated_at:
+            cursor.execute("SELECT NOW() AS db_now")
+            row = cursor.fetchone() or {}
+            synced_until = _parse_datetime(row.get("db_now"))
         cursor.execute(
             f"""
             SELECT a.id, a.account_name, a.login, a.password, a.mafile_json, a.owner,
@@ -126,14 +127,21 @@ def fetch_active_rentals_for_monitor(
                    {', l.display_name' if has_display_name else ', NULL AS display_name'}
             FROM accounts a
             LEFT JOIN lots l ON l.account_id = a.id
-            WHERE a.user_id = %s AND a.owner IS NOT NULL AND a.owner != ''{workspace_clause}{lot_workspace_clause}
+            WHERE a.user_id = %s{filter_clause}{workspace_clause}{lot_workspace_clause}
             ORDER BY a.rental_start DESC, a.id DESC
             """,
             tuple(params),
         )
-        return list(cursor.fetchall() or []), has_rental_assigned_at
-    finally:
-        conn.close()
+        return list(cursor.fetchall() or []), has_rental_assigned_at, synced_until
+
+
+def fetch_active_rentals_for_monitor(
+    mysql_cfg: dict,
+    user_id: int,
+    workspace_id: int | None,
+) -> tuple[list[dict], bool]:
+    rows, has_assigned_at, _ = _fetch_rentals_for_monitor(mysql_cfg, user_id, workspace_id)
+    return rows, has_assigned_at
 
 
 def release_account_in_db(
@@ -143,8 +151,7 @@ def release_account_in_db(
     workspace_id: int | None = None,
 ) -> bool:
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor(dictionary=True)
         has_frozen_at = column_exists(cursor, "accounts", "rental_frozen_at")
         updates = ["owner = NULL", "rental_start = NULL", "rental_frozen = 0"]
@@ -162,6 +169,7 @@ def release_account_in_db(
             tuple(params),
         )
         conn.commit()
+        forget_owner_accounts(user_id)
         if cursor.rowcount > 0:
             return True
         # MySQL returns 0 affected rows when values are already set (e.g. owner already NULL).
@@ -173,8 +181,6 @@ def release_account_in_db(
         row = cursor.fetchone() or {}
         owner = row.get("owner") if isinstance(row, dict) else None
         return owner is None or str(owner).strip() == ""
-    finally:
-        conn.close()
 
 
 def _touch_rental_assigned_at(
@@ -185,8 +191,7 @@ def _touch_rental_assigned_at(
     owner: str,
 ) -> None:
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not column_exists(cursor, "accounts", "rental_assigned_at"):
             return
@@ -200,8 +205,6 @@ def _touch_rental_assigned_at(
             (int(account_id), int(user_id), normalize_owner_name(owner)),
         )
         conn.commit()
-    finally:
-        conn.close()
 
 
 def update_rental_freeze_state(
@@ -215,8 +218,7 @@ def update_rental_freeze_state(
     rental_start: datetime | None = None,
 ) -> bool:
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         has_frozen_at = column_exists(cursor, "accounts", "rental_frozen_at")
         updates = ["rental_frozen = %s"]
@@ -237,9 +239,8 @@ def update_rental_freeze_state(
             tuple(params),
         )
         conn.commit()
+        forget_owner_accounts(user_id)
         return cursor.rowcount > 0
-    finally:
-        conn.close()
 
 
 def _clear_expire_delay_state(state: RentalMonitorState, account_id: int) -> None:
@@ -259,8 +260,7 @@ def _set_owner_chat_id(
     if chat_id <= 0:
         return
     cfg = resolve_workspace_mysql_cfg(mysql_cfg, workspace_id)
-    conn = mysql.connector.connect(**cfg)
-    try:
+    with mysql_connection(cfg) as conn:
         cursor = conn.cursor()
         if not column_exists(cursor, "accounts", "owner_chat_id"):
             return
@@ -269,8 +269,6 @@ def _set_owner_chat_id(
             (int(chat_id), int(account_id), int(user_id)),
         )
         conn.commit()
-    finally:
-        conn.close()
 
 
 def _send_owner_message(
@@ -509,242 +507,381 @@ def _should_delay_expire(
     return True
 
 
-def process_rental_monitor(
-    logger: logging.Logger,
-    account: Account,
-    site_username: str | None,
-    site_user_id: int | None,
-    workspace_id: int | None,
-    state: RentalMonitorState,
-    mysql_cfg: dict | None = None,
-) -> None:
-    interval = env_int("FUNPAY_RENTAL_CHECK_SECONDS", 30)
-    now_ts = time.time()
-    if now_ts - state.last_check_ts < interval:
-        return
-    state.last_check_ts = now_ts
+def _forget_rental(state: RentalMonitorState, account_id: int) -> None:
+    state.rentals.pop(account_id, None)
+    state.deadline_versions.pop(account_id, None)
+    state.freeze_cache.pop(account_id, None)
+    state.expire_soon_notified.pop(account_id, None)
+    _clear_expire_delay_state(state, account_id)
 
-    if mysql_cfg is None:
-        try:
-            mysql_cfg = get_mysql_config()
-        except RuntimeError:
-            return
 
-    user_id = site_user_id
-    if user_id is None and site_username:
-        try:
-            user_id = get_user_id_by_username(mysql_cfg, site_username)
-        except mysql.connector.Error as exc:
-            logger.warning("Failed to resolve user id for %s: %s", site_username, exc)
-            return
-    if user_id is None:
+def _rental_deadline(row: dict, state: RentalMonitorState, now: datetime) -> datetime | None:
+    # Earliest moment the monitor has to look at this rental again; None while nothing
+    # can happen until the row itself changes.
+    if not row.get("owner"):
+        return None
+    account_id = int(row.get("id"))
+    code_grace_minutes = env_int("RENTAL_CODE_GRACE_MINUTES", 10)
+    if (
+        code_grace_minutes > 0
+        and row.get("rental_start") is None
+        and not row.get("rental_frozen")
+        and not row.get("account_frozen")
+    ):
+        assigned_at = _parse_datetime(row.get("rental_assigned_at"))
+        if assigned_at is None:
+            return now if state.has_assigned_at else None
+        return assigned_at + timedelta(minutes=code_grace_minutes)
+    if row.get("rental_frozen"):
+        frozen_at = _parse_datetime(row.get("rental_frozen_at"))
+        return frozen_at + timedelta(hours=1) if frozen_at else None
+    started = _parse_datetime(row.get("rental_start"))
+    total_minutes = row.get("rental_duration_minutes")
+    if total_minutes is None:
+        total_minutes = int(row.get("rental_duration") or 0) * 60
+    try:
+        total_minutes_int = int(total_minutes or 0)
+    except Exception:
+        total_minutes_int = 0
+    if not started or total_minutes_int <= 0:
+        return None
+    expiry_time = started + timedelta(minutes=total_minutes_int)
+    if now >= expiry_time:
+        return state.expire_delay_next_check.get(account_id) or now
+    remind_minutes = env_int("RENTAL_EXPIRE_REMIND_MINUTES", 10)
+    if remind_minutes > 0 and state.expire_soon_notified.get(account_id) != int(expiry_time.timestamp()):
+        return max(now, expiry_time - timedelta(minutes=remind_minutes))
+    return expiry_time
+
+
+def _schedule_rental(
+    state: RentalMonitorState,
+    account_id: int,
+    now: datetime,
+    retry_seconds: int,
+    processed: bool,
+) -> None:
+    row = state.rentals.get(account_id)
+    deadline = _rental_deadline(row, state, now) if row else None
+    if deadline is None:
+        state.deadline_versions.pop(account_id, None)
         return
+    if processed and deadline <= now:
+        # Still due right after a pass (failed send, no-op write): retry at the old cadence.
+        deadline = now + timedelta(seconds=retry_seconds)
+    state.deadline_seq += 1
+    state.deadline_versions[account_id] = state.deadline_seq
+    heapq.heappush(state.deadlines, (deadline, account_id, state.deadline_seq))
+    if len(state.deadlines) > 2 * len(state.deadline_versions) + 64:
+        state.deadlines = [
+            entry for entry in state.deadlines if state.deadline_versions.get(entry[1]) == entry[2]
+        ]
+        heapq.heapify(state.deadlines)
+
+
+def _sync_rental_index(
+    mysql_cfg: dict,
+    user_id: int,
+    workspace_id: int | None,
+    state: RentalMonitorState,
+    now_ts: float,
+) -> set[int]:
+    full_interval = max(60, env_int("FUNPAY_RENTAL_FULL_SYNC_SECONDS", 600))
+    full = state.synced_until is None or now_ts - state.full_sync_ts >= full_interval
+    changed_since = None
+    if not full:
+        changed_since = state.synced_until - timedelta(seconds=RENTAL_SYNC_OVERLAP_SECONDS)
+    rows, has_assigned_at, synced_until = _fetch_rentals_for_monitor(
+        mysql_cfg,
+        user_id,
+        workspace_id,
+        changed_since=changed_since,
+    )
+    state.has_assigned_at = has_assigned_at
+    state.synced_until = synced_until
+    fresh: dict[int, dict] = {}
+    for row in rows:
+        fresh.setdefault(int(row.get("id")), row)
+    if full:
+        state.full_sync_ts = now_ts
+        for account_id in [account_id for account_id in state.rentals if account_id not in fresh]:
+            _forget_rental(state, account_id)
+    changed: set[int] = set()
+    for account_id, row in fresh.items():
+        if not row.get("owner"):
+            _forget_rental(state, account_id)
+            continue
+        state.rentals[account_id] = row
+        changed.add(account_id)
+    return changed
 
-    rentals, has_assigned_at = fetch_active_rentals_for_monitor(mysql_cfg, int(user_id), workspace_id)
-    now = datetime.utcnow()
-    active_ids = {int(row.get("id")) for row in rentals}
-    if state.freeze_cache:
-        state.freeze_cache = {k: v for k, v in state.freeze_cache.items() if k in active_ids}
-    if state.expire_delay_since:
-        state.expire_delay_since = {k: v for k, v in state.expire_delay_since.items() if k in active_ids}
-    if state.expire_delay_next_check:
-        state.expire_delay_next_check = {
-            k: v for k, v in state.expire_delay_next_check.items() if k in active_ids
-        }
-    if state.expire_delay_notified:
-        state.expire_delay_notified = {k for k in state.expire_delay_notified if k in active_ids}
-    if state.expire_soon_notified:
-        state.expire_soon_notified = {
-            k: v for k, v in state.expire_soon_notified.items() if k in active_ids
-        }
 
+def _check_rental_hold(
+    logger: logging.Logger,
+    account: Account,
+    row: dict,
+    mysql_cfg: dict,
+    user_id: int,
+    workspace_id: int | None,
+    state: RentalMonitorState,
+    now: datetime,
+) -> None:
     code_grace_minutes = env_int("RENTAL_CODE_GRACE_MINUTES", 10)
-    for row in rentals:
-        if (
-            code_grace_minutes > 0
-            and row.get("rental_start") is None
-            and not row.get("rental_frozen")
-            and not row.get("account_frozen")
-        ):
-            owner = row.get("owner")
-            if not owner:
-                continue
-            assigned_at = _parse_datetime(row.get("rental_assigned_at"))
-            if assigned_at is None:
-                if has_assigned_at:
-                    _touch_rental_assigned_at(
-                        mysql_cfg,
-                        account_id=int(row.get("id") or 0),
-                        user_id=int(user_id),
-                        workspace_id=workspace_id,
-                        owner=owner,
-                    )
-                continue
-            if now >= assigned_at + timedelta(minutes=code_grace_minutes):
-                started_count = start_rental_for_owner(
+    if (
+        code_grace_minutes > 0
+        and row.get("rental_start") is None
+        and not row.get("rental_frozen")
+        and not row.get("account_frozen")
+    ):
+        owner = row.get("owner")
+        if not owner:
+            return
+        assigned_at = _parse_datetime(row.get("rental_assigned_at"))
+        if assigned_at is None:
+            if state.has_assigned_at:
+                _touch_rental_assigned_at(
                     mysql_cfg,
-                    int(user_id),
-                    owner,
-                    workspace_id,
-                    account_ids=[int(row.get("id") or 0)],
+                    account_id=int(row.get("id") or 0),
+                    user_id=int(user_id),
+                    workspace_id=workspace_id,
+                    owner=owner,
                 )
-                if started_count:
-                    send_message_by_owner(
-                        logger,
-                        account,
-                        owner,
-                        RENTAL_CODE_AUTO_START_MESSAGE,
-                        mysql_cfg=mysql_cfg,
-                        user_id=int(user_id),
-                        workspace_id=workspace_id,
-                    )
-                continue
-        account_id = int(row.get("id"))
-        owner = row.get("owner")
-        frozen = bool(row.get("rental_frozen"))
-        frozen_at = _parse_datetime(row.get("rental_frozen_at"))
-        if frozen and frozen_at and now >= frozen_at + timedelta(hours=1):
-            new_start = _calculate_resume_start(row.get("rental_start"), frozen_at)
-            unfrozen = update_rental_freeze_state(
+            return
+        if now >= assigned_at + timedelta(minutes=code_grace_minutes):
+            started_count = start_rental_for_owner(
                 mysql_cfg,
-                account_id=account_id,
-                user_id=int(user_id),
-                owner=owner,
-                workspace_id=workspace_id,
-                frozen=False,
-                rental_start=new_start,
+                int(user_id),
+                owner,
+                workspace_id,
+                account_ids=[int(row.get("id") or 0)],
             )
-            if unfrozen:
-                frozen = False
-                row["rental_frozen"] = 0
+            if started_count:
                 send_message_by_owner(
                     logger,
                     account,
                     owner,
-                    RENTAL_PAUSE_EXPIRED_MESSAGE,
+                    RENTAL_CODE_AUTO_START_MESSAGE,
                     mysql_cfg=mysql_cfg,
                     user_id=int(user_id),
                     workspace_id=workspace_id,
                 )
-                state.freeze_cache[account_id] = False
-                continue
-        prev = state.freeze_cache.get(account_id)
-        if prev is None:
-            state.freeze_cache[account_id] = frozen
-        elif prev != frozen:
-            state.freeze_cache[account_id] = frozen
-            message = RENTAL_FROZEN_MESSAGE if frozen else RENTAL_UNFROZEN_MESSAGE
+            return
+    account_id = int(row.get("id"))
+    owner = row.get("owner")
+    frozen = bool(row.get("rental_frozen"))
+    frozen_at = _parse_datetime(row.get("rental_frozen_at"))
+    if frozen and frozen_at and now >= frozen_at + timedelta(hours=1):
+        new_start = _calculate_resume_start(row.get("rental_start"), frozen_at)
+        unfrozen = update_rental_freeze_state(
+            mysql_cfg,
+            account_id=account_id,
+            user_id=int(user_id),
+            owner=owner,
+            workspace_id=workspace_id,
+            frozen=False,
+            rental_start=new_start,
+        )
+        if unfrozen:
+            frozen = False
+            row["rental_frozen"] = 0
             send_message_by_owner(
                 logger,
                 account,
                 owner,
-                message,
+                RENTAL_PAUSE_EXPIRED_MESSAGE,
                 mysql_cfg=mysql_cfg,
                 user_id=int(user_id),
                 workspace_id=workspace_id,
             )
+            state.freeze_cache[account_id] = False
+            return
+    prev = state.freeze_cache.get(account_id)
+    if prev is None:
+        state.freeze_cache[account_id] = frozen
+    elif prev != frozen:
+        state.freeze_cache[account_id] = frozen
+        message = RENTAL_FROZEN_MESSAGE if frozen else RENTAL_UNFROZEN_MESSAGE
+        send_message_by_owner(
+            logger,
+            account,
+            owner,
+            message,
+            mysql_cfg=mysql_cfg,
+            user_id=int(user_id),
+            workspace_id=workspace_id,
+        )
 
-    for row in rentals:
-        account_id = int(row.get("id"))
-        owner = row.get("owner")
-        if not owner:
-            _clear_expire_delay_state(state, account_id)
-            state.expire_soon_notified.pop(account_id, None)
-            continue
-        if row.get("rental_frozen"):
-            state.expire_soon_notified.pop(account_id, None)
-            continue
-        started = _parse_datetime(row.get("rental_start"))
-        total_minutes = row.get("rental_duration_minutes")
-        if total_minutes is None:
-            total_minutes = int(row.get("rental_duration") or 0) * 60
-        try:
-            total_minutes_int = int(total_minutes or 0)
-        except Exception:
-            total_minutes_int = 0
-        if not started or total_minutes_int <= 0:
-            _clear_expire_delay_state(state, account_id)
-            state.expire_soon_notified.pop(account_id, None)
-            continue
-        expiry_time = started + timedelta(minutes=total_minutes_int)
-        if now < expiry_time:
-            _clear_expire_delay_state(state, account_id)
-            remind_minutes = env_int("RENTAL_EXPIRE_REMIND_MINUTES", 10)
-            if remind_minutes > 0:
-                seconds_left = int((expiry_time - now).total_seconds())
-                expiry_ts = int(expiry_time.timestamp())
-                if 0 < seconds_left <= remind_minutes * 60:
-                    if state.expire_soon_notified.get(account_id) != expiry_ts:
-                        message = build_expire_soon_message(row, seconds_left)
-                        sent = _send_owner_message(
-                            logger,
-                            account,
-                            account_row=row,
-                            owner=owner,
-                            text=message,
-                            mysql_cfg=mysql_cfg,
-                            user_id=int(user_id),
-                            workspace_id=workspace_id,
-                        )
-                        if sent:
-                            state.expire_soon_notified[account_id] = expiry_ts
-                else:
-                    state.expire_soon_notified.pop(account_id, None)
-            continue
 
-        if _should_delay_expire(logger, account, owner, row, mysql_cfg, int(user_id), workspace_id, state, now):
-            continue
+def _check_rental_expiry(
+    logger: logging.Logger,
+    account: Account,
+    row: dict,
+    mysql_cfg: dict,
+    user_id: int,
+    workspace_id: int | None,
+    state: RentalMonitorState,
+    now: datetime,
+) -> bool:
+    account_id = int(row.get("id"))
+    owner = row.get("owner")
+    if not owner:
+        _clear_expire_delay_state(state, account_id)
+        state.expire_soon_notified.pop(account_id, None)
+        return False
+    if row.get("rental_frozen"):
+        state.expire_soon_notified.pop(account_id, None)
+        return False
+    started = _parse_datetime(row.get("rental_start"))
+    total_minutes = row.get("rental_duration_minutes")
+    if total_minutes is None:
+        total_minutes = int(row.get("rental_duration") or 0) * 60
+    try:
+        total_minutes_int = int(total_minutes or 0)
+    except Exception:
+        total_minutes_int = 0
+    if not started or total_minutes_int <= 0:
+        _clear_expire_delay_state(state, account_id)
+        state.expire_soon_notified.pop(account_id, None)
+        return False
+    expiry_time = started + timedelta(minutes=total_minutes_int)
+    if now < expiry_time:
+        _clear_expire_delay_state(state, account_id)
+        remind_minutes = env_int("RENTAL_EXPIRE_REMIND_MINUTES", 10)
+        if remind_minutes > 0:
+            seconds_left = int((expiry_time - now).total_seconds())
+            expiry_ts = int(expiry_time.timestamp())
+            if 0 < seconds_left <= remind_minutes * 60:
+                if state.expire_soon_notified.get(account_id) != expiry_ts:
+                    message = build_expire_soon_message(row, seconds_left)
+                    sent = _send_owner_message(
+                        logger,
+                        account,
+                        account_row=row,
+                        owner=owner,
+                        text=message,
+                        mysql_cfg=mysql_cfg,
+                        user_id=int(user_id),
+                        workspace_id=workspace_id,
+                    )
+                    if sent:
+                        state.expire_soon_notified[account_id] = expiry_ts
+            else:
+                state.expire_soon_notified.pop(account_id, None)
+        return False
 
-        if env_bool("AUTO_STEAM_DEAUTHORIZE_ON_EXPIRE", True):
-            deauth_ok = deauthorize_account_sessions(logger, row)
-            log_notification_event(
-                mysql_cfg,
-                event_type="deauthorize",
-                status="ok" if deauth_ok else "failed",
-                title="Steam deauthorize on expiry",
-                message="Auto deauthorize triggered by rental expiration.",
-                owner=owner,
-                account_name=row.get("account_name") or row.get("login"),
-                account_id=account_id,
-                user_id=int(user_id),
-                workspace_id=workspace_id,
-            )
-        released = release_account_in_db(mysql_cfg, account_id, int(user_id), workspace_id)
+    if _should_delay_expire(logger, account, owner, row, mysql_cfg, int(user_id), workspace_id, state, now):
+        return False
+
+    if env_bool("AUTO_STEAM_DEAUTHORIZE_ON_EXPIRE", True):
+        deauth_ok = deauthorize_account_sessions(logger, row)
         log_notification_event(
             mysql_cfg,
-            event_type="rental_expired",
-            status="ok" if released else "failed",
-            title="Rental expired",
-            message="Rental expired and account was released." if released else "Rental expired but release failed.",
+            event_type="deauthorize",
+            status="ok" if deauth_ok else "failed",
+            title="Steam deauthorize on expiry",
+            message="Auto deauthorize triggered by rental expiration.",
             owner=owner,
             account_name=row.get("account_name") or row.get("login"),
             account_id=account_id,
             user_id=int(user_id),
             workspace_id=workspace_id,
         )
+    released = release_account_in_db(mysql_cfg, account_id, int(user_id), workspace_id)
+    log_notification_event(
+        mysql_cfg,
+        event_type="rental_expired",
+        status="ok" if released else "failed",
+        title="Rental expired",
+        message="Rental expired and account was released." if released else "Rental expired but release failed.",
+        owner=owner,
+        account_name=row.get("account_name") or row.get("login"),
+        account_id=account_id,
+        user_id=int(user_id),
+        workspace_id=workspace_id,
+    )
 
-        sent = _send_expired_notice(
-            logger,
-            account,
-            row=row,
+    sent = _send_expired_notice(
+        logger,
+        account,
+        row=row,
+        owner=owner,
+        mysql_cfg=mysql_cfg,
+        user_id=int(user_id),
+        workspace_id=workspace_id,
+    )
+    if not sent:
+        log_notification_event(
+            mysql_cfg,
+            event_type="rental_expired_message",
+            status="failed",
+            title="Rental expired message failed",
+            message="Failed to send expiration message to buyer.",
             owner=owner,
-            mysql_cfg=mysql_cfg,
+            account_name=row.get("account_name") or row.get("login"),
+            account_id=account_id,
             user_id=int(user_id),
             workspace_id=workspace_id,
         )
-        if not sent:
-            log_notification_event(
-                mysql_cfg,
-                event_type="rental_expired_message",
-                status="failed",
-                title="Rental expired message failed",
-                message="Failed to send expiration message to buyer.",
-                owner=owner,
-                account_name=row.get("account_name") or row.get("login"),
-                account_id=account_id,
-                user_id=int(user_id),
-                workspace_id=workspace_id,
-            )
 
-        _clear_expire_delay_state(state, account_id)
+    _clear_expire_delay_state(state, account_id)
+    return released
+
 
+def process_rental_monitor(
+    logger: logging.Logger,
+    account: Account,
+    site_username: str | None,
+    site_user_id: int | None,
+    workspace_id: int | None,
+    state: RentalMonitorState,
+    mysql_cfg: dict | None = None,
+) -> float:
+    # Rentals live in an in-memory deadline heap (expiry, reminder, code grace, pause end).
+    # MySQL is only asked for rows changed since the last sync (accounts.updated_at) plus
+    # a periodic full resync; the return value is the delay until the next deadline.
+    interval = max(5, env_int("FUNPAY_RENTAL_CHECK_SECONDS", 30))
+    if mysql_cfg is None:
+        try:
+            mysql_cfg = get_mysql_config()
+        except RuntimeError:
+            return float(interval)
+
+    user_id = site_user_id
+    if user_id is None and site_username:
+        try:
+            user_id = get_user_id_by_username(mysql_cfg, site_username)
+        except mysql.connector.Error as exc:
+            logger.warning("Failed to resolve user id for %s: %s", site_username, exc)
+            return float(interval)
+    if user_id is None:
+        return float(interval)
+
+    now_ts = time.time()
+    due_ids: set[int] = set()
+    if now_ts >= state.next_sync_ts:
+        state.next_sync_ts = now_ts + interval
+        due_ids = _sync_rental_index(mysql_cfg, int(user_id), workspace_id, state, now_ts)
+
+    now = datetime.utcnow()
+    while state.deadlines and state.deadlines[0][0] <= now:
+        _, account_id, version = heapq.heappop(state.deadlines)
+        if state.deadline_versions.get(account_id) == version:
+            due_ids.add(account_id)
+
+    rows = [state.rentals[account_id] for account_id in sorted(due_ids) if account_id in state.rentals]
+    for row in rows:
+        _check_rental_hold(logger, account, row, mysql_cfg, int(user_id), workspace_id, state, now)
+    for row in rows:
+        account_id = int(row.get("id"))
+        if _check_rental_expiry(logger, account, row, mysql_cfg, int(user_id), workspace_id, state, now):
+            _forget_rental(state, account_id)
+    for row in rows:
+        _schedule_rental(state, int(row.get("id")), now, interval, processed=True)
+    if rows:
+        # Pick up our own writes (started, unfrozen, released) with the next delta read.
+        state.next_sync_ts = min(state.next_sync_ts, time.time() + 1)
+
+    wait = state.next_sync_ts - time.time()
+    if state.deadlines:
+        wait = min(wait, (state.deadlines[0][0] - datetime.utcnow()).total_seconds())
+    return max(1.0, wait)
@@ -2,12 +2,16 @@ from __future__ import annotations
 
 
 
+import asyncio
+
 import logging
 
 import os
 
 import re
 
+import signal
+
 import sys
 
 import threading
@@ -16,6 +20,8 @@ import time
 
 from datetime import datetime
 
+from typing import Callable
+
 
 
 import mysql.connector
@@ -32,24 +38,17 @@ from bs4 import BeautifulSoup
 
 
 
-from .chat_time_utils import _extract_datetime_from_html
+from .chat_time_utils import _extract_message_datetime
 
+from .ai_pipeline_utils import AiReplyToken, ai_chat_key, cancel_workspace_ai_replies, get_ai_pipeline
 from .ai_utils import classify_intent, generate_ai_reply
 from .bot_customization_utils import (
-    build_ai_context_additions,
-    build_allowed_command_list,
-    build_command_alias_map,
-    build_command_label_map,
-    build_commands_text,
-    build_style_prompt,
-    get_ai_overrides,
+    compile_bot_settings,
     get_review_bonus_minutes,
-    load_bot_settings,
-    normalize_settings,
-    render_template,
+    load_compiled_bot_settings,
     replace_command_tokens,
-    resolve_response,
 )
+from .cache_utils import TTLCache, prune_caches
 
 from .chat_utils import (
 
@@ -57,12 +56,12 @@ from .chat_utils import (
 
     insert_chat_message,
 
-    is_first_time_chat,
-
-    is_ai_paused,
+    process_chat_outbox,
 
     set_ai_pause,
 
+    account_lock,
+
     send_chat_message,
 
     send_message_by_owner,
@@ -107,7 +106,7 @@ from .env_utils import env_bool, env_int
 
 from .knowledge_utils import build_knowledge_context
 
-from .memory_utils import fetch_memory_context, store_memory
+from .memory_utils import fetch_memory_context, shutdown_memory, store_memory
 
 from .logging_utils import configure_logging
 
@@ -131,31 +130,18 @@ from .order_utils import (
 
 )
 
-_AI_PAUSE_CACHE: dict[tuple[int | None, int | None, int], float] = {}
-_AI_LAST_REPLY: dict[tuple[int | None, int | None, int], tuple[float, str]] = {}
 _AI_CACHE_MAX_ENTRIES = max(100, env_int("AI_CACHE_MAX_ENTRIES", 5000))
+# Chats the seller wrote in recently (entry TTL = snooze) and the last AI reply per chat.
+_AI_PAUSE_CACHE: TTLCache[tuple[int | None, int | None, int], bool] = TTLCache(
+    "ai_pause", max_entries=_AI_CACHE_MAX_ENTRIES
+)
+_AI_LAST_REPLY: TTLCache[tuple[int | None, int | None, int], str] = TTLCache(
+    "ai_last_reply", max_entries=_AI_CACHE_MAX_ENTRIES, ttl_seconds=600
+)
 
 
-def _prune_ai_caches(now: float | None = None) -> None:
-    ts = now or time.time()
-
-    expired_pause = [key for key, until in _AI_PAUSE_CACHE.items() if until <= ts]
-    for key in expired_pause:
-        _AI_PAUSE_CACHE.pop(key, None)
-
-    expired_reply = [key for key, value in _AI_LAST_REPLY.items() if ts - value[0] > 600]
-    for key in expired_reply:
-        _AI_LAST_REPLY.pop(key, None)
-
-    if len(_AI_PAUSE_CACHE) > _AI_CACHE_MAX_ENTRIES:
-        overflow = len(_AI_PAUSE_CACHE) - _AI_CACHE_MAX_ENTRIES
-        for key, _ in sorted(_AI_PAUSE_CACHE.items(), key=lambda item: item[1])[:overflow]:
-            _AI_PAUSE_CACHE.pop(key, None)
-
-    if len(_AI_LAST_REPLY) > _AI_CACHE_MAX_ENTRIES:
-        overflow = len(_AI_LAST_REPLY) - _AI_CACHE_MAX_ENTRIES
-        for key, _ in sorted(_AI_LAST_REPLY.items(), key=lambda item: item[1][0])[:overflow]:
-            _AI_LAST_REPLY.pop(key, None)
+def _prune_ai_caches() -> None:
+    prune_caches()
 
 
 from .presence_utils import clear_lot_cache_on_start
@@ -166,7 +152,31 @@ from .raise_utils import auto_raise_init_state, auto_raise_step, sync_raise_cate
 
 from .rental_utils import process_rental_monitor, release_account_in_db
 
-from .db_utils import get_mysql_config
+from .scheduler_utils import WorkspaceScheduler, WorkspaceStep
+
+from .lease_utils import WorkspaceLeaseManager, default_node_id
+
+from .outbox_utils import OutboxWakeups, get_outbox_wakeups
+
+from .intent_utils import local_intent, match_intents
+
+from .chat_context_utils import (
+
+    cached_owner_accounts,
+
+    forget_workspace_contexts,
+
+    get_chat_context,
+
+    is_context_ai_paused,
+
+    remember_owner_accounts,
+
+)
+
+from .supervisor_utils import ShardSupervisor, exit_on_signal, resolve_worker_processes, workspace_shard
+
+from .db_utils import get_mysql_config, load_schema_snapshot
 
 from .lot_utils import (
 
@@ -256,6 +266,20 @@ def _maybe_refresh_user_id(
         return None, now
 
 
+def _fetch_chat_owner_accounts(
+    mysql_cfg: dict,
+    user_id: int,
+    workspace_id: int | None,
+    chat_id: int,
+    owner: str,
+) -> list[dict]:
+    accounts = cached_owner_accounts(user_id, workspace_id, chat_id, owner)
+    if accounts is None:
+        accounts = fetch_owner_accounts(mysql_cfg, user_id, owner, workspace_id)
+        remember_owner_accounts(user_id, workspace_id, chat_id, owner, accounts)
+    return accounts
+
+
 def _normalize_for_ai_match(text: str | None) -> str:
     if not text:
         return ""
@@ -263,22 +287,6 @@ def _normalize_for_ai_match(text: str | None) -> str:
     return _WS_RE.sub(" ", cleaned.strip())
 
 
-def _is_greeting(text: str) -> bool:
-
-    if not text:
-
-        return False
-
-    lowered = text.lower()
-
-    keywords = ("привет", "здрав", "hello", "hi", "добрый", "доброе")
-
-    return any(word in lowered for word in keywords)
-
-
-
-
-
 def _extract_lot_url(text: str) -> str | None:
 
     if not text:
@@ -606,36 +614,6 @@ def _handle_when_free_request(
 
 
 
-def _wants_when_free(text: str) -> bool:
-
-    if not text:
-
-        return False
-
-    lowered = text.lower()
-
-    keywords = (
-
-        "когда освобод",
-
-        "когда будет свобод",
-
-        "когда свобод",
-
-        "when free",
-
-        "when available",
-
-        "when it will be free",
-
-    )
-
-    return any(word in lowered for word in keywords)
-
-
-
-
-
 def _format_eta_from_row(row: dict) -> str | None:
 
     try:
@@ -768,888 +746,347 @@ def _respond_busy_lots(
 
 
 
-def _wants_low_priority_replace(text: str) -> bool:
+def _extract_account_id_hint(text: str) -> str:
 
     if not text:
 
-        return False
-
-    if "лпзамена" in text:
-
-        return True
-
-    if ("замен" in text or "replace" in text or "replacement" in text) and (
-
-        "аккаунт" in text or "account" in text or "лот" in text or "mmr" in text or "лп" in text
+        return ""
 
-    ):
+    match = re.search(r"(?:id|ID|айди|#)\s*(\d{2,})", text)
 
-        return True
+    if match:
 
-    return False
+        return match.group(1)
 
+    return ""
 
 
 
 
 
+def _build_rental_summary(accounts: list[dict], limit: int) -> list[str]:
 
+    if not accounts or limit <= 0:
 
+        return []
 
+    now = datetime.utcnow()
 
+    lines: list[str] = []
 
+    for acc in accounts[:limit]:
 
+        account_id = acc.get("id")
 
-def _wants_refund(text: str) -> bool:
+        name = acc.get("display_name") or acc.get("account_name") or f"ID {account_id}"
 
-    if not text:
+        expiry_str, remaining_str = get_remaining_label(acc, now)
 
-        return False
+        if expiry_str:
 
-    lowered = text.lower()
+            remaining = f"{remaining_str} (expires {expiry_str} MSK)"
 
-    keywords = (
+        else:
 
-        "\u0432\u043e\u0437\u0432\u0440\u0430\u0442",
+            remaining = "awaiting !код"
 
-        "\u0432\u0435\u0440\u043d\u0438",
+        status = "frozen" if acc.get("rental_frozen") else "active"
 
-        "\u0432\u0435\u0440\u043d\u0438\u0442\u0435",
+        label = f"ID {account_id}" if account_id is not None else "ID -"
 
-        "\u0432\u0435\u0440\u043d\u0443\u0442\u044c",
+        lines.append(f"{label}: {name} | {status} | remaining {remaining}")
 
-        "\u0434\u0435\u043d\u044c\u0433\u0438",
+    return lines
 
-        "\u0441\u0440\u0435\u0434\u0441\u0442\u0432\u0430",
 
-        "\u0434\u0435\u043d\u044c\u0433\u0438 \u043e\u0431\u0440\u0430\u0442\u043d\u043e",
 
-        "moneyback",
 
-        "refund",
 
-    )
+def _build_ai_context(
 
-    return any(key in lowered for key in keywords)
+    user_text: str,
 
+    mysql_cfg: dict,
 
+    user_id: int,
 
+    workspace_id: int | None,
 
+    chat_id: int,
 
-def _wants_account_info(text: str) -> bool:
+    sender_username: str,
 
-    if not text:
+) -> str | None:
 
-        return False
+    intents = match_intents(user_text)
 
-    keywords = (
+    is_small_talk = intents.small_talk
 
-        "данные",
+    include_support_context = intents.support_context or is_small_talk
 
-        "логин",
+    history_limit = env_int("AI_CONTEXT_MESSAGES", 6)
 
-        "парол",
+    summary_limit = env_int("AI_RENTAL_SUMMARY_LIMIT", 3)
 
-        "акк",
+    history_lines: list[str] = []
 
-        "аккаунт",
+    rental_lines: list[str] = []
 
-        "мой",
+    knowledge_text = ""
 
-        "мои",
+    memory_text = ""
 
-        "скок",
+    if include_support_context:
 
-        "сколько",
+        try:
 
-        "остал",
+            history_lines = build_recent_chat_context(
 
-        "времени",
+                mysql_cfg,
 
-        "срок",
+                int(user_id),
 
-        "доступ",
+                int(workspace_id) if workspace_id is not None else None,
 
-        "аренд",
+                int(chat_id),
 
-        "аренда",
+                limit=history_limit,
 
-        "аренды",
+                include_bot=False,
 
-        "rental",
+            )
 
-        "rent",
+        except Exception:
 
-        "текущ",
+            history_lines = []
 
-        "активн",
+    if include_support_context and not is_small_talk:
 
-    )
+        try:
 
-    return any(key in text for key in keywords)
+            accounts = _fetch_chat_owner_accounts(mysql_cfg, int(user_id), workspace_id, int(chat_id), sender_username)
 
+            rental_lines = _build_rental_summary(accounts, summary_limit)
 
+        except Exception:
 
+            rental_lines = []
 
+    if include_support_context:
 
+        try:
 
+            memory_text = fetch_memory_context(
 
-def _wants_command_list(text: str) -> bool:
+                mysql_cfg,
 
-    if not text:
+                user_id=int(user_id),
 
-        return False
+                workspace_id=workspace_id,
 
-    hints = ("команд", "commands", "help", "помощ", "что умеешь", "что можешь", "список команд")
+                chat_id=int(chat_id),
 
-    return any(word in text for word in hints)
+                query=user_text,
 
+            ) or ""
 
+        except Exception:
 
+            memory_text = ""
 
+    if include_support_context and not is_small_talk:
 
-def _wants_stock_list(text: str) -> bool:
+        try:
 
-    if not text:
+            knowledge_text = build_knowledge_context(
 
-        return False
+                user_text,
 
-    subjects = (
+                max_chars=env_int("AI_KNOWLEDGE_MAX_CHARS", 1000),
 
-        "\u0430\u043a\u043a",
+                max_items=env_int("AI_KNOWLEDGE_MAX_ITEMS", 2),
 
-        "\u0430\u043a\u043a\u0430\u0443\u043d\u0442",
+            ) or ""
 
-        "\u0430\u043a\u043a\u0430\u0443\u043d\u0442\u044b",
+        except Exception:
 
-        "\u043b\u043e\u0442",
+            knowledge_text = ""
 
-        "\u043b\u043e\u0442\u044b",
+    sections: list[str] = []
 
-        "\u0441\u0442\u043e\u043a",
+    if memory_text:
 
-        "stock",
+        memory_label = "Long-term memory (reference only; do not mention explicitly):"
 
-        "account",
+        if is_small_talk:
 
-        "acc",
+            memory_label = "Long-term memory (use only for gentle follow-up if helpful):"
 
-    )
+        sections.append(memory_label)
 
-    hints = (
+        sections.append(memory_text)
 
-        "\u0441\u0432\u043e\u0431\u043e\u0434",
+    if knowledge_text:
 
-        "\u043d\u0430\u043b\u0438\u0447",
+        sections.append("Knowledge base (reference only; do not mention explicitly):")
 
-        "\u0435\u0441\u0442\u044c",
+        sections.append(knowledge_text)
 
-        "\u043f\u043e\u043a\u0430\u0437",
+    if history_lines:
 
-        "\u0441\u043f\u0438\u0441\u043e\u043a",
+        history_label = "Recent buyer messages (reference only; do not mention explicitly):"
 
-        "free",
+        if is_small_talk:
 
-        "available",
+            history_label = "Recent buyer messages (can be used for gentle follow-up if helpful):"
 
-        "list",
+        sections.append(history_label)
 
-        "show",
+        sections.extend(history_lines)
 
-    )
+    if rental_lines:
 
-    if "\u043a\u0430\u043a\u0438\u0435" in text and any(word in text for word in subjects):
+        sections.append("Current rentals summary (reference only; do not mention explicitly):")
 
-        return True
+        sections.extend(rental_lines)
 
-    if "\u0441\u0432\u043e\u0431\u043e\u0434" in text and (
+    return "\n".join(str(section) for section in sections) if sections else None
 
-        "\u0447\u0442\u043e" in text or "\u0447\u0451" in text or "\u0447\u0435" in text or "\u0435\u0441\u0442\u044c" in text
 
-    ):
 
-        return True
 
-    return any(word in text for word in hints) and any(word in text for word in subjects)
 
 
 
 
 
-def _wants_busy_list(text: str) -> bool:
+def _extract_buyer_from_review_text(text: str | None) -> str | None:
 
     if not text:
 
-        return False
-
-    subjects = ("\u0430\u043a\u043a\u0430\u0443\u043d\u0442", "\u0430\u043a\u043a\u0430\u0443\u043d\u0442\u044b", "\u043b\u043e\u0442", "\u043b\u043e\u0442\u044b")
+        return None
 
-    hints = ("\u0437\u0430\u043d\u044f\u0442", "busy", "occupied", "\u0432 \u0430\u0440\u0435\u043d\u0434\u0435")
+    match = re.search(r"(?:Покупатель|The buyer)\s+([A-Za-z0-9_-]+)", text)
 
-    if "\u043a\u0430\u043a\u0438\u0435" in text and any(word in text for word in subjects) and any(word in text for word in hints):
+    if match:
 
-        return True
+        return match.group(1)
 
-    return any(word in text for word in hints) and any(word in text for word in subjects)
+    return None
 
 
 
 
 
-def _wants_pre_rent_request(text: str) -> bool:
+def _extract_buyer_from_refund_text(text: str | None) -> str | None:
 
     if not text:
 
-        return False
-
-    lowered = text.lower()
-
-    account_words = (
-
-        "\u0430\u043a\u043a",
+        return None
 
-        "\u0430\u043a\u043a\u0430\u0443\u043d\u0442",
+    match = re.search(r"(?:покупателю|buyer)\s+([A-Za-z0-9_-]+)", text, re.IGNORECASE)
 
-        "account",
+    if match:
 
-        "acc",
+        return match.group(1)
 
-    )
+    return None
 
-    need_words = (
 
-        "\u043d\u0443\u0436",
 
-        "\u043d\u0430\u0434\u043e",
+def _extract_command_tokens(text: str) -> list[str]:
 
-        "\u0445\u043e\u0447\u0443",
+    if not text:
 
-        "\u0441\u0434\u0435\u043b\u0430\u0435\u0448\u044c",
+        return []
 
-        "\u0441\u0434\u0435\u043b\u0430\u0439",
+    tokens = re.findall(r"![^\s]+", text.lower())
 
-        "\u043e\u043f\u043b\u0430\u0447",
+    cleaned: list[str] = []
 
-        "\u043e\u043f\u043b\u0430\u0442",
+    for token in tokens:
 
-        "\u043a\u0443\u043f\u043b",
+        token = token.strip(".,;:!?)]}>'\\\"")
 
-    )
+        if token == "!":
 
-    time_words = (
+            continue
 
-        "\u0447\u0430\u0441",
+        cleaned.append(token)
 
-        "\u0447\u0430\u0441\u0430",
+    return cleaned
 
-        "\u0447\u0430\u0441\u043e\u0432",
 
-        "hour",
 
-        "hours",
 
-        "h",
 
-    )
+def _contains_unknown_commands(text: str, allowed_commands: list[str] | None = None) -> bool:
 
-    if not any(word in lowered for word in account_words):
+    if not text:
 
         return False
 
-    if any(word in lowered for word in need_words):
-
-        return True
-
-    if any(word in lowered for word in time_words):
+    allowed = set(allowed_commands or COMMAND_PREFIXES)
 
-        return True
+    for token in _extract_command_tokens(text):
 
-    if re.search(r"\b\d+\s*(?:\u0430\u043a\u043a|\u0430\u043a\u043a\u0430\u0443\u043d\u0442|acc|account)\b", lowered):
+        if token not in allowed:
 
-        return True
+            return True
 
     return False
 
 
-
-
-
-def _wants_rent_flow(text: str) -> bool:
+def _resolve_command(text: str | None, alias_map: dict[str, str] | None) -> tuple[str | None, str]:
 
     if not text:
 
-        return False
+        return None, ""
 
-    keywords = (
+    cleaned = text.strip()
 
-        "\u0430\u0440\u0435\u043d\u0434",
+    if not cleaned.startswith("!"):
 
-        "\u0432\u0437\u044f\u0442\u044c \u0430\u0440\u0435\u043d\u0434",
+        return None, ""
 
-        "\u0445\u043e\u0447\u0443 \u0430\u0440\u0435\u043d\u0434",
+    parts = cleaned.split(maxsplit=1)
 
-        "rent",
+    command = parts[0].lower()
 
-        "rental",
+    args = parts[1].strip() if len(parts) > 1 else ""
 
-    )
+    if alias_map and command in alias_map:
 
-    return any(word in text for word in keywords)
+        return alias_map[command], args
 
+    if command in COMMAND_PREFIXES:
 
+        return command, args
 
+    return None, args
 
 
-def _wants_rent_confirmation(text: str) -> bool:
+def _format_review_reply_text(text_: str) -> str:
 
-    if not text:
+    max_len = 999
 
-        return False
+    text_ = text_[: max_len + 1]
 
-    lowered = text.lower()
+    if len(text_) > max_len:
 
-    triggers = (
+        ln = len(text_)
 
-        "\u0435\u0441\u043b\u0438 \u044f \u043e\u043f\u043b\u0430",
+        indexes = []
 
-        "\u043f\u043e\u0441\u043b\u0435 \u043e\u043f\u043b\u0430\u0442",
+        for char in (".", "!", "\n"):
 
-        "\u043e\u043f\u043b\u0430\u0447\u0443 \u043b\u043e\u0442",
+            index1 = text_.rfind(char)
 
-        "\u043a\u0443\u043f\u043b\u044e \u043b\u043e\u0442",
+            indexes.extend([index1, text_[:index1].rfind(char)])
 
-    )
+        text_ = text_[: max(indexes, key=lambda x: (x < ln - 1, x))] + "🐦"
 
-    asks = (
-
-        "\u0432\u044b\u0434\u0430\u0434\u0438\u0442\u0435",
-
-        "\u0432\u044b\u0434\u0430\u0448\u044c",
-
-        "\u0434\u0430\u0434\u0438\u0442\u0435",
-
-        "\u0434\u0430\u0448\u044c",
-
-        "\u043f\u043e\u043b\u0443\u0447\u0443",
-
-        "\u0434\u0430\u043d\u043d\u044b\u0435",
-
-        "\u043b\u043e\u0433\u0438\u043d",
-
-        "\u043f\u0430\u0440\u043e\u043b\u044c",
-
-        "\u0434\u043e\u0441\u0442\u0443\u043f",
-
-    )
-
-    pay_words = (
-
-        "\u043e\u043f\u043b\u0430",
-
-        "\u043e\u043f\u043b\u0430\u0442",
-
-        "\u043e\u043f\u043b\u0430\u0447",
-
-        "\u043f\u043e\u043a\u0443\u043f",
-
-        "\u043a\u0443\u043f\u043b",
-
-    )
-
-    if any(word in lowered for word in triggers):
-
-        return True
-
-    return any(word in lowered for word in pay_words) and any(word in lowered for word in asks)
-
-
-
-def _extract_account_id_hint(text: str) -> str:
-
-    if not text:
-
-        return ""
-
-    match = re.search(r"(?:id|ID|айди|#)\s*(\d{2,})", text)
-
-    if match:
-
-        return match.group(1)
-
-    return ""
-
-
-
-
-
-def _build_rental_summary(accounts: list[dict], limit: int) -> list[str]:
-
-    if not accounts or limit <= 0:
-
-        return []
-
-    now = datetime.utcnow()
-
-    lines: list[str] = []
-
-    for acc in accounts[:limit]:
-
-        account_id = acc.get("id")
-
-        name = acc.get("display_name") or acc.get("account_name") or f"ID {account_id}"
-
-        expiry_str, remaining_str = get_remaining_label(acc, now)
-
-        if expiry_str:
-
-            remaining = f"{remaining_str} (expires {expiry_str} MSK)"
-
-        else:
-
-            remaining = "awaiting !код"
-
-        status = "frozen" if acc.get("rental_frozen") else "active"
-
-        label = f"ID {account_id}" if account_id is not None else "ID -"
-
-        lines.append(f"{label}: {name} | {status} | remaining {remaining}")
-
-    return lines
-
-
-
-
-
-_SUPPORT_CONTEXT_KEYWORDS = (
-
-    "аренд",
-
-    "аренда",
-
-    "акк",
-
-    "аккаунт",
-
-    "код",
-
-    "сток",
-
-    "налич",
-
-    "продл",
-
-    "пауза",
-
-    "замен",
-
-    "возврат",
-
-    "refund",
-
-    "free",
-
-    "available",
-
-    "busy",
-
-    "help",
-
-    "поддерж",
-
-    "помощ",
-
-    "команд",
-
-    "логин",
-
-    "пароль",
-
-    "steam",
-
-    "цен",
-
-    "стоим",
-
-    "price",
-
-    "payment",
-
-    "оплат",
-
-    "купить",
-
-    "rent",
-
-)
-
-_SMALL_TALK_PHRASES = (
-
-    "как дела",
-
-    "как у тебя дела",
-
-    "как у вас дела",
-
-    "как ты",
-
-    "что нового",
-
-    "че как",
-
-    "чё как",
-
-    "как жизнь",
-
-    "как сам",
-
-    "как настроение",
-
-    "как поживаешь",
-
-    "что делаешь",
-
-)
-
-_GREETINGS = (
-
-    "привет",
-
-    "здрав",
-
-    "добрый",
-
-    "hello",
-
-    "hi",
-
-    "hey",
-
-    "yo",
-
-    "хай",
-
-    "хелло",
-
-)
-
-
-def _needs_support_context(text: str) -> bool:
-
-    lowered = (text or "").strip().lower()
-
-    if not lowered:
-
-        return False
-
-    return any(keyword in lowered for keyword in _SUPPORT_CONTEXT_KEYWORDS)
-
-
-def _is_small_talk_message(text: str) -> bool:
-
-    lowered = (text or "").strip().lower()
-
-    if not lowered:
-
-        return False
-
-    if _needs_support_context(lowered):
-
-        return False
-
-    if any(phrase in lowered for phrase in _SMALL_TALK_PHRASES):
-
-        return True
-
-    if any(lowered.startswith(greeting) or f" {greeting}" in lowered for greeting in _GREETINGS):
-
-        return len(lowered) <= 30
-
-    return False
-
-
-def _build_ai_context(
-
-    user_text: str,
-
-    mysql_cfg: dict,
-
-    user_id: int,
-
-    workspace_id: int | None,
-
-    chat_id: int,
-
-    sender_username: str,
-
-) -> str | None:
-
-    is_small_talk = _is_small_talk_message(user_text)
-
-    include_support_context = _needs_support_context(user_text) or is_small_talk
-
-    history_limit = env_int("AI_CONTEXT_MESSAGES", 6)
-
-    summary_limit = env_int("AI_RENTAL_SUMMARY_LIMIT", 3)
-
-    history_lines: list[str] = []
-
-    rental_lines: list[str] = []
-
-    knowledge_text = ""
-
-    memory_text = ""
-
-    if include_support_context:
-
-        try:
-
-            history_lines = build_recent_chat_context(
-
-                mysql_cfg,
-
-                int(user_id),
-
-                int(workspace_id) if workspace_id is not None else None,
-
-                int(chat_id),
-
-                limit=history_limit,
-
-                include_bot=False,
-
-            )
-
-        except Exception:
-
-            history_lines = []
-
-    if include_support_context and not is_small_talk:
-
-        try:
-
-            accounts = fetch_owner_accounts(mysql_cfg, int(user_id), sender_username, workspace_id)
-
-            rental_lines = _build_rental_summary(accounts, summary_limit)
-
-        except Exception:
-
-            rental_lines = []
-
-    if include_support_context:
-
-        try:
-
-            memory_text = fetch_memory_context(
-
-                mysql_cfg,
-
-                user_id=int(user_id),
-
-                workspace_id=workspace_id,
-
-                chat_id=int(chat_id),
-
-                query=user_text,
-
-            ) or ""
-
-        except Exception:
-
-            memory_text = ""
-
-    if include_support_context and not is_small_talk:
-
-        try:
-
-            knowledge_text = build_knowledge_context(
-
-                user_text,
-
-                max_chars=env_int("AI_KNOWLEDGE_MAX_CHARS", 1000),
-
-                max_items=env_int("AI_KNOWLEDGE_MAX_ITEMS", 2),
-
-            ) or ""
-
-        except Exception:
-
-            knowledge_text = ""
-
-    sections: list[str] = []
-
-    if memory_text:
-
-        memory_label = "Long-term memory (reference only; do not mention explicitly):"
-
-        if is_small_talk:
-
-            memory_label = "Long-term memory (use only for gentle follow-up if helpful):"
-
-        sections.append(memory_label)
-
-        sections.append(memory_text)
-
-    if knowledge_text:
-
-        sections.append("Knowledge base (reference only; do not mention explicitly):")
-
-        sections.append(knowledge_text)
-
-    if history_lines:
-
-        history_label = "Recent buyer messages (reference only; do not mention explicitly):"
-
-        if is_small_talk:
-
-            history_label = "Recent buyer messages (can be used for gentle follow-up if helpful):"
-
-        sections.append(history_label)
-
-        sections.extend(history_lines)
-
-    if rental_lines:
-
-        sections.append("Current rentals summary (reference only; do not mention explicitly):")
-
-        sections.extend(rental_lines)
-
-    return "\n".join(str(section) for section in sections) if sections else None
-
-
-
-
-
-
-
-
-
-def _extract_buyer_from_review_text(text: str | None) -> str | None:
-
-    if not text:
-
-        return None
-
-    match = re.search(r"(?:Покупатель|The buyer)\s+([A-Za-z0-9_-]+)", text)
-
-    if match:
-
-        return match.group(1)
-
-    return None
-
-
-
-
-
-def _extract_buyer_from_refund_text(text: str | None) -> str | None:
-
-    if not text:
-
-        return None
-
-    match = re.search(r"(?:покупателю|buyer)\s+([A-Za-z0-9_-]+)", text, re.IGNORECASE)
-
-    if match:
-
-        return match.group(1)
-
-    return None
-
-
-
-def _extract_command_tokens(text: str) -> list[str]:
-
-    if not text:
-
-        return []
-
-    tokens = re.findall(r"![^\s]+", text.lower())
-
-    cleaned: list[str] = []
-
-    for token in tokens:
-
-        token = token.strip(".,;:!?)]}>'\\\"")
-
-        if token == "!":
-
-            continue
-
-        cleaned.append(token)
-
-    return cleaned
-
-
-
-
-
-def _contains_unknown_commands(text: str, allowed_commands: list[str] | None = None) -> bool:
-
-    if not text:
-
-        return False
-
-    allowed = set(allowed_commands or COMMAND_PREFIXES)
-
-    for token in _extract_command_tokens(text):
-
-        if token not in allowed:
-
-            return True
-
-    return False
-
-
-def _resolve_command(text: str | None, alias_map: dict[str, str] | None) -> tuple[str | None, str]:
-
-    if not text:
-
-        return None, ""
-
-    cleaned = text.strip()
-
-    if not cleaned.startswith("!"):
-
-        return None, ""
-
-    parts = cleaned.split(maxsplit=1)
-
-    command = parts[0].lower()
-
-    args = parts[1].strip() if len(parts) > 1 else ""
-
-    if alias_map and command in alias_map:
-
-        return alias_map[command], args
-
-    if command in COMMAND_PREFIXES:
-
-        return command, args
-
-    return None, args
-
-
-def _format_review_reply_text(text_: str) -> str:
-
-    max_len = 999
-
-    text_ = text_[: max_len + 1]
-
-    if len(text_) > max_len:
-
-        ln = len(text_)
-
-        indexes = []
-
-        for char in (".", "!", "\n"):
-
-            index1 = text_.rfind(char)
-
-            indexes.extend([index1, text_[:index1].rfind(char)])
-
-        text_ = text_[: max(indexes, key=lambda x: (x < ln - 1, x))] + "🐦"
-
-    text_ = text_.strip()
+    text_ = text_.strip()
 
     while text_.count("\n") > 9 and text_.count("\n\n") > 1:
 
@@ -2157,7 +1594,11 @@ def log_message(
 
 
 
-    if getattr(msg, "html", None):
+    if getattr(msg, "html_parsed", False):
+
+        sender_username = msg.author_link_text
+
+    elif getattr(msg, "html", None):
 
         try:
 
@@ -2203,6 +1644,8 @@ def log_message(
 
     lower_text = normalized_text.lower()
 
+    intents = match_intents(lower_text)
+
     if not sender_username or sender_username == "-":
 
         return None
@@ -2249,18 +1692,24 @@ def log_message(
 
 
 
-    bot_settings = normalize_settings(None)
+    compiled_settings = None
 
     if mysql_cfg and user_id is not None:
 
         try:
 
-            bot_settings = load_bot_settings(mysql_cfg, int(user_id), None)
+            compiled_settings = load_compiled_bot_settings(mysql_cfg, int(user_id), None)
 
         except Exception as exc:
 
             logger.warning("Failed to load bot customization: %s", exc)
 
+    if compiled_settings is None:
+
+        compiled_settings = compile_bot_settings(None)
+
+    bot_settings = compiled_settings.settings
+
 
 
     ai_enabled = bool(bot_settings.get("ai_enabled", True))
@@ -2287,10 +1736,11 @@ def log_message(
     ):
         try:
             pause_seconds = env_int("AI_SNOOZE_SECONDS", 300)
-            _AI_PAUSE_CACHE[(int(user_id), int(workspace_id) if workspace_id is not None else None, int(chat_id))] = (
-                time.time() + pause_seconds
+            _AI_PAUSE_CACHE.set(
+                (int(user_id), int(workspace_id) if workspace_id is not None else None, int(chat_id)),
+                True,
+                ttl=pause_seconds,
             )
-            _prune_ai_caches()
             set_ai_pause(
                 mysql_cfg,
                 user_id=int(user_id),
@@ -2301,24 +1751,18 @@ def log_message(
         except Exception:
             pass
     ai_paused = False
+    chat_context = None
     if mysql_cfg and user_id is not None and chat_id is not None:
         try:
-            ai_paused = is_ai_paused(
-                mysql_cfg,
-                user_id=int(user_id),
-                workspace_id=workspace_id,
-                chat_id=int(chat_id),
-            )
+            chat_context = get_chat_context(mysql_cfg, int(user_id), workspace_id, int(chat_id))
+            ai_paused = is_context_ai_paused(chat_context)
         except Exception:
+            chat_context = None
             ai_paused = False
     if not ai_paused and chat_id is not None:
         key = (int(user_id) if user_id is not None else None, int(workspace_id) if workspace_id is not None else None, int(chat_id))
-        until = _AI_PAUSE_CACHE.get(key)
-        if until:
-            if until > time.time():
-                ai_paused = True
-            else:
-                _AI_PAUSE_CACHE.pop(key, None)
+        if _AI_PAUSE_CACHE.get(key):
+            ai_paused = True
 
     ai_active = bool(ai_enabled and not ai_paused)
     bot_flag = bool(getattr(msg, "by_bot", False))
@@ -2341,12 +1785,8 @@ def log_message(
             key_variants.append((base_key[0], None, base_key[2]))
         key_variants.append((None, None, base_key[2]))
         for key in key_variants:
-            last_ai = _AI_LAST_REPLY.get(key)
-            if not last_ai:
-                continue
-            last_time, last_text = last_ai
-            if time.time() - last_time > 600:
-                _AI_LAST_REPLY.pop(key, None)
+            last_text = _AI_LAST_REPLY.get(key)
+            if not last_text:
                 continue
             if _normalize_for_ai_match(last_text) == _normalize_for_ai_match(message_text):
                 sender_type = "ai"
@@ -2373,33 +1813,13 @@ def log_message(
 
 
 
-    command_alias_map, command_display_map = build_command_alias_map(bot_settings)
-
-    command_labels = build_command_label_map(bot_settings)
-
-    commands_text = build_commands_text(bot_settings, command_display_map)
-
-    commands_help_template = resolve_response(
-
-        bot_settings,
-
-        "commands_help",
-
-        "\u041a\u043e\u043c\u0430\u043d\u0434\u044b:\n{commands}",
-
-    )
-
-    commands_help_text = render_template(
-
-        commands_help_template,
-
-        commands_text=commands_text,
+    command_alias_map = compiled_settings.alias_map
 
-        command_labels=command_labels,
+    command_labels = compiled_settings.command_labels
 
-    )
+    commands_help_text = compiled_settings.commands_help_text
 
-    allowed_commands = build_allowed_command_list(command_alias_map)
+    allowed_commands = compiled_settings.allowed_commands
 
 
 
@@ -2473,17 +1893,11 @@ def log_message(
 
             try:
 
-                first_time = is_first_time_chat(
-
-                    mysql_cfg,
-
-                    user_id=int(user_id),
-
-                    workspace_id=workspace_id,
+                if chat_context is None:
 
-                    chat_id=int(chat_id),
+                    chat_context = get_chat_context(mysql_cfg, int(user_id), workspace_id, int(chat_id))
 
-                )
+                first_time = chat_context.history_known and not chat_context.messages
 
             except Exception:
 
@@ -2497,7 +1911,7 @@ def log_message(
 
                     msg_id = int(time.time() * 1000)
 
-                sent_time = _extract_datetime_from_html(getattr(msg, "html", None)) or datetime.utcnow()
+                sent_time = _extract_message_datetime(msg) or datetime.utcnow()
 
                 insert_chat_message(
 
@@ -2614,19 +2028,9 @@ def log_message(
 
             return None
 
-        if _is_greeting(lower_text):
-
-            greeting_template = resolve_response(bot_settings, "greeting", WELCOME_MESSAGE)
-
-            greeting_text = render_template(
-
-                greeting_template,
+        if intents.greeting:
 
-                commands_text=commands_text,
-
-                command_labels=command_labels,
-
-            )
+            greeting_text = compiled_settings.response("greeting", WELCOME_MESSAGE)
 
             send_chat_message(logger, account, int(chat_id), greeting_text)
 
@@ -2660,7 +2064,7 @@ def log_message(
 
             return None
 
-        if _wants_command_list(lower_text):
+        if intents.command_list:
 
             send_chat_message(logger, account, int(chat_id), commands_help_text)
 
@@ -2668,29 +2072,17 @@ def log_message(
 
         if not ai_enabled:
 
-            if _is_greeting(lower_text):
-
-                greeting_template = resolve_response(bot_settings, "greeting", WELCOME_MESSAGE)
+            if intents.greeting:
 
-                greeting_text = render_template(
-
-                    greeting_template,
-
-                    commands_text=commands_text,
-
-                    command_labels=command_labels,
-
-                )
+                greeting_text = compiled_settings.response("greeting", WELCOME_MESSAGE)
 
                 send_chat_message(logger, account, int(chat_id), greeting_text)
 
                 return None
 
-            if _is_small_talk_message(lower_text):
-
-                small_talk_template = resolve_response(
+            if intents.small_talk:
 
-                    bot_settings,
+                small_talk_text = compiled_settings.response(
 
                     "small_talk",
 
@@ -2698,554 +2090,560 @@ def log_message(
 
                 )
 
-                small_talk_text = render_template(
-
-                    small_talk_template,
+                send_chat_message(logger, account, int(chat_id), small_talk_text)
 
-                    commands_text=commands_text,
+                return None
 
-                    command_labels=command_labels,
 
-                )
 
-                send_chat_message(logger, account, int(chat_id), small_talk_text)
+        def route_and_reply(token: AiReplyToken | None = None, burst_text: str | None = None) -> None:
 
-                return None
+            nonlocal message_text, normalized_text, lower_text, intents
 
+            if burst_text is not None and burst_text != message_text:
 
+                # Debounced burst: route and answer the buyer's messages as one text.
 
-        intent_label = None
+                message_text = burst_text
 
-        if ai_enabled and env_bool("AI_INTENT_ROUTER", True) and not message_text.strip().startswith("!"):
+                normalized_text = re.sub(r"[\u200b\u200c\u200d\u2060\ufeff]", "", message_text)
 
-            intent_context = None
+                lower_text = normalized_text.lower()
 
-            if mysql_cfg and user_id is not None and chat_id is not None:
+                intents = match_intents(lower_text)
 
-                try:
+            intent_label = None
 
-                    lines = build_recent_chat_context(
+            intent_router = ai_enabled and env_bool("AI_INTENT_ROUTER", True) and not message_text.strip().startswith("!")
 
-                        mysql_cfg,
+            if intent_router:
 
-                        int(user_id),
+                local_label, local_confidence = local_intent(intents, lower_text)
 
-                        int(workspace_id) if workspace_id is not None else None,
+                try:
 
-                        int(chat_id),
+                    local_min_conf = float(os.getenv("AI_INTENT_LOCAL_MIN_CONF", "0.8"))
 
-                        limit=4,
+                except ValueError:
 
-                        include_bot=False,
+                    local_min_conf = 0.8
 
-                    )
+                if local_label and local_confidence >= local_min_conf:
 
-                    if lines:
+                    intent_label = local_label
 
-                        intent_context = "\n".join(str(line) for line in lines[-4:])
+            if intent_router and intent_label is None:
 
-                except Exception:
+                intent_context = None
 
-                    intent_context = None
+                if mysql_cfg and user_id is not None and chat_id is not None:
 
-            intent = classify_intent(message_text, context=intent_context)
+                    try:
 
-            try:
+                        lines = build_recent_chat_context(
 
-                min_conf = float(os.getenv("AI_INTENT_MIN_CONF", "0.65"))
+                            mysql_cfg,
 
-            except ValueError:
+                            int(user_id),
 
-                min_conf = 0.65
+                            int(workspace_id) if workspace_id is not None else None,
 
-            if intent and float(intent.get("confidence") or 0) >= min_conf:
+                            int(chat_id),
 
-                intent_label = str(intent.get("intent") or "")
+                            limit=4,
 
+                            include_bot=False,
 
+                        )
 
-        if intent_label == "commands":
+                        if lines:
 
-            send_chat_message(logger, account, int(chat_id), commands_help_text)
+                            intent_context = "\n".join(str(line) for line in lines[-4:])
 
-            return None
+                    except Exception:
 
-        if intent_label == "rent_flow":
+                        intent_context = None
 
-            rent_flow_template = resolve_response(bot_settings, "rent_flow", RENT_FLOW_MESSAGE)
+                intent = classify_intent(
 
-            rent_flow_text = render_template(
+                    message_text,
 
-                rent_flow_template,
+                    context=intent_context,
 
-                commands_text=commands_text,
+                    settings_version=compiled_settings.version,
 
-                command_labels=command_labels,
+                )
 
-            )
+                if token is not None and token.cancelled:
 
-            send_chat_message(logger, account, int(chat_id), rent_flow_text)
+                    return None
 
-            return None
+                try:
 
-        if intent_label == "pre_rent":
+                    min_conf = float(os.getenv("AI_INTENT_MIN_CONF", "0.65"))
 
-            pre_rent_template = resolve_response(bot_settings, "pre_rent", RENT_PRE_REQUEST_MESSAGE)
+                except ValueError:
 
-            pre_rent_text = render_template(
+                    min_conf = 0.65
 
-                pre_rent_template,
+                if intent and float(intent.get("confidence") or 0) >= min_conf:
 
-                commands_text=commands_text,
+                    intent_label = str(intent.get("intent") or "")
 
-                command_labels=command_labels,
 
-            )
 
-            send_chat_message(logger, account, int(chat_id), pre_rent_text)
+            if intent_label == "commands":
 
-            return None
+                send_chat_message(logger, account, int(chat_id), commands_help_text)
 
-        if intent_label == "refund":
+                return None
 
-            refund_template = resolve_response(
+            if intent_label == "rent_flow":
 
-                bot_settings,
+                rent_flow_text = compiled_settings.response("rent_flow", RENT_FLOW_MESSAGE)
 
-                "refund",
+                send_chat_message(logger, account, int(chat_id), rent_flow_text)
 
-                "\u041f\u043e \u0432\u043e\u043f\u0440\u043e\u0441\u0430\u043c \u0432\u043e\u0437\u0432\u0440\u0430\u0442\u0430 \u043d\u0430\u043f\u0438\u0448\u0438\u0442\u0435 !\u0430\u0434\u043c\u0438\u043d \u2014 \u044f \u043f\u043e\u0434\u043a\u043b\u044e\u0447\u0443 \u043f\u0440\u043e\u0434\u0430\u0432\u0446\u0430, \u043e\u043d \u0440\u0430\u0437\u0431\u0435\u0440\u0451\u0442\u0441\u044f.",
+                return None
 
-            )
+            if intent_label == "pre_rent":
 
-            refund_text = render_template(
+                pre_rent_text = compiled_settings.response("pre_rent", RENT_PRE_REQUEST_MESSAGE)
 
-                refund_template,
+                send_chat_message(logger, account, int(chat_id), pre_rent_text)
 
-                commands_text=commands_text,
+                return None
 
-                command_labels=command_labels,
+            if intent_label == "refund":
 
-            )
+                refund_text = compiled_settings.response(
 
-            send_chat_message(logger, account, int(chat_id), refund_text)
+                    "refund",
 
-            return None
+                    "\u041f\u043e \u0432\u043e\u043f\u0440\u043e\u0441\u0430\u043c \u0432\u043e\u0437\u0432\u0440\u0430\u0442\u0430 \u043d\u0430\u043f\u0438\u0448\u0438\u0442\u0435 !\u0430\u0434\u043c\u0438\u043d \u2014 \u044f \u043f\u043e\u0434\u043a\u043b\u044e\u0447\u0443 \u043f\u0440\u043e\u0434\u0430\u0432\u0446\u0430, \u043e\u043d \u0440\u0430\u0437\u0431\u0435\u0440\u0451\u0442\u0441\u044f.",
 
+                )
 
+                send_chat_message(logger, account, int(chat_id), refund_text)
 
-        if intent_label == "when_free":
+                return None
 
-            _handle_when_free_request(logger, account, int(chat_id), mysql_cfg, user_id, workspace_id)
 
-            return None
 
+            if intent_label == "when_free":
 
+                _handle_when_free_request(logger, account, int(chat_id), mysql_cfg, user_id, workspace_id)
 
-        if mysql_cfg and user_id is not None:
+                return None
 
-            if intent_label == "busy_list":
 
-                accounts = fetch_busy_lot_accounts(mysql_cfg, int(user_id), workspace_id)
 
-                _respond_busy_lots(logger, account, int(chat_id), accounts)
+            if mysql_cfg and user_id is not None:
 
-                return None
+                if intent_label == "busy_list":
 
-            if intent_label == "stock_list":
+                    accounts = fetch_busy_lot_accounts(mysql_cfg, int(user_id), workspace_id)
 
-                accounts = fetch_available_lot_accounts(mysql_cfg, int(user_id), workspace_id)
+                    _respond_busy_lots(logger, account, int(chat_id), accounts)
 
-                _respond_free_lots(logger, account, int(chat_id), accounts)
+                    return None
 
-                if _wants_rent_flow(lower_text) or _wants_pre_rent_request(lower_text):
+                if intent_label == "stock_list":
 
-                    send_chat_message(logger, account, int(chat_id), replace_command_tokens(RENT_STOCK_NOTE, command_labels))
+                    accounts = fetch_available_lot_accounts(mysql_cfg, int(user_id), workspace_id)
 
-                return None
+                    _respond_free_lots(logger, account, int(chat_id), accounts)
 
-            wants_busy = _wants_busy_list(lower_text)
+                    if intents.rent_flow or intents.pre_rent:
 
-            if wants_busy:
+                        send_chat_message(logger, account, int(chat_id), replace_command_tokens(RENT_STOCK_NOTE, command_labels))
 
-                accounts = fetch_busy_lot_accounts(mysql_cfg, int(user_id), workspace_id)
+                    return None
 
-                _respond_busy_lots(logger, account, int(chat_id), accounts)
+                wants_busy = intents.busy_list
 
-                return None
+                if wants_busy:
 
-            wants_stock = _wants_stock_list(lower_text)
+                    accounts = fetch_busy_lot_accounts(mysql_cfg, int(user_id), workspace_id)
 
-            if wants_stock:
+                    _respond_busy_lots(logger, account, int(chat_id), accounts)
 
-                accounts = fetch_available_lot_accounts(mysql_cfg, int(user_id), workspace_id)
+                    return None
 
-                _respond_free_lots(logger, account, int(chat_id), accounts)
+                wants_stock = intents.stock_list
 
-                if _wants_rent_flow(lower_text) or _wants_pre_rent_request(lower_text):
+                if wants_stock:
 
-                    send_chat_message(logger, account, int(chat_id), replace_command_tokens(RENT_STOCK_NOTE, command_labels))
+                    accounts = fetch_available_lot_accounts(mysql_cfg, int(user_id), workspace_id)
 
-                return None
+                    _respond_free_lots(logger, account, int(chat_id), accounts)
 
+                    if intents.rent_flow or intents.pre_rent:
 
+                        send_chat_message(logger, account, int(chat_id), replace_command_tokens(RENT_STOCK_NOTE, command_labels))
 
-        if _wants_pre_rent_request(lower_text):
+                    return None
 
-            pre_rent_template = resolve_response(bot_settings, "pre_rent", RENT_PRE_REQUEST_MESSAGE)
 
-            pre_rent_text = render_template(
 
-                pre_rent_template,
+            if intents.pre_rent:
 
-                commands_text=commands_text,
+                pre_rent_text = compiled_settings.response("pre_rent", RENT_PRE_REQUEST_MESSAGE)
 
-                command_labels=command_labels,
+                send_chat_message(logger, account, int(chat_id), pre_rent_text)
 
-            )
+                return None
 
-            send_chat_message(logger, account, int(chat_id), pre_rent_text)
 
-            return None
 
+            if intents.rent_flow:
 
+                rent_flow_text = compiled_settings.response("rent_flow", RENT_FLOW_MESSAGE)
 
-        if _wants_rent_flow(lower_text):
+                send_chat_message(logger, account, int(chat_id), rent_flow_text)
 
-            rent_flow_template = resolve_response(bot_settings, "rent_flow", RENT_FLOW_MESSAGE)
+                return None
 
-            rent_flow_text = render_template(
 
-                rent_flow_template,
 
-                commands_text=commands_text,
+            if intents.rent_confirmation:
 
-                command_labels=command_labels,
+                rent_confirm_text = replace_command_tokens(RENT_CONFIRM_MESSAGE, command_labels)
 
-            )
+                send_chat_message(logger, account, int(chat_id), rent_confirm_text)
 
-            send_chat_message(logger, account, int(chat_id), rent_flow_text)
+                return None
 
-            return None
 
 
+            lot_url = _extract_lot_url(normalized_text)
 
-        if _wants_rent_confirmation(lower_text):
+            if lot_url:
 
-            rent_confirm_text = replace_command_tokens(RENT_CONFIRM_MESSAGE, command_labels)
+                logger.info(
 
-            send_chat_message(logger, account, int(chat_id), rent_confirm_text)
+                    "user=%s workspace=%s chat=%s detected_lot_url=%s",
 
-            return None
+                    site_username or "-",
 
+                    workspace_id if workspace_id is not None else "-",
 
+                    chat_name,
 
-        lot_url = _extract_lot_url(normalized_text)
+                    lot_url,
 
-        if lot_url:
+                )
 
-            logger.info(
+                if mysql_cfg and user_id is not None:
 
-                "user=%s workspace=%s chat=%s detected_lot_url=%s",
+                    row = fetch_lot_by_url(mysql_cfg, lot_url, user_id=int(user_id), workspace_id=workspace_id)
 
-                site_username or "-",
+                    if row:
 
-                workspace_id if workspace_id is not None else "-",
+                        available = (
 
-                chat_name,
+                            not row.get("owner")
 
-                lot_url,
+                            and not row.get("account_frozen")
 
-            )
+                            and not row.get("rental_frozen")
 
-            if mysql_cfg and user_id is not None:
+                            and not row.get("low_priority")
 
-                row = fetch_lot_by_url(mysql_cfg, lot_url, user_id=int(user_id), workspace_id=workspace_id)
+                        )
 
-                if row:
+                        name = _lot_display_name(row)
 
-                    available = (
+                        if available:
 
-                        not row.get("owner")
+                            reply = (
 
-                        and not row.get("account_frozen")
+                                f"Да, аккаунт {name} сейчас свободен — вы можете его арендовать."
 
-                        and not row.get("rental_frozen")
+                            )
 
-                        and not row.get("low_priority")
+                        else:
 
-                    )
+                            eta = _format_eta_from_row(row)
 
-                    name = _lot_display_name(row)
+                            if eta:
 
-                    if available:
+                                reply = f"Сейчас аккаунт {name} занят. {eta}"
 
-                        reply = (
+                            else:
 
-                            f"Да, аккаунт {name} сейчас свободен — вы можете его арендовать."
+                                reply = f"Сейчас аккаунт {name} занят. Пока неизвестно, когда освободится."
 
-                        )
+                        send_chat_message(logger, account, int(chat_id), reply)
 
                     else:
 
-                        eta = _format_eta_from_row(row)
+                        send_chat_message(logger, account, int(chat_id), "Лот не найден в базе.")
 
-                        if eta:
+                else:
 
-                            reply = f"Сейчас аккаунт {name} занят. {eta}"
+                    send_chat_message(
 
-                        else:
+                        logger,
 
-                            reply = f"Сейчас аккаунт {name} занят. Пока неизвестно, когда освободится."
+                        account,
 
-                    send_chat_message(logger, account, int(chat_id), reply)
+                        int(chat_id),
 
-                else:
+                        "Не могу проверить лот сейчас. Используйте команду !сток.",
 
-                    send_chat_message(logger, account, int(chat_id), "Лот не найден в базе.")
+                    )
 
-            else:
+                return None
 
-                send_chat_message(
+            if intents.when_free:
 
-                    logger,
+                _handle_when_free_request(logger, account, int(chat_id), mysql_cfg, user_id, workspace_id)
 
-                    account,
+                return None
 
-                    int(chat_id),
+            if mysql_cfg and user_id is not None:
 
-                    "Не могу проверить лот сейчас. Используйте команду !сток.",
+                if intent_label == "account_info" or intents.account_info:
 
-                )
+                    accounts = _fetch_chat_owner_accounts(mysql_cfg, int(user_id), workspace_id, int(chat_id), sender_username)
 
-            return None
+                    if not accounts:
 
-        if _wants_when_free(lower_text):
+                        send_chat_message(logger, account, int(chat_id), RENTALS_EMPTY)
 
-            _handle_when_free_request(logger, account, int(chat_id), mysql_cfg, user_id, workspace_id)
+                        return None
 
-            return None
+                    if len(accounts) > 1:
 
-        if mysql_cfg and user_id is not None:
+                        send_chat_message(
 
-            if intent_label == "account_info" or _wants_account_info(lower_text):
+                            logger,
 
-                accounts = fetch_owner_accounts(mysql_cfg, int(user_id), sender_username, workspace_id)
+                            account,
 
-                if not accounts:
+                            int(chat_id),
 
-                    send_chat_message(logger, account, int(chat_id), RENTALS_EMPTY)
+                            build_rental_choice_message(accounts, "!\u0430\u043a\u043a"),
 
-                    return None
+                        )
 
-                if len(accounts) > 1:
+                        return None
 
-                    send_chat_message(
+                    selected = accounts[0]
 
-                        logger,
+                    message = build_account_message(
 
-                        account,
+                        selected,
 
-                        int(chat_id),
+                        resolve_rental_minutes(selected),
 
-                        build_rental_choice_message(accounts, "!\u0430\u043a\u043a"),
+                        include_timer_note=True,
 
                     )
 
+                    send_chat_message(logger, account, int(chat_id), message)
+
                     return None
 
-                selected = accounts[0]
 
-                message = build_account_message(
 
-                    selected,
+                if intents.low_priority_replace:
 
-                    resolve_rental_minutes(selected),
+                    handle_command(
 
-                    include_timer_note=True,
+                        logger,
 
-                )
+                        account,
 
-                send_chat_message(logger, account, int(chat_id), message)
+                        site_username,
 
-                return None
+                        site_user_id,
 
+                        workspace_id,
 
+                        chat_name,
 
-            if _wants_low_priority_replace(lower_text):
+                        sender_username,
 
-                handle_command(
+                        msg.chat_id,
 
-                    logger,
+                        "!лпзамена",
 
-                    account,
+                        _extract_account_id_hint(message_text),
 
-                    site_username,
+                        chat_url,
 
-                    site_user_id,
+                    )
 
-                    workspace_id,
+                    return None
 
-                    chat_name,
+            if intents.refund:
 
-                    sender_username,
+                refund_text = compiled_settings.response(
 
-                    msg.chat_id,
+                    "refund",
 
-                    "!лпзамена",
+                    "\u041f\u043e \u0432\u043e\u043f\u0440\u043e\u0441\u0430\u043c \u0432\u043e\u0437\u0432\u0440\u0430\u0442\u0430 \u043d\u0430\u043f\u0438\u0448\u0438\u0442\u0435 !\u0430\u0434\u043c\u0438\u043d \u2014 \u044f \u043f\u043e\u0434\u043a\u043b\u044e\u0447\u0443 \u043f\u0440\u043e\u0434\u0430\u0432\u0446\u0430, \u043e\u043d \u0440\u0430\u0437\u0431\u0435\u0440\u0451\u0442\u0441\u044f.",
 
-                    _extract_account_id_hint(message_text),
+                )
 
-                    chat_url,
+                send_chat_message(logger, account, int(chat_id), refund_text)
 
-                )
+                return None
+
+            if not ai_enabled:
 
                 return None
 
-        if _wants_refund(lower_text):
+            ai_context = None
 
-            refund_template = resolve_response(
+            if mysql_cfg and user_id is not None and chat_id is not None:
 
-                bot_settings,
+                ai_context = _build_ai_context(
 
-                "refund",
+                    message_text,
 
-                "\u041f\u043e \u0432\u043e\u043f\u0440\u043e\u0441\u0430\u043c \u0432\u043e\u0437\u0432\u0440\u0430\u0442\u0430 \u043d\u0430\u043f\u0438\u0448\u0438\u0442\u0435 !\u0430\u0434\u043c\u0438\u043d \u2014 \u044f \u043f\u043e\u0434\u043a\u043b\u044e\u0447\u0443 \u043f\u0440\u043e\u0434\u0430\u0432\u0446\u0430, \u043e\u043d \u0440\u0430\u0437\u0431\u0435\u0440\u0451\u0442\u0441\u044f.",
+                    mysql_cfg,
 
-            )
+                    int(user_id),
 
-            refund_text = render_template(
+                    workspace_id,
 
-                refund_template,
+                    int(chat_id),
 
-                commands_text=commands_text,
+                    sender_username,
 
-                command_labels=command_labels,
+                )
 
-            )
+            ai_context_additions = compiled_settings.ai_context_additions
 
-            send_chat_message(logger, account, int(chat_id), refund_text)
+            if ai_context_additions:
 
-            return None
+                ai_context = f"{ai_context}\n\n{ai_context_additions}" if ai_context else ai_context_additions
 
-    if not is_system and chat_id is not None and not getattr(msg, "by_bot", False) and not command:
+            style_prompt = compiled_settings.style_prompt
 
-        if getattr(msg, "author_id", None) == getattr(account, "id", None):
+            ai_overrides = compiled_settings.ai_overrides
 
-            return None
+            ai_text = generate_ai_reply(
 
-        if account.username and sender_username and sender_username.lower() == account.username.lower():
+                message_text,
 
-            return None
+                sender=sender_username,
 
-        if not ai_enabled:
+                chat_name=chat_name,
 
-            return None
+                context=ai_context,
 
-        ai_context = None
+                system_prompt_extra=style_prompt,
 
-        if mysql_cfg and user_id is not None and chat_id is not None:
+                model_override=ai_overrides.get("model"),
 
-            ai_context = _build_ai_context(
+                temperature_override=ai_overrides.get("temperature"),
 
-                message_text,
+                max_tokens_override=ai_overrides.get("max_tokens"),
 
-                mysql_cfg,
+            )
 
-                int(user_id),
+            if token is not None and token.cancelled:
 
-                workspace_id,
+                return None
 
-                int(chat_id),
+            if ai_text:
 
-                sender_username,
+                ai_text = replace_command_tokens(ai_text, command_labels)
 
-            )
+                if _contains_unknown_commands(ai_text, allowed_commands):
+
+                    send_chat_message(
 
-        ai_context_additions = build_ai_context_additions(bot_settings, commands_text)
+                        logger,
 
-        if ai_context_additions:
+                        account,
 
-            ai_context = f"{ai_context}\n\n{ai_context_additions}" if ai_context else ai_context_additions
+                        int(chat_id),
 
-        style_prompt = build_style_prompt(bot_settings)
+                        "\u042f \u043d\u0435 \u0432\u044b\u043f\u043e\u043b\u043d\u044f\u044e \u0434\u0435\u0439\u0441\u0442\u0432\u0438\u044f \u043d\u0430\u043f\u0440\u044f\u043c\u0443\u044e. \u0418\u0441\u043f\u043e\u043b\u044c\u0437\u0443\u0439\u0442\u0435 \u043a\u043e\u043c\u0430\u043d\u0434\u044b:\n"
+                        + commands_help_text,
 
-        ai_overrides = get_ai_overrides(bot_settings)
+                    )
 
-        ai_text = generate_ai_reply(
+                    return None
 
-            message_text,
+                if chat_id is not None:
+                    key = (
+                        int(user_id) if user_id is not None else None,
+                        int(workspace_id) if workspace_id is not None else None,
+                        int(chat_id),
+                    )
+                    _AI_LAST_REPLY.set(key, ai_text)
+                send_chat_message(logger, account, int(chat_id), ai_text)
 
-            sender=sender_username,
+                if mysql_cfg and user_id is not None and chat_id is not None:
 
-            chat_name=chat_name,
+                    try:
 
-            context=ai_context,
+                        store_memory(
 
-            system_prompt_extra=style_prompt,
+                            mysql_cfg,
 
-            model_override=ai_overrides.get("model"),
+                            user_id=int(user_id),
 
-            temperature_override=ai_overrides.get("temperature"),
+                            workspace_id=workspace_id,
 
-            max_tokens_override=ai_overrides.get("max_tokens"),
+                            chat_id=int(chat_id),
 
-        )
+                            user_text=message_text,
 
-        if ai_text:
+                            ai_text=ai_text,
 
-            ai_text = replace_command_tokens(ai_text, command_labels)
+                        )
 
-            if _contains_unknown_commands(ai_text, allowed_commands):
+                    except Exception:
 
-                send_chat_message(
+                        pass
 
-                    logger,
+        pipeline = get_ai_pipeline(logger) if ai_enabled else None
 
-                    account,
+        if pipeline is not None:
 
-                    int(chat_id),
+            # The LLM calls run on the AI pool; the polling loop moves on to the next message.
 
-                    "\u042f \u043d\u0435 \u0432\u044b\u043f\u043e\u043b\u043d\u044f\u044e \u0434\u0435\u0439\u0441\u0442\u0432\u0438\u044f \u043d\u0430\u043f\u0440\u044f\u043c\u0443\u044e. \u0418\u0441\u043f\u043e\u043b\u044c\u0437\u0443\u0439\u0442\u0435 \u043a\u043e\u043c\u0430\u043d\u0434\u044b:\n"
-                    + commands_help_text,
+            chat_key = ai_chat_key(user_id, workspace_id, chat_id)
 
-                )
+            debounce_seconds = compiled_settings.reply_debounce_seconds
 
-                return None
+            if debounce_seconds > 0:
 
-            if chat_id is not None:
-                key = (
-                    int(user_id) if user_id is not None else None,
-                    int(workspace_id) if workspace_id is not None else None,
-                    int(chat_id),
-                )
-                _AI_LAST_REPLY[key] = (time.time(), ai_text)
-                _prune_ai_caches()
-            send_chat_message(logger, account, int(chat_id), ai_text)
+                submitted = pipeline.submit_debounced(chat_key, message_text, debounce_seconds, route_and_reply)
 
-            if mysql_cfg and user_id is not None and chat_id is not None:
+            else:
 
-                try:
+                submitted = pipeline.submit(chat_key, route_and_reply)
+
+            if submitted:
+
+                return None
 
-                    store_memory(
+            logger.warning(
 
-                        mysql_cfg,
+                "user=%s workspace=%s chat=%s AI pipeline is full, dropping AI reply.",
 
-                        user_id=int(user_id),
+                site_username or "-",
 
-                        workspace_id=workspace_id,
+                workspace_id if workspace_id is not None else "-",
 
-                        chat_id=int(chat_id),
+                chat_name,
 
-                        user_text=message_text,
+            )
 
-                        ai_text=ai_text,
+            return None
 
-                    )
+        route_and_reply()
 
-                except Exception:
+        return None
 
-                    pass
 
     if is_system:
 
@@ -3398,6 +2796,12 @@ def run_single_user(logger: logging.Logger) -> None:
 
         mysql_cfg = None
 
+    if mysql_cfg:
+        try:
+            load_schema_snapshot(mysql_cfg)
+        except Exception as exc:
+            logger.warning("Schema snapshot preload failed: %s", exc)
+
     user_id = None
 
     if mysql_cfg and account.username:
@@ -3418,7 +2822,6 @@ def run_single_user(logger: logging.Logger) -> None:
     runner = Runner(account, disable_message_requests=False)
     state = RentalMonitorState()
     auto_raise_state = auto_raise_init_state(mysql_cfg=mysql_cfg, user_id=user_id, workspace_id=None)
-    rental_interval = max(5, env_int("FUNPAY_RENTAL_CHECK_SECONDS", 30))
     next_mysql_cfg_refresh = 0.0
     next_user_id_refresh = 0.0
     next_rental_check = 0.0
@@ -3451,7 +2854,7 @@ def run_single_user(logger: logging.Logger) -> None:
             next_user_id_refresh = now + max(5, user_id_refresh_seconds)
 
         if now >= next_rental_check:
-            process_rental_monitor(
+            rental_delay = process_rental_monitor(
                 logger,
                 account,
                 account.username,
@@ -3460,7 +2863,7 @@ def run_single_user(logger: logging.Logger) -> None:
                 state,
                 mysql_cfg=mysql_cfg,
             )
-            next_rental_check = now + rental_interval
+            next_rental_check = now + rental_delay
 
         if mysql_cfg and user_id is not None and now >= next_raise_sync:
 
@@ -3496,13 +2899,14 @@ def run_single_user(logger: logging.Logger) -> None:
             next_auto_raise_run = now + max(1.0, float(delay))
 
         if now >= next_ai_cache_prune:
-            _prune_ai_caches(now)
+            _prune_ai_caches()
             next_ai_cache_prune = now + 60
 
         if now >= next_chat_poll:
             try:
-                updates = runner.get_updates()
-                events = runner.parse_updates(updates)
+                with account_lock(account):
+                    updates = runner.get_updates()
+                    events = runner.parse_updates(updates)
                 for event in events:
                     if isinstance(event, NewMessageEvent):
                         log_message(logger, account, account.username, user_id, None, event)
@@ -3527,344 +2931,436 @@ def run_single_user(logger: logging.Logger) -> None:
 
 
 
-def workspace_worker_loop(
-
-    workspace: dict,
-
-    user_agent: str | None,
-
-    poll_seconds: int,
-
-    stop_event: threading.Event,
-
-) -> None:
-
-    logger = logging.getLogger("funpay.worker")
-
-    workspace_id = workspace.get("workspace_id")
-
-    workspace_name = workspace.get("workspace_name") or f"Workspace {workspace_id}"
-
-    user_id = workspace.get("user_id")
-
-    site_username = workspace.get("username") or f"user-{user_id}"
-
-    golden_key = workspace.get("golden_key")
-
-    proxy_url = normalize_proxy_url(workspace.get("proxy_url"))
-
-    label = f"[{workspace_name}]"
-
-
-
-    state = RentalMonitorState()
-
-    raise_sync_interval = env_int("RAISE_CATEGORIES_SYNC_SECONDS", 6 * 3600)
-
-
-    try:
-
-        mysql_cfg = get_mysql_config()
-
-    except RuntimeError:
-
-        mysql_cfg = None
-
-    mysql_cfg_last_refresh = time.time()
-
-    status_platform = (workspace.get("platform") or "funpay").lower()
-
-    auto_raise_enabled = lambda: True
-
-    raise_profile_sync = env_int("RAISE_PROFILE_SYNC_SECONDS", 3600)
-    mysql_cfg_refresh_seconds = env_int("FUNPAY_DB_CONFIG_REFRESH_SECONDS", 300)
-
-    while not stop_event.is_set():
-
+class WorkspaceRuntime:
+    def __init__(
+        self,
+        workspace: dict,
+        user_agent: str | None,
+        poll_seconds: int,
+        stop_event: threading.Event | None = None,
+        lease_check: Callable[[], bool] | None = None,
+    ) -> None:
+        self.logger = logging.getLogger("funpay.worker")
+        self.workspace = workspace
+        self.lease_check = lease_check
+        self._lease_paused = False
+        self.user_agent = user_agent
+        self.poll_seconds = poll_seconds
+        self.stop_event = stop_event or threading.Event()
+        self.workspace_id = workspace.get("workspace_id")
+        self.workspace_name = workspace.get("workspace_name") or f"Workspace {self.workspace_id}"
+        self.user_id = workspace.get("user_id")
+        self.site_username = workspace.get("username") or f"user-{self.user_id}"
+        self.golden_key = workspace.get("golden_key")
+        self.proxy_url = normalize_proxy_url(workspace.get("proxy_url"))
+        self.label = f"[{self.workspace_name}]"
+        self.status_platform = (workspace.get("platform") or "funpay").lower()
+        self.state = RentalMonitorState()
+        self.raise_sync_interval = env_int("RAISE_CATEGORIES_SYNC_SECONDS", 6 * 3600)
+        self.raise_profile_sync = env_int("RAISE_PROFILE_SYNC_SECONDS", 3600)
+        self.mysql_cfg_refresh_seconds = env_int("FUNPAY_DB_CONFIG_REFRESH_SECONDS", 300)
+        self.status_ping_interval = 60
+        self.auto_raise_enabled = lambda: True
         try:
+            self.mysql_cfg = get_mysql_config()
+        except RuntimeError:
+            self.mysql_cfg = None
+        self.mysql_cfg_last_refresh = time.time()
+        self.account: Account | None = None
+        self.runner: Runner | None = None
+        self.auto_raise_state = None
+        self.wake_hook: Callable[[str], None] | None = None
+        self.outbox_wakeups: OutboxWakeups | None = None
+        self._outbox_signalled = False
+        self.next_outbox_reconcile = 0.0
+
+    @property
+    def _workspace_id_int(self) -> int | None:
+        return int(self.workspace_id) if self.workspace_id is not None else None
+
+    def _upsert_status(self, status: str, message: str | None) -> None:
+        if not self.mysql_cfg or self.user_id is None:
+            return
+        upsert_workspace_status(
+            self.mysql_cfg,
+            user_id=int(self.user_id),
+            workspace_id=self._workspace_id_int,
+            platform=self.status_platform,
+            status=status,
+            message=message,
+        )
 
-            if not golden_key:
-
-                logger.warning("%s Missing golden_key, skipping.", label)
-
-                if mysql_cfg and user_id is not None:
-
-                    upsert_workspace_status(
-
-                        mysql_cfg,
-
-                        user_id=int(user_id),
-
-                        workspace_id=int(workspace_id) if workspace_id is not None else None,
-
-                        platform=status_platform,
-
-                        status="unauthorized",
-
-                        message="Missing golden key.",
-
-                    )
-
-                return
-
-            proxy_cfg = ensure_proxy_isolated(logger, proxy_url, label)
-
-            if not proxy_cfg:
-
-                if mysql_cfg and user_id is not None:
-
-                    upsert_workspace_status(
-
-                        mysql_cfg,
-
-                        user_id=int(user_id),
-
-                        workspace_id=int(workspace_id) if workspace_id is not None else None,
-
-                        platform=status_platform,
-
-                        status="error",
-
-                        message="Proxy connection failed.",
-
-                    )
-
-                return
-
-
-
-            account = Account(golden_key, user_agent=user_agent, proxy=proxy_cfg)
-
-            account.get()
-            runner = Runner(account, disable_message_requests=False)
-
-            logger.info("Bot started for %s (%s).", site_username, workspace_name)
-
-            if mysql_cfg and user_id is not None:
-
-                upsert_workspace_status(
-
-                    mysql_cfg,
-
-                    user_id=int(user_id),
-
-                    workspace_id=int(workspace_id) if workspace_id is not None else None,
-
-                    platform=status_platform,
-
-                    status="ok",
-
-                    message="Connected to FunPay.",
-
-                )
-
-                try:
-
-                    sync_raise_categories(
-
-                        mysql_cfg,
-
-                        account=account,
-
-                        user_id=int(user_id),
-
-                        workspace_id=int(workspace_id) if workspace_id is not None else None,
-
-                    )
-
-                except Exception:
-
-                    logger.debug("%s Raise categories sync failed.", label, exc_info=True)
-
-
-
-            auto_raise_state = auto_raise_init_state(
-                mysql_cfg=mysql_cfg,
-                user_id=int(user_id) if user_id is not None else None,
-                workspace_id=int(workspace_id) if workspace_id is not None else None,
+    def _sync_raise_categories(self) -> None:
+        try:
+            sync_raise_categories(
+                self.mysql_cfg,
+                account=self.account,
+                user_id=int(self.user_id),
+                workspace_id=self._workspace_id_int,
             )
+        except Exception:
+            self.logger.debug("%s Raise categories sync failed.", self.label, exc_info=True)
+
+    def connect(self) -> bool:
+        if not self.golden_key:
+            self.logger.warning("%s Missing golden_key, skipping.", self.label)
+            self._upsert_status("unauthorized", "Missing golden key.")
+            return False
+        proxy_cfg = ensure_proxy_isolated(self.logger, self.proxy_url, self.label)
+        if not proxy_cfg:
+            self._upsert_status("error", "Proxy connection failed.")
+            return False
+        if self.account is not None:
+            self.account.close()
+        self.account = Account(self.golden_key, user_agent=self.user_agent, proxy=proxy_cfg)
+        self.account.get()
+        self.runner = Runner(self.account, disable_message_requests=False)
+        self.logger.info("Bot started for %s (%s).", self.site_username, self.workspace_name)
+        if self.mysql_cfg and self.user_id is not None:
+            self._upsert_status("ok", "Connected to FunPay.")
+            self._sync_raise_categories()
+        self.auto_raise_state = auto_raise_init_state(
+            mysql_cfg=self.mysql_cfg,
+            user_id=int(self.user_id) if self.user_id is not None else None,
+            workspace_id=self._workspace_id_int,
+        )
+        if self._workspace_id_int is not None:
+            self.outbox_wakeups = get_outbox_wakeups(self.logger)
+            if self.outbox_wakeups is not None:
+                self.outbox_wakeups.subscribe(self._workspace_id_int, self._signal_outbox)
+        return True
 
-            rental_interval = max(5, env_int("FUNPAY_RENTAL_CHECK_SECONDS", 30))
-            status_ping_interval = 60
-            next_mysql_cfg_refresh = 0.0
-            next_rental_check = 0.0
-            next_raise_sync = 0.0
-            next_status_ping = 0.0
-            next_session_refresh = time.time() + 3600
-            next_auto_raise_run = 0.0
-            next_ai_cache_prune = 0.0
-            next_chat_poll = 0.0
-
-            while not stop_event.is_set():
-
-                now = time.time()
-
-                if now >= next_mysql_cfg_refresh:
-                    mysql_cfg, mysql_cfg_last_refresh = _maybe_refresh_mysql_cfg(
-                        mysql_cfg,
-                        mysql_cfg_last_refresh,
-                        mysql_cfg_refresh_seconds,
-                    )
-                    next_mysql_cfg_refresh = now + max(5, mysql_cfg_refresh_seconds)
-
-                if now >= next_rental_check:
-                    process_rental_monitor(
-                        logger,
-                        account,
-                        site_username,
-                        user_id,
-                        workspace_id,
-                        state,
-                        mysql_cfg=mysql_cfg,
-                    )
-                    next_rental_check = now + rental_interval
-
-                if mysql_cfg and user_id is not None and now >= next_raise_sync:
-
-                    try:
-
-                        sync_raise_categories(
-
-                            mysql_cfg,
-
-                            account=account,
-
-                            user_id=int(user_id),
-
-                            workspace_id=int(workspace_id) if workspace_id is not None else None,
-
-                        )
-
-                    except Exception:
-
-                        logger.debug("%s Raise categories sync failed.", label, exc_info=True)
-
-                    next_raise_sync = now + max(30, raise_sync_interval)
-
-                if mysql_cfg and user_id is not None and now >= next_status_ping:
-
-                    upsert_workspace_status(
-
-                        mysql_cfg,
-
-                        user_id=int(user_id),
-
-                        workspace_id=int(workspace_id) if workspace_id is not None else None,
-
-                        platform=status_platform,
-
-                        status="ok",
-
-                        message="Connected to FunPay.",
-
-                    )
-
-                    next_status_ping = now + status_ping_interval
-
-                if now >= next_session_refresh:
-                    try:
-                        account.get()
-                        logger.info("%s Session refreshed.", label)
-                        next_session_refresh = now + 3600
-                    except Exception:
-                        logger.exception("%s Session refresh failed. Retrying in 60s.", label)
-                        next_session_refresh = now + 60
-
-                if now >= next_auto_raise_run:
-                    delay = auto_raise_step(
-                        account=account,
-                        state=auto_raise_state,
-                        mysql_cfg=mysql_cfg,
-                        user_id=int(user_id) if user_id is not None else None,
-                        workspace_id=int(workspace_id) if workspace_id is not None else None,
-                        enabled_fn=auto_raise_enabled,
-                        profile_sync_seconds=raise_profile_sync,
-                    )
-                    next_auto_raise_run = now + max(1.0, float(delay))
-
-                if now >= next_ai_cache_prune:
-                    _prune_ai_caches(now)
-                    next_ai_cache_prune = now + 60
+    def _signal_outbox(self) -> None:
+        # Called from the wake-up listener thread.
+        self._outbox_signalled = True
+        if self.wake_hook is not None:
+            self.wake_hook("chat_outbox")
 
-                if now >= next_chat_poll:
-                    try:
-                        updates = runner.get_updates()
-                        events = runner.parse_updates(updates)
-                        for event in events:
-                            if stop_event.is_set():
-                                break
-                            if isinstance(event, NewMessageEvent):
-                                log_message(logger, account, site_username, user_id, workspace_id, event)
-                    except Exception:
-                        logger.debug("%s Chat poll failed.", label, exc_info=True)
-                    next_chat_poll = now + max(1.0, float(poll_seconds))
-
-                next_due = min(
-                    next_mysql_cfg_refresh,
-                    next_rental_check,
-                    next_raise_sync,
-                    next_status_ping,
-                    next_session_refresh,
-                    next_auto_raise_run,
-                    next_ai_cache_prune,
-                    next_chat_poll,
+    def dispatch_outbox(self) -> float:
+        limit = max(1, env_int("CHAT_OUTBOX_BATCH", 20))
+        now = time.time()
+        if self.mysql_cfg and self.user_id is not None and (self._outbox_signalled or now >= self.next_outbox_reconcile):
+            self._outbox_signalled = False
+            listening = self.outbox_wakeups is not None and self.outbox_wakeups.connected
+            reconcile_seconds = (
+                env_int("CHAT_OUTBOX_RECONCILE_SECONDS", 30) if listening else env_int("CHAT_OUTBOX_POLL_SECONDS", 3)
+            )
+            self.next_outbox_reconcile = now + max(1, reconcile_seconds)
+            try:
+                processed = process_chat_outbox(
+                    self.logger,
+                    self.mysql_cfg,
+                    self.account,
+                    user_id=int(self.user_id),
+                    workspace_id=self._workspace_id_int,
+                    limit=limit,
                 )
-                sleep_for = max(0.2, min(float(poll_seconds), next_due - time.time()))
-                stop_event.wait(sleep_for)
-
-        except Exception as exc:
-
-            if mysql_cfg and user_id is not None:
-
-                status = "error"
-
-                message = None
-
-                if isinstance(exc, fp_exceptions.UnauthorizedError):
-
-                    status = "unauthorized"
-
-                    message = "Authorization required."
+            except Exception:
+                self.logger.debug("%s Chat outbox dispatch failed.", self.label, exc_info=True)
+                processed = 0
+            if processed >= limit:
+                return 0.0
+        remaining = max(0.0, self.next_outbox_reconcile - time.time())
+        if self.wake_hook is None:
+            # The thread driver cannot be woken from outside, so it checks the flag often.
+            return min(remaining, 0.5)
+        return remaining
+
+    def refresh_mysql_cfg(self) -> float:
+        self.mysql_cfg, self.mysql_cfg_last_refresh = _maybe_refresh_mysql_cfg(
+            self.mysql_cfg,
+            self.mysql_cfg_last_refresh,
+            self.mysql_cfg_refresh_seconds,
+        )
+        return max(5, self.mysql_cfg_refresh_seconds)
+
+    def check_rentals(self) -> float:
+        return process_rental_monitor(
+            self.logger,
+            self.account,
+            self.site_username,
+            self.user_id,
+            self.workspace_id,
+            self.state,
+            mysql_cfg=self.mysql_cfg,
+        )
 
-                elif isinstance(exc, fp_exceptions.RequestFailedError):
+    def sync_raise(self) -> float:
+        if self.mysql_cfg and self.user_id is not None:
+            self._sync_raise_categories()
+        return max(30, self.raise_sync_interval)
 
-                    message = exc.short_str() if hasattr(exc, "short_str") else str(exc)
+    def ping_status(self) -> float:
+        self._upsert_status("ok", "Connected to FunPay.")
+        return self.status_ping_interval
 
-                else:
+    def refresh_session(self) -> float:
+        try:
+            self.account.get()
+            self.logger.info("%s Session refreshed.", self.label)
+            return 3600
+        except Exception:
+            self.logger.exception("%s Session refresh failed. Retrying in 60s.", self.label)
+            return 60
+
+    def auto_raise(self) -> float:
+        delay = auto_raise_step(
+            account=self.account,
+            state=self.auto_raise_state,
+            mysql_cfg=self.mysql_cfg,
+            user_id=int(self.user_id) if self.user_id is not None else None,
+            workspace_id=self._workspace_id_int,
+            enabled_fn=self.auto_raise_enabled,
+            profile_sync_seconds=self.raise_profile_sync,
+        )
+        return max(1.0, float(delay))
 
-                    message = str(exc)[:200]
+    def poll_chat(self) -> float:
+        try:
+            with account_lock(self.account):
+                updates = self.runner.get_updates()
+                events = self.runner.parse_updates(updates)
+            for event in events:
+                if self.stop_event.is_set():
+                    break
+                if isinstance(event, NewMessageEvent):
+                    log_message(self.logger, self.account, self.site_username, self.user_id, self.workspace_id, event)
+        except Exception:
+            self.logger.debug("%s Chat poll failed.", self.label, exc_info=True)
+        return max(1.0, float(self.poll_seconds))
+
+    def _fenced(self, run: Callable[[], float]) -> Callable[[], float]:
+        if self.lease_check is None:
+            return run
+
+        def step() -> float:
+            if not self.lease_check():
+                if not self._lease_paused:
+                    self.logger.warning("%s Workspace lease not confirmed, pausing.", self.label)
+                    self._lease_paused = True
+                return 1.0
+            if self._lease_paused:
+                self.logger.info("%s Workspace lease confirmed, resuming.", self.label)
+                self._lease_paused = False
+            return run()
+
+        return step
+
+    def steps(self) -> list[WorkspaceStep]:
+        return [
+            WorkspaceStep("mysql_cfg", self.refresh_mysql_cfg, "db"),
+            WorkspaceStep("rentals", self._fenced(self.check_rentals), "db"),
+            WorkspaceStep("raise_sync", self._fenced(self.sync_raise), "http"),
+            WorkspaceStep("status_ping", self._fenced(self.ping_status), "db"),
+            WorkspaceStep("session", self._fenced(self.refresh_session), "http", initial_delay=3600),
+            WorkspaceStep("auto_raise", self._fenced(self.auto_raise), "http"),
+            WorkspaceStep("chat_poll", self._fenced(self.poll_chat), "http"),
+            WorkspaceStep("chat_outbox", self._fenced(self.dispatch_outbox), "http"),
+        ]
+
+    def report_failure(self, exc: Exception) -> None:
+        if self.mysql_cfg and self.user_id is not None:
+            status = "error"
+            message = None
+            if isinstance(exc, fp_exceptions.UnauthorizedError):
+                status = "unauthorized"
+                message = "Authorization required."
+            elif isinstance(exc, fp_exceptions.RequestFailedError):
+                message = exc.short_str() if hasattr(exc, "short_str") else str(exc)
+            else:
+                message = str(exc)[:200]
+            self._upsert_status(status, message)
+        short = exc.short_str() if hasattr(exc, "short_str") else str(exc)[:200]
+        self.logger.error("%s Worker error: %s. Restarting in 30s.", self.label, short)
+        self.logger.debug("%s Traceback:", self.label, exc_info=exc)
+
+    def close(self) -> None:
+        if self.outbox_wakeups is not None and self._workspace_id_int is not None:
+            self.outbox_wakeups.unsubscribe(self._workspace_id_int, self._signal_outbox)
+        if self._workspace_id_int is not None:
+            forget_workspace_contexts(self._workspace_id_int)
+            cancel_workspace_ai_replies(self._workspace_id_int)
+        if self.account is not None:
+            self.account.close()
+        self.logger.info("%s Worker stopped (key updated or removed).", self.label)
 
-                upsert_workspace_status(
 
-                    mysql_cfg,
+def workspace_worker_loop(
+    workspace: dict,
+    user_agent: str | None,
+    poll_seconds: int,
+    stop_event: threading.Event,
+    lease_check: Callable[[], bool] | None = None,
+) -> None:
+    runtime = WorkspaceRuntime(workspace, user_agent, poll_seconds, stop_event, lease_check)
+    try:
+        while not stop_event.is_set():
+            try:
+                if not runtime.connect():
+                    return
+                steps = runtime.steps()
+                now = time.time()
+                due = {step.name: now + step.initial_delay for step in steps}
+                next_ai_cache_prune = 0.0
+                while not stop_event.is_set():
+                    now = time.time()
+                    for step in steps:
+                        if now >= due[step.name]:
+                            due[step.name] = now + step.run()
+                    if now >= next_ai_cache_prune:
+                        _prune_ai_caches()
+                        next_ai_cache_prune = now + 60
+                    next_due = min(min(due.values()), next_ai_cache_prune)
+                    sleep_for = max(0.2, min(float(poll_seconds), next_due - time.time()))
+                    stop_event.wait(sleep_for)
+            except Exception as exc:
+                runtime.report_failure(exc)
+                time.sleep(30)
+    finally:
+        runtime.close()
+
+
+def _fetch_desired_workspaces(
+    mysql_cfg: dict,
+    max_users: int,
+    shard: tuple[int, int] | None = None,
+    leases: WorkspaceLeaseManager | None = None,
+) -> dict[int, dict]:
+    workspaces = fetch_workspaces(mysql_cfg)
+    if max_users > 0:
+        workspaces = workspaces[:max_users]
+    desired = {
+        int(ws["workspace_id"]): ws
+        for ws in workspaces
+        if ws.get("workspace_id") is not None
+    }
+    if shard is not None:
+        shard_index, shard_count = shard
+        desired = {
+            workspace_id: ws
+            for workspace_id, ws in desired.items()
+            if workspace_shard(workspace_id, shard_count) == shard_index
+        }
+    if leases is not None:
+        tokens = leases.sync(desired.keys())
+        desired = {
+            workspace_id: {**ws, "lease_token": tokens[workspace_id]}
+            for workspace_id, ws in desired.items()
+            if workspace_id in tokens
+        }
+    return desired
+
+
+def _shard_label(shard: tuple[int, int] | None) -> str:
+    if shard is None:
+        return ""
+    return f" Shard {shard[0] + 1}/{shard[1]}."
 
-                    user_id=int(user_id),
 
-                    workspace_id=int(workspace_id) if workspace_id is not None else None,
+def _workspace_fingerprint(workspace: dict) -> tuple:
+    return (workspace.get("golden_key"), workspace.get("proxy_url"), workspace.get("lease_token"))
 
-                    platform=status_platform,
 
-                    status=status,
+def _build_lease_manager(
+    logger: logging.Logger,
+    mysql_cfg: dict,
+    shard: tuple[int, int] | None,
+) -> WorkspaceLeaseManager | None:
+    if not env_bool("FUNPAY_LEASES_ENABLED", False):
+        return None
+    scope = f"{shard[0]}/{shard[1]}" if shard is not None else "all"
+    leases = WorkspaceLeaseManager(
+        mysql_cfg,
+        node_id=default_node_id(scope),
+        scope=scope,
+        ttl_seconds=env_int("FUNPAY_LEASE_TTL_SECONDS", 30),
+        logger=logger,
+    )
+    logger.info("Workspace leases enabled. Node: %s, TTL: %ss.", leases.node_id, leases.ttl_seconds)
+    return leases
 
-                    message=message,
 
-                )
+def _lease_check(leases: WorkspaceLeaseManager | None, workspace: dict) -> Callable[[], bool] | None:
+    if leases is None:
+        return None
+    workspace_id = int(workspace["workspace_id"])
+    token = int(workspace.get("lease_token") or 0)
+    return lambda: leases.holds(workspace_id, token)
 
-            short = exc.short_str() if hasattr(exc, "short_str") else str(exc)[:200]
 
-            logger.error("%s Worker error: %s. Restarting in 30s.", label, short)
+def _release_leases(logger: logging.Logger, leases: WorkspaceLeaseManager | None) -> None:
+    if leases is None:
+        return
+    try:
+        leases.release_all()
+    except Exception:
+        logger.debug("Workspace lease release failed.", exc_info=True)
 
-            logger.debug("%s Traceback:", label, exc_info=True)
 
-            time.sleep(30)
+def run_multi_user_async(logger: logging.Logger, shard: tuple[int, int] | None = None) -> None:
+    poll_seconds = env_int("FUNPAY_POLL_SECONDS", 6)
+    sync_seconds = env_int("FUNPAY_USER_SYNC_SECONDS", 60)
+    max_users = env_int("FUNPAY_MAX_USERS", 0)
+    max_worker_threads = env_int("FUNPAY_MAX_WORKER_THREADS", 0)
+    scheduler_threads = max_worker_threads if max_worker_threads > 0 else env_int("FUNPAY_SCHEDULER_THREADS", 32)
+    http_concurrency = env_int("FUNPAY_SCHEDULER_HTTP_CONCURRENCY", 24)
+    db_concurrency = env_int("FUNPAY_SCHEDULER_DB_CONCURRENCY", 16)
+    user_agent = os.getenv("FUNPAY_USER_AGENT")
+    mysql_cfg = get_mysql_config()
+    try:
+        load_schema_snapshot(mysql_cfg)
+    except Exception as exc:
+        logger.warning("Schema snapshot preload failed: %s", exc)
+    leases = _build_lease_manager(logger, mysql_cfg, shard)
+    if leases is not None:
+        sync_seconds = min(sync_seconds, max(1, env_int("FUNPAY_LEASE_RENEW_SECONDS", 10)))
+    logger.info(
+        "Multi-user mode enabled (async scheduler, %s threads). Sync interval: %ss.%s",
+        scheduler_threads,
+        sync_seconds,
+        _shard_label(shard),
+    )
+    scheduler = WorkspaceScheduler(
+        logger,
+        threads=scheduler_threads,
+        http_concurrency=http_concurrency,
+        db_concurrency=db_concurrency,
+    )
+    try:
+        asyncio.run(
+            scheduler.run(
+                fetch_desired=lambda: _fetch_desired_workspaces(mysql_cfg, max_users, shard, leases),
+                fingerprint_fn=_workspace_fingerprint,
+                runtime_factory=lambda workspace: WorkspaceRuntime(
+                    workspace,
+                    user_agent,
+                    poll_seconds,
+                    threading.Event(),
+                    _lease_check(leases, workspace),
+                ),
+                sync_seconds=sync_seconds,
+                housekeeping=_prune_ai_caches,
+            )
+        )
+    finally:
+        _release_leases(logger, leases)
+        shutdown_memory(logger)
 
-    logger.info("%s Worker stopped (key updated or removed).", label)
 
+def run_multi_user(logger: logging.Logger, shard: tuple[int, int] | None = None) -> None:
+    engine = (os.getenv("FUNPAY_WORKER_ENGINE") or "async").strip().lower()
+    if engine == "threads":
+        run_multi_user_threads(logger, shard)
+        return
+    run_multi_user_async(logger, shard)
 
 
+def _run_shard(shard_index: int, shard_count: int) -> None:
+    logger = logging.getLogger("funpay.worker")
+    run_multi_user(logger, shard=(shard_index, shard_count))
 
 
-def run_multi_user(logger: logging.Logger) -> None:
+def run_multi_user_threads(logger: logging.Logger, shard: tuple[int, int] | None = None) -> None:
 
     poll_seconds = env_int("FUNPAY_POLL_SECONDS", 6)
 
@@ -3879,139 +3375,132 @@ def run_multi_user(logger: logging.Logger) -> None:
 
     mysql_cfg = get_mysql_config()
 
-    logger.info("Multi-user mode enabled. Sync interval: %ss.", sync_seconds)
+    try:
+        load_schema_snapshot(mysql_cfg)
+    except Exception as exc:
+        logger.warning("Schema snapshot preload failed: %s", exc)
+    leases = _build_lease_manager(logger, mysql_cfg, shard)
+    if leases is not None:
+        sync_seconds = min(sync_seconds, max(1, env_int("FUNPAY_LEASE_RENEW_SECONDS", 10)))
+
+    logger.info("Multi-user mode enabled. Sync interval: %ss.%s", sync_seconds, _shard_label(shard))
 
 
 
     workers: dict[int, dict] = {}
     warned_worker_cap = False
 
-    while True:
-
-        try:
-
-            workspaces = fetch_workspaces(mysql_cfg)
-
-            if max_users > 0:
-
-                workspaces = workspaces[:max_users]
-
-
-
-            desired = {
-
-                int(ws["workspace_id"]): ws
-
-                for ws in workspaces
-
-                if ws.get("workspace_id") is not None
+    try:
+        while True:
 
-            }
+            try:
 
-            if max_worker_threads > 0 and len(desired) > max_worker_threads:
-                if not warned_worker_cap:
-                    logger.warning(
-                        "Workspace count (%s) exceeds FUNPAY_MAX_WORKER_THREADS=%s; limiting active workers.",
-                        len(desired),
-                        max_worker_threads,
-                    )
-                    warned_worker_cap = True
-                desired = {
-                    workspace_id: desired[workspace_id]
-                    for workspace_id in sorted(desired.keys())[:max_worker_threads]
-                }
-            elif warned_worker_cap:
-                warned_worker_cap = False
+                desired = _fetch_desired_workspaces(mysql_cfg, max_users, shard, leases)
 
 
+                if max_worker_threads > 0 and len(desired) > max_worker_threads:
+                    if not warned_worker_cap:
+                        logger.warning(
+                            "Workspace count (%s) exceeds FUNPAY_MAX_WORKER_THREADS=%s; limiting active workers.",
+                            len(desired),
+                            max_worker_threads,
+                        )
+                        warned_worker_cap = True
+                    desired = {
+                        workspace_id: desired[workspace_id]
+                        for workspace_id in sorted(desired.keys())[:max_worker_threads]
+                    }
+                elif warned_worker_cap:
+                    warned_worker_cap = False
 
-            active_ids = list(workers.keys())
 
-            for workspace_id in active_ids:
 
-                if workspace_id not in desired:
+                active_ids = list(workers.keys())
 
-                    worker_info = workers.pop(workspace_id)
+                for workspace_id in active_ids:
 
-                    stop_event = worker_info.get("stop")
+                    if workspace_id not in desired:
 
-                    thread = worker_info.get("thread")
+                        worker_info = workers.pop(workspace_id)
 
-                    if stop_event:
+                        stop_event = worker_info.get("stop")
 
-                        stop_event.set()
+                        thread = worker_info.get("thread")
 
-                    if thread:
+                        if stop_event:
 
-                        thread.join(timeout=3)
+                            stop_event.set()
 
+                        if thread:
 
+                            thread.join(timeout=3)
 
-            for workspace_id, workspace in desired.items():
 
-                golden_key = workspace.get("golden_key")
 
-                proxy_url = workspace.get("proxy_url")
+                for workspace_id, workspace in desired.items():
 
-                existing = workers.get(workspace_id)
+                    fingerprint = _workspace_fingerprint(workspace)
 
-                if existing:
+                    existing = workers.get(workspace_id)
 
-                    if existing.get("golden_key") == golden_key and existing.get("proxy_url") == proxy_url:
+                    if existing:
 
-                        continue
+                        if existing.get("fingerprint") == fingerprint:
 
-                    stop_event = existing.get("stop")
+                            continue
 
-                    thread = existing.get("thread")
+                        stop_event = existing.get("stop")
 
-                    if stop_event:
+                        thread = existing.get("thread")
 
-                        stop_event.set()
+                        if stop_event:
 
-                    if thread:
+                            stop_event.set()
 
-                        thread.join(timeout=3)
+                        if thread:
 
-                stop_event = threading.Event()
+                            thread.join(timeout=3)
 
-                thread = threading.Thread(
+                    stop_event = threading.Event()
 
-                    target=workspace_worker_loop,
+                    thread = threading.Thread(
 
-                    args=(workspace, user_agent, poll_seconds, stop_event),
+                        target=workspace_worker_loop,
 
-                    daemon=True,
+                        args=(workspace, user_agent, poll_seconds, stop_event, _lease_check(leases, workspace)),
 
-                )
+                        daemon=True,
 
-                workers[workspace_id] = {
+                    )
 
-                    "golden_key": golden_key,
+                    workers[workspace_id] = {
 
-                    "proxy_url": proxy_url,
+                        "fingerprint": fingerprint,
 
-                    "thread": thread,
+                        "thread": thread,
 
-                    "stop": stop_event,
+                        "stop": stop_event,
 
-                }
+                    }
 
-                thread.start()
+                    thread.start()
 
 
 
-            time.sleep(sync_seconds)
+                time.sleep(sync_seconds)
 
-        except Exception as exc:
+            except Exception as exc:
 
-            short = exc.short_str() if hasattr(exc, "short_str") else str(exc)[:200]
+                short = exc.short_str() if hasattr(exc, "short_str") else str(exc)[:200]
 
-            logger.error("User sync failed: %s. Retrying in 30s.", short)
+                logger.error("User sync failed: %s. Retrying in 30s.", short)
 
-            logger.debug("User sync traceback:", exc_info=True)
+                logger.debug("User sync traceback:", exc_info=True)
 
-            time.sleep(30)
+                time.sleep(30)
+    finally:
+        _release_leases(logger, leases)
+        shutdown_memory(logger)
 
 
 
@@ -4041,11 +3530,24 @@ def main() -> None:
 
     if multi_user:
 
-        run_multi_user(logger)
+        worker_processes = resolve_worker_processes(env_int("FUNPAY_WORKER_PROCESSES", 1))
+
+        if worker_processes > 1:
+
+            ShardSupervisor(logger, worker_processes, _run_shard).run()
+
+        else:
+
+            signal.signal(signal.SIGTERM, exit_on_signal)
+
+            run_multi_user(logger)
 
     else:
 
-        run_single_user(logger)
+        try:
+            run_single_user(logger)
+        finally:
+            shutdown_memory(logger)
 
 
 
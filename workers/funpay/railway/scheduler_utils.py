@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Protocol
+
+
+@dataclass
+class WorkspaceStep:
+    name: str
+    run: Callable[[], float]
+    kind: str
+    initial_delay: float = 0.0
+
+
+class WorkspaceRuntimeLike(Protocol):
+    stop_event: threading.Event
+    wake_hook: Callable[[str], None] | None
+
+    def connect(self) -> bool: ...
+
+    def steps(self) -> list[WorkspaceStep]: ...
+
+    def report_failure(self, exc: Exception) -> None: ...
+
+    def close(self) -> None: ...
+
+
+@dataclass
+class _WorkspaceTask:
+    fingerprint: tuple
+    runtime: WorkspaceRuntimeLike
+    stop: asyncio.Event
+    wake: asyncio.Event = field(default_factory=asyncio.Event)
+    woken: set[str] = field(default_factory=set)
+    task: asyncio.Task | None = None
+
+
+class WorkspaceScheduler:
+    # Runs every workspace as a coroutine on one event loop. Each workspace keeps its own
+    # timers (chat poll, rental check, raise, status ping...) and runs its steps strictly
+    # one after another, so an Account is never used from two threads at once. The
+    # blocking FunPay/MySQL calls are handed to a shared, bounded thread pool and gated
+    # by per-kind semaphores, so thread count follows actual concurrent work instead of
+    # the number of workspaces.
+    def __init__(
+        self,
+        logger: logging.Logger,
+        *,
+        threads: int,
+        http_concurrency: int,
+        db_concurrency: int,
+        restart_delay: float = 30.0,
+        min_sleep: float = 0.2,
+    ) -> None:
+        self.logger = logger
+        self.threads = max(1, int(threads))
+        self.http_concurrency = max(1, int(http_concurrency))
+        self.db_concurrency = max(1, int(db_concurrency))
+        self.restart_delay = max(0.0, float(restart_delay))
+        self.min_sleep = max(0.01, float(min_sleep))
+        self._executor: ThreadPoolExecutor | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._tasks: dict[int, _WorkspaceTask] = {}
+
+    async def _call(self, kind: str | None, fn: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(kind) if kind else None
+        if semaphore is None:
+            return await loop.run_in_executor(self._executor, fn, *args)
+        async with semaphore:
+            return await loop.run_in_executor(self._executor, fn, *args)
+
+    @staticmethod
+    async def _sleep(stop: asyncio.Event, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=max(0.0, seconds))
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run_workspace(self, entry: _WorkspaceTask) -> None:
+        loop = asyncio.get_running_loop()
+        runtime, stop = entry.runtime, entry.stop
+        try:
+            while not stop.is_set():
+                try:
+                    if not await self._call("http", runtime.connect):
+                        return
+                    steps = runtime.steps()
+                    due = {step.name: loop.time() + step.initial_delay for step in steps}
+                    while not stop.is_set():
+                        for name in entry.woken:
+                            if name in due:
+                                due[name] = 0.0
+                        entry.woken.clear()
+                        for step in steps:
+                            if stop.is_set():
+                                break
+                            if loop.time() >= due[step.name]:
+                                delay = await self._call(step.kind, step.run)
+                                due[step.name] = loop.time() + max(0.0, float(delay))
+                        if not entry.woken:
+                            await self._sleep(entry.wake, max(self.min_sleep, min(due.values()) - loop.time()))
+                        entry.wake.clear()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:
+                    try:
+                        await self._call("db", runtime.report_failure, exc)
+                    except Exception:
+                        self.logger.debug("Workspace failure report failed.", exc_info=True)
+                    await self._sleep(stop, self.restart_delay)
+        finally:
+            try:
+                await self._call(None, runtime.close)
+            except Exception:
+                self.logger.debug("Workspace close failed.", exc_info=True)
+
+    def _start(self, workspace_id: int, fingerprint: tuple, runtime: WorkspaceRuntimeLike) -> None:
+        entry = _WorkspaceTask(fingerprint=fingerprint, runtime=runtime, stop=asyncio.Event())
+        runtime.wake_hook = lambda step_name: self.wake(workspace_id, step_name)
+        entry.task = asyncio.create_task(
+            self._run_workspace(entry),
+            name=f"workspace-{workspace_id}",
+        )
+        self._tasks[workspace_id] = entry
+
+    async def _stop(self, workspace_id: int, timeout: float = 3.0) -> None:
+        entry = self._tasks.pop(workspace_id, None)
+        if entry is None:
+            return
+        entry.stop.set()
+        entry.wake.set()
+        entry.runtime.stop_event.set()
+        if entry.task is None or entry.task.done():
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(entry.task), timeout=timeout)
+        except asyncio.TimeoutError:
+            # The step in flight finishes on its own; the stop flags end the loop afterwards.
+            pass
+        except Exception:
+            self.logger.debug("Workspace %s stopped with error.", workspace_id, exc_info=True)
+
+    def _wake(self, workspace_id: int, step_name: str) -> None:
+        entry = self._tasks.get(workspace_id)
+        if entry is None:
+            return
+        entry.woken.add(step_name)
+        entry.wake.set()
+
+    def wake(self, workspace_id: int, step_name: str) -> None:
+        # Thread-safe: runs the step of that workspace as soon as its current step is done.
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._wake, int(workspace_id), step_name)
+        except RuntimeError:
+            pass
+
+    async def sync(
+        self,
+        desired: dict[int, dict],
+        fingerprint_fn: Callable[[dict], tuple],
+        runtime_factory: Callable[[dict], WorkspaceRuntimeLike],
+    ) -> None:
+        for workspace_id in list(self._tasks.keys()):
+            if workspace_id not in desired:
+                await self._stop(workspace_id)
+        for workspace_id, workspace in desired.items():
+            fingerprint = fingerprint_fn(workspace)
+            existing = self._tasks.get(workspace_id)
+            if existing is not None:
+                if existing.fingerprint == fingerprint:
+                    continue
+                await self._stop(workspace_id)
+            self._start(workspace_id, fingerprint, runtime_factory(workspace))
+
+    @property
+    def active_count(self) -> int:
+        return sum(1 for entry in self._tasks.values() if entry.task is not None and not entry.task.done())
+
+    async def run(
+        self,
+        *,
+        fetch_desired: Callable[[], dict[int, dict]],
+        fingerprint_fn: Callable[[dict], tuple],
+        runtime_factory: Callable[[dict], WorkspaceRuntimeLike],
+        sync_seconds: float,
+        housekeeping: Callable[[], None] | None = None,
+        housekeeping_seconds: float = 60.0,
+    ) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="funpay-ws")
+        self._semaphores = {
+            "http": asyncio.Semaphore(self.http_concurrency),
+            "db": asyncio.Semaphore(self.db_concurrency),
+        }
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        next_housekeeping = 0.0
+        try:
+            while True:
+                next_sync = loop.time() + max(1.0, float(sync_seconds))
+                try:
+                    desired = await self._call("db", fetch_desired)
+                    await self.sync(desired, fingerprint_fn, runtime_factory)
+                except Exception as exc:
+                    short = exc.short_str() if hasattr(exc, "short_str") else str(exc)[:200]
+                    self.logger.error("User sync failed: %s. Retrying in 30s.", short)
+                    self.logger.debug("User sync traceback:", exc_info=True)
+                    next_sync = loop.time() + 30
+                while loop.time() < next_sync:
+                    if housekeeping is not None and loop.time() >= next_housekeeping:
+                        try:
+                            await self._call(None, housekeeping)
+                        except Exception:
+                            self.logger.debug("Scheduler housekeeping failed.", exc_info=True)
+                        next_housekeeping = loop.time() + max(1.0, float(housekeeping_seconds))
+                    wake_at = next_sync if housekeeping is None else min(next_sync, next_housekeeping)
+                    await asyncio.sleep(max(self.min_sleep, wake_at - loop.time()))
+        finally:
+            for workspace_id in list(self._tasks.keys()):
+                await self._stop(workspace_id)
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import signal
+import time
+import zlib
+from typing import Callable
+
+
+def workspace_shard(workspace_id: int, shard_count: int) -> int:
+    # crc32 is stable across processes and restarts (unlike hash()), so a workspace stays
+    # on the same shard as long as the shard count does not change.
+    if shard_count <= 1:
+        return 0
+    return zlib.crc32(str(int(workspace_id)).encode("ascii")) % shard_count
+
+
+def exit_on_signal(signum, _frame) -> None:
+    # Turn SIGTERM into SystemExit so finally blocks (lease release, account close) run.
+    raise SystemExit(128 + signum)
+
+
+def _shard_entry(target: Callable[[int, int], None], shard_index: int, shard_count: int) -> None:
+    signal.signal(signal.SIGTERM, exit_on_signal)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    target(shard_index, shard_count)
+
+
+class ShardSupervisor:
+    # Forks one process per shard. Every shard runs the normal multi-user loop but only
+    # keeps the workspaces that hash to it, so added/removed workspaces are picked up by
+    # the owning shard on its next user sync without touching the others.
+    def __init__(
+        self,
+        logger: logging.Logger,
+        shard_count: int,
+        target: Callable[[int, int], None],
+        *,
+        restart_delay: float = 5.0,
+        max_restart_delay: float = 120.0,
+        stable_seconds: float = 300.0,
+    ) -> None:
+        self.logger = logger
+        self.shard_count = max(1, int(shard_count))
+        self.target = target
+        self.restart_delay = max(0.5, float(restart_delay))
+        self.max_restart_delay = max(self.restart_delay, float(max_restart_delay))
+        self.stable_seconds = max(1.0, float(stable_seconds))
+        self._ctx = multiprocessing.get_context("fork")
+        self._processes: dict[int, multiprocessing.process.BaseProcess] = {}
+        self._started_at: dict[int, float] = {}
+        self._failures: dict[int, int] = {}
+        self._next_start: dict[int, float] = {}
+        self._stopping = False
+
+    def _start(self, shard_index: int) -> None:
+        process = self._ctx.Process(
+            target=_shard_entry,
+            args=(self.target, shard_index, self.shard_count),
+            name=f"funpay-shard-{shard_index}",
+            daemon=False,
+        )
+        process.start()
+        self._processes[shard_index] = process
+        self._started_at[shard_index] = time.monotonic()
+        self.logger.info(
+            "Shard %s/%s started (pid %s).",
+            shard_index + 1,
+            self.shard_count,
+            process.pid,
+        )
+
+    def _check(self, shard_index: int, now: float) -> None:
+        process = self._processes.get(shard_index)
+        if process is not None and process.is_alive():
+            if now - self._started_at.get(shard_index, now) >= self.stable_seconds:
+                self._failures[shard_index] = 0
+            return
+        if process is not None:
+            process.join(timeout=0)
+            self._processes.pop(shard_index, None)
+            failures = self._failures.get(shard_index, 0) + 1
+            self._failures[shard_index] = failures
+            delay = min(self.max_restart_delay, self.restart_delay * (2 ** (failures - 1)))
+            self._next_start[shard_index] = now + delay
+            self.logger.error(
+                "Shard %s/%s exited with code %s. Restarting in %ss.",
+                shard_index + 1,
+                self.shard_count,
+                process.exitcode,
+                int(delay),
+            )
+            return
+        if now >= self._next_start.get(shard_index, 0.0):
+            self._start(shard_index)
+
+    def _request_stop(self, signum, _frame) -> None:
+        self.logger.info("Supervisor received signal %s, stopping shards.", signum)
+        self._stopping = True
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stopping = True
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + max(0.0, timeout)
+        for process in self._processes.values():
+            process.join(timeout=max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join(timeout=1)
+        self._processes.clear()
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        self.logger.info("Supervisor mode enabled. Shards: %s.", self.shard_count)
+        try:
+            while not self._stopping:
+                now = time.monotonic()
+                for shard_index in range(self.shard_count):
+                    self._check(shard_index, now)
+                time.sleep(1.0)
+        finally:
+            self.stop()
+            self.logger.info("Supervisor stopped.")
+
+
+def resolve_worker_processes(raw: int) -> int:
+    if raw <= 0:
+        return os.cpu_count() or 1
+    return raw
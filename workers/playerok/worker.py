@@ -5,6 +5,7 @@ import hashlib
 import json
 import logging
 import os
+import threading
 import time
 from dataclasses import dataclass
 from datetime import datetime, timezone
@@ -78,6 +79,18 @@ def table_exists(cursor: mysql.connector.cursor.MySQLCursor, table: str) -> bool
     return cursor.fetchone() is not None
 
 
+def column_exists(cursor: mysql.connector.cursor.MySQLCursor, table: str, column: str) -> bool:
+    cursor.execute(
+        """
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        LIMIT 1
+        """,
+        (table, column),
+    )
+    return cursor.fetchone() is not None
+
+
 def normalize_proxy_url(raw: str | None) -> str:
     value = (raw or "").strip()
     if not value:
@@ -286,12 +299,39 @@ def insert_chat_message(
         conn.close()
 
 
-def fetch_chat_outbox(mysql_cfg: dict, user_id: int, workspace_id: int, limit: int = 20) -> list[dict]:
+def _ensure_outbox_claim_column(conn, cursor) -> bool:
+    # Same migration as the FunPay worker, for databases the backend has not updated yet.
+    if column_exists(cursor, "chat_outbox", "claimed_at"):
+        return True
+    try:
+        cursor.execute("ALTER TABLE chat_outbox ADD COLUMN claimed_at TIMESTAMP NULL AFTER sent_at")
+        conn.commit()
+        return True
+    except Exception as exc:
+        logging.getLogger("playerok.worker").warning(
+            "chat_outbox.claimed_at is missing and could not be added, outbox is paused: %s", exc
+        )
+        return False
+
+
+def claim_chat_outbox(mysql_cfg: dict, user_id: int, workspace_id: int, limit: int = 20) -> list[dict]:
     conn = mysql.connector.connect(**mysql_cfg)
     try:
         cursor = conn.cursor(dictionary=True)
         if not table_exists(cursor, "chat_outbox"):
             return []
+        if not _ensure_outbox_claim_column(conn, cursor):
+            return []
+        cursor.execute(
+            """
+            UPDATE chat_outbox
+            SET status = 'pending', claimed_at = NULL
+            WHERE status = 'sending' AND user_id = %s AND workspace_id = %s
+              AND claimed_at < NOW() - INTERVAL %s SECOND
+            """,
+            (int(user_id), int(workspace_id), max(30, int(os.getenv("CHAT_OUTBOX_CLAIM_TIMEOUT_SECONDS", "120")))),
+        )
+        conn.commit()
         cursor.execute(
             """
             SELECT id, chat_id, text, attempts
@@ -299,42 +339,113 @@ def fetch_chat_outbox(mysql_cfg: dict, user_id: int, workspace_id: int, limit: i
             WHERE status = 'pending' AND user_id = %s AND workspace_id = %s
             ORDER BY id ASC
             LIMIT %s
+            FOR UPDATE SKIP LOCKED
             """,
             (int(user_id), int(workspace_id), int(max(1, min(limit, 200)))),
         )
-        return list(cursor.fetchall() or [])
+        rows = list(cursor.fetchall() or [])
+        if rows:
+            ids = [int(row["id"]) for row in rows]
+            cursor.execute(
+                f"""
+                UPDATE chat_outbox
+                SET status = 'sending', attempts = attempts + 1, claimed_at = NOW()
+                WHERE id IN ({", ".join(["%s"] * len(ids))})
+                """,
+                tuple(ids),
+            )
+            for row in rows:
+                row["attempts"] = int(row.get("attempts") or 0) + 1
+        conn.commit()
+        return rows
     finally:
         conn.close()
 
 
-def mark_outbox_sent(mysql_cfg: dict, outbox_id: int) -> None:
+def apply_outbox_results(mysql_cfg: dict, sent_ids: list[int], failures: list[tuple[int, str, int]]) -> None:
+    if not sent_ids and not failures:
+        return
     conn = mysql.connector.connect(**mysql_cfg)
     try:
         cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE chat_outbox SET status='sent', sent_at=NOW() WHERE id = %s",
-            (int(outbox_id),),
-        )
+        if sent_ids:
+            cursor.execute(
+                f"""
+                UPDATE chat_outbox
+                SET status = 'sent', sent_at = NOW(), claimed_at = NULL
+                WHERE id IN ({", ".join(["%s"] * len(sent_ids))})
+                """,
+                tuple(int(outbox_id) for outbox_id in sent_ids),
+            )
+        if failures:
+            cursor.executemany(
+                """
+                UPDATE chat_outbox
+                SET status = 'failed', attempts = %s, last_error = %s, claimed_at = NULL
+                WHERE id = %s
+                """,
+                [(int(attempts), error[:500], int(outbox_id)) for outbox_id, error, attempts in failures],
+            )
         conn.commit()
     finally:
         conn.close()
 
 
-def mark_outbox_failed(mysql_cfg: dict, outbox_id: int, error: str, attempts: int) -> None:
-    conn = mysql.connector.connect(**mysql_cfg)
-    try:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            UPDATE chat_outbox
-            SET status = 'failed', attempts = %s, last_error = %s
-            WHERE id = %s
-            """,
-            (int(attempts), error[:500], int(outbox_id)),
-        )
-        conn.commit()
-    finally:
-        conn.close()
+class OutboxWakeups:
+    # Reads the Redis stream the backend appends to on every panel send and wakes the main
+    # loop, so queued messages go out without waiting for the next poll.
+    def __init__(self, logger: logging.Logger) -> None:
+        self.logger = logger
+        self._client = None
+        redis_url = os.getenv("REDIS_URL", "").strip()
+        if redis_url and os.getenv("CHAT_OUTBOX_REDIS_WAKEUP", "1").strip().lower() not in {"0", "false", "no"}:
+            try:
+                import redis  # type: ignore
+
+                self._client = redis.from_url(redis_url, decode_responses=True)
+            except Exception:
+                self._client = None
+        self._stream_key = os.getenv("CHAT_OUTBOX_STREAM_KEY", "chat:outbox:events")
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._woken: set[int] = set()
+        self.connected = False
+
+    def start(self) -> None:
+        if self._client is None:
+            return
+        threading.Thread(target=self._run, name="playerok-outbox-wakeups", daemon=True).start()
+
+    def _run(self) -> None:
+        last_id = "$"
+        while True:
+            try:
+                result = self._client.xread({self._stream_key: last_id}, count=200, block=5000)
+            except Exception as exc:
+                if self.connected:
+                    self.logger.warning("Outbox wake-up stream unavailable: %s", exc)
+                self.connected = False
+                time.sleep(5)
+                continue
+            self.connected = True
+            woken: set[int] = set()
+            for _stream, entries in result or []:
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    raw = (fields or {}).get("workspace_id")
+                    if raw and str(raw).isdigit():
+                        woken.add(int(raw))
+            if woken:
+                with self._lock:
+                    self._woken.update(woken)
+                self._event.set()
+
+    def wait(self, timeout: float) -> set[int]:
+        self._event.wait(max(0.0, timeout))
+        with self._lock:
+            self._event.clear()
+            woken, self._woken = self._woken, set()
+        return woken
 
 
 def get_chat_name(mysql_cfg: dict, user_id: int, workspace_id: int, chat_id: int) -> str | None:
@@ -538,20 +649,36 @@ def sync_chats(logger: logging.Logger, mysql_cfg: dict, session: WorkspaceSessio
 
 
 def process_outbox(logger: logging.Logger, mysql_cfg: dict, session: WorkspaceSession) -> None:
-    pending = fetch_chat_outbox(mysql_cfg, session.user_id, session.workspace_id, limit=20)
+    pending = claim_chat_outbox(mysql_cfg, session.user_id, session.workspace_id, limit=20)
     if not pending:
         return
+    sent_ids: list[int] = []
+    failures: list[tuple[int, str, int]] = []
+    try:
+        _send_outbox_entries(logger, mysql_cfg, session, pending, sent_ids, failures)
+    finally:
+        apply_outbox_results(mysql_cfg, sent_ids, failures)
+
+
+def _send_outbox_entries(
+    logger: logging.Logger,
+    mysql_cfg: dict,
+    session: WorkspaceSession,
+    pending: list[dict],
+    sent_ids: list[int],
+    failures: list[tuple[int, str, int]],
+) -> None:
     for entry in pending:
         outbox_id = int(entry["id"])
         chat_id = int(entry["chat_id"])
         text = str(entry.get("text") or "").strip()
-        attempts = int(entry.get("attempts") or 0) + 1
+        attempts = int(entry.get("attempts") or 0)
         if not text:
-            mark_outbox_failed(mysql_cfg, outbox_id, "Empty message", attempts)
+            failures.append((outbox_id, "Empty message", attempts))
             continue
         chat_name = get_chat_name(mysql_cfg, session.user_id, session.workspace_id, chat_id)
         if not chat_name:
-            mark_outbox_failed(mysql_cfg, outbox_id, "Chat not found", attempts)
+            failures.append((outbox_id, "Chat not found", attempts))
             continue
 
         label = f"[PlayerOk:{session.workspace_id}]"
@@ -559,9 +686,9 @@ def process_outbox(logger: logging.Logger, mysql_cfg: dict, session: WorkspaceSe
             with TlsProxyPatch(session.proxy_url):
                 result = session.chat_api.on_send_message(chat_name, text)
             if not result:
-                mark_outbox_failed(mysql_cfg, outbox_id, "Send failed", attempts)
+                failures.append((outbox_id, "Send failed", attempts))
                 continue
-            mark_outbox_sent(mysql_cfg, outbox_id)
+            sent_ids.append(outbox_id)
 
             msg = (result.get("data") or {}).get("createChatMessage") if isinstance(result, dict) else None
             if isinstance(msg, dict):
@@ -583,7 +710,8 @@ def process_outbox(logger: logging.Logger, mysql_cfg: dict, session: WorkspaceSe
             logger.info("%s Sent message to %s.", label, chat_name)
         except Exception as exc:
             logger.warning("%s Failed to send message: %s", label, exc)
-            mark_outbox_failed(mysql_cfg, outbox_id, str(exc), attempts)
+            if outbox_id not in sent_ids:
+                failures.append((outbox_id, str(exc), attempts))
 
 
 def main() -> None:
@@ -596,6 +724,8 @@ def main() -> None:
     cookies_dir = Path(os.getenv("PLAYEROK_COOKIES_DIR", ".playerok_cookies"))
 
     sessions: dict[int, WorkspaceSession] = {}
+    wakeups = OutboxWakeups(logger)
+    wakeups.start()
     logger.info("PlayerOk worker starting. Poll interval: %ss", poll_seconds)
 
     while True:
@@ -622,7 +752,16 @@ def main() -> None:
             except Exception as exc:
                 logger.exception("[PlayerOk:%s] Worker error: %s", session.workspace_id, exc)
 
-        time.sleep(poll_seconds)
+        next_poll = time.time() + poll_seconds
+        while time.time() < next_poll:
+            for woken_id in sorted(wakeups.wait(next_poll - time.time())):
+                session = sessions.get(woken_id)
+                if not session:
+                    continue
+                try:
+                    process_outbox(logger, mysql_cfg, session)
+                except Exception as exc:
+                    logger.exception("[PlayerOk:%s] Outbox error: %s", session.workspace_id, exc)
 
 
 if __name__ == "__main__":